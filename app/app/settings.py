@@ -23,9 +23,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'yv53n2qgw^h&xhy^p2u%247jrg2fgphd53p(!mem2*+r*^c!g='
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host
+]
 
 
 # Application definition
@@ -46,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,9 +89,96 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
+# Read replicas: one alias per host in DB_REPLICA_HOSTS, mirroring the
+# primary in tests. Reads are routed to them by core.routers.ReplicaRouter.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        h for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h):
+    alias = 'replica_%d' % index
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write, and how
+# long a replica health check result is reused.
+REPLICA_PIN_SECONDS = 5
+REPLICA_HEALTH_CHECK_SECONDS = 5.0
+
+# The replica pinning state lives in this cache. Use a cache shared between
+# workers (e.g. memcached) when running more than one process.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ScopedRateThrottle',
+        'core.throttling.ReadRateThrottle',
+        'core.throttling.WriteRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.environ.get('THROTTLE_READ_RATE', '600/min'),
+        'write': os.environ.get('THROTTLE_WRITE_RATE', '120/min'),
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '20/min'),
+    },
+}
+
+# Cache alias holding the throttling token buckets, shared by all workers.
+# Empty keeps them in the memory of each worker.
+THROTTLE_CACHE = os.environ.get('THROTTLE_CACHE', '')
+
+# Number of hash partitions `partition_recipes` splits the recipe tables
+# into by default. Migrations never partition them. Needs Postgres 11+.
+RECIPE_PARTITIONS = int(os.environ.get('RECIPE_PARTITIONS', 0))
+
+# Upper bounds (in minutes) of the cooking time histogram buckets kept in
+# the user stats; the last bucket is open ended. Run recompute_stats after
+# changing them.
+RECIPE_TIME_BUCKETS = [15, 30, 60, 120]
+
+# Readiness probe: how long a result is reused and how long the probe query
+# may run before the database is reported as unavailable.
+READINESS_CACHE_SECONDS = 1.0
+READINESS_DB_TIMEOUT_MS = 500
+
+# Background jobs: failed attempts are retried after an exponential delay
+# starting at JOB_RETRY_DELAY_SECONDS, and a job running for longer than
+# JOB_TIMEOUT_SECONDS is assumed lost with its worker and run again.
+JOB_RETRY_DELAY_SECONDS = 10
+JOB_RETRY_MAX_DELAY_SECONDS = 600
+JOB_TIMEOUT_SECONDS = 3600
+
+# API tokens: seconds a token stays valid after its last renewal, how much
+# later a request must move its expiry before it is renewed (bounding the
+# writes to one per token in that time), and the most any token may live.
+AUTH_TOKEN_TTL_SECONDS = int(
+    os.environ.get('AUTH_TOKEN_TTL_SECONDS', 14 * 24 * 60 * 60)
+)
+AUTH_TOKEN_RENEW_SECONDS = 60 * 60
+AUTH_TOKEN_MAX_AGE_SECONDS = int(
+    os.environ.get('AUTH_TOKEN_MAX_AGE_SECONDS', 90 * 24 * 60 * 60)
+)
+
+# Admin changelists show the planner's row estimate instead of counting
+# results expected to be at least this large.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -126,5 +217,57 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.environ.get('STATIC_ROOT', '/vol/web/static')
+
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '/vol/web/media')
+
+# Most recipes one request to /api/recipe/recipe/batch/ may ask for.
+RECIPE_BATCH_MAX_IDS = 100
+
+# Server-sent change events: how many recent events each process keeps for
+# clients resuming a stream, the seconds between heartbeats and before a
+# stream ends and the client reconnects, and how many streams a process may
+# serve at once, each holding one of its threads.
+EVENTS_BUFFER_SIZE = 1000
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_STREAM_SECONDS = 300
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 2))
+EVENTS_RECONNECT_SECONDS = 5
+
+# Shared recipes: seconds browsers and the CDN may cache them, and the
+# Fastly-compatible endpoint purging the CDN's copies when they change.
+SHARE_MAX_AGE = 60
+SHARE_CDN_MAX_AGE = 24 * 60 * 60
+CDN_PURGE_URL = os.environ.get('CDN_PURGE_URL', '')
+CDN_PURGE_TOKEN = os.environ.get('CDN_PURGE_TOKEN', '')
+CDN_PURGE_TIMEOUT_SECONDS = 10
+
+# Webhooks told about recipe, tag and ingredient changes through the outbox,
+# and how `manage.py dispatch_outbox` delivers them.
+OUTBOX_WEBHOOK_URLS = [
+    url for url in os.environ.get('OUTBOX_WEBHOOK_URLS', '').split(',') if url
+]
+OUTBOX_WEBHOOK_SECRET = os.environ.get('OUTBOX_WEBHOOK_SECRET', '')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_TIMEOUT_SECONDS = 10
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_RETRY_DELAY_SECONDS = 10
+OUTBOX_RETRY_MAX_DELAY_SECONDS = 3600
+OUTBOX_MAX_ATTEMPTS = 15
+
+# Most memory one list request may allocate in `manage.py benchmark_memory`.
+MEMORY_CEILING_BYTES = int(
+    os.environ.get('MEMORY_CEILING_BYTES', 256 * 1024 * 1024)
+)
+
+# Recipe images: upload limits and the renditions served, by name and the
+# size in pixels of the square they fit in.
+RECIPE_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+RECIPE_IMAGE_SIZES = {
+    'thumbnail': 160,
+    'medium': 640,
+    'large': 1280,
+}
 
 AUTH_USER_MODEL = 'core.User'
@@ -0,0 +1,44 @@
+"""
+Django settings for workers serving only the API.
+
+Leaves out the admin site, sessions, messages, static files and the
+browsable API, none of which token authenticated API clients use, so that
+workers import less and start faster. Serve the admin site from a process
+using app.settings.
+"""
+
+from app.settings import *  # noqa: F401,F403
+
+UNUSED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS  # noqa: F405
+    if app not in UNUSED_APPS
+]
+
+# Users are only ever authenticated by DRF, with tokens, which needs neither
+# sessions nor CSRF protection.
+UNUSED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+)
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE  # noqa: F405
+    if middleware not in UNUSED_MIDDLEWARE
+]
+
+ROOT_URLCONF = 'app.urls_api'
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,  # noqa: F405
+    DEFAULT_AUTHENTICATION_CLASSES=[
+        'core.authentication.ExpiringTokenAuthentication',
+    ],
+    DEFAULT_RENDERER_CLASSES=['rest_framework.renderers.JSONRenderer'],
+)
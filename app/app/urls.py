@@ -1,8 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
 
-urlpatterns = [
+from app.urls_api import urlpatterns as api_urlpatterns
+
+urlpatterns = api_urlpatterns + [
     path('admin/', admin.site.urls),
-    path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls')),
 ]
@@ -3,11 +3,28 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
 
 from core import models
+from core.pagination import EstimatedCountPaginator
 
 
-class UserAdmin(BaseUserAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables too big to count or scan.
+
+    Totals come from the planner's estimate, the unfiltered total is not
+    counted next to search results, and `^` search fields match prefixes
+    through the UPPER(...) text_pattern_ops indexes of migration 0013.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('user',)
+    ordering = ['-id']
+
+
+class UserAdmin(LargeTableAdmin, BaseUserAdmin):
     ordering = ['id']
-    list_display = ['email', 'name']
+    list_display = ['email', 'name', 'is_active', 'is_staff']
+    list_select_related = ()
+    search_fields = ['^email', '^name']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal Info'), {'fields': ('name',)}),
@@ -15,7 +32,7 @@ class UserAdmin(BaseUserAdmin):
             _('Permissions'),
             {'fields': ('is_active', 'is_staff', 'is_superuser')}
         ),
-        (_('Dates'), {'fields': ('last_login',)})
+        (_('Dates'), {'fields': ('last_login', 'purge_requested_at')})
     )
 
     add_fieldsets = (
@@ -26,5 +43,65 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeAttrAdmin(LargeTableAdmin):
+    list_display = ['name', 'user', 'recipe_count']
+    search_fields = ['^name']
+    autocomplete_fields = ['user']
+    readonly_fields = ['recipe_count']
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ['title', 'user', 'time_minute', 'price']
+    search_fields = ['^title']
+    autocomplete_fields = ['user', 'tags', 'ingredients']
+    readonly_fields = ['image_hash']
+
+
+class DerivedDataAdmin(LargeTableAdmin):
+    """Read-only admin for rows maintained by signals and commands"""
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+class UserStatsAdmin(DerivedDataAdmin):
+    list_display = ['user', 'recipe_count', 'tag_count', 'ingredient_count']
+    search_fields = ['^user__email']
+    ordering = ['-user_id']
+
+
+class RecipeSignatureAdmin(DerivedDataAdmin):
+    list_display = ['recipe', 'user']
+    list_select_related = ('recipe', 'user')
+    ordering = ['-recipe_id']
+
+
+class JobAdmin(LargeTableAdmin):
+    list_display = ['name', 'user', 'status', 'attempts', 'run_at']
+    list_filter = ['status']
+    autocomplete_fields = ['user']
+    readonly_fields = [
+        'attempts', 'started_at', 'finished_at', 'result', 'last_error'
+    ]
+
+
+class AuthTokenAdmin(LargeTableAdmin):
+    list_display = ['__str__', 'user', 'created_at', 'expires_at']
+    search_fields = ['^user__email']
+    autocomplete_fields = ['user']
+    ordering = ['-expires_at']
+    fields = ['user', 'device', 'created_at', 'expires_at']
+    readonly_fields = ['created_at']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
+admin.site.register(models.Tag, RecipeAttrAdmin)
+admin.site.register(models.Ingredient, RecipeAttrAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.UserStats, UserStatsAdmin)
+admin.site.register(models.RecipeSignature, RecipeSignatureAdmin)
+admin.site.register(models.Job, JobAdmin)
+admin.site.register(models.AuthToken, AuthTokenAdmin)
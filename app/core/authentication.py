@@ -0,0 +1,23 @@
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.models import AuthToken
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """Token authentication refusing expired tokens and renewing the others
+
+    Clients send `Authorization: Token <key>` as before. Each use moves the
+    expiry of the token back, so devices in use stay signed in.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        if token.is_expired:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        token.renew()
+        return user, token
@@ -0,0 +1,52 @@
+"""
+Purging the public copies of shared recipes kept by a CDN.
+
+Responses for shared recipes carry a `Surrogate-Key` header naming the
+recipe and each of its tags and ingredients. When one of them changes, a
+`purge_cdn` job asks the CDN to drop every response tagged with its key.
+The job is queued in the transaction of the change, so a purge is requested
+exactly when the change commits. The request follows Fastly's API: a POST
+to `CDN_PURGE_URL` listing the keys in a `Surrogate-Key` header.
+"""
+import urllib.request
+
+from django.conf import settings
+
+from core import jobs
+
+
+def key(model, pk):
+    """Return the surrogate key of an object"""
+    return '%s-%d' % (model._meta.model_name, pk)
+
+
+def surrogate_keys(recipe):
+    """Return the keys of a recipe and of what it shows; prefetch them"""
+    return [key(type(recipe), recipe.pk)] + [
+        key(type(obj), obj.pk)
+        for obj in list(recipe.tags.all()) + list(recipe.ingredients.all())
+    ]
+
+
+def is_enabled():
+    return bool(settings.CDN_PURGE_URL)
+
+
+def purge(keys):
+    """Have the responses with any of the keys purged after the commit"""
+    if keys and is_enabled():
+        jobs.enqueue('purge_cdn', keys=sorted(keys))
+
+
+def purge_now(keys):
+    """Ask the CDN to drop the responses with any of the keys"""
+    headers = {'Surrogate-Key': ' '.join(keys)}
+    if settings.CDN_PURGE_TOKEN:
+        headers['Fastly-Key'] = settings.CDN_PURGE_TOKEN
+    request = urllib.request.Request(
+        settings.CDN_PURGE_URL, b'', headers, method='POST'
+    )
+    with urllib.request.urlopen(
+        request, timeout=settings.CDN_PURGE_TIMEOUT_SECONDS
+    ) as response:
+        response.read()
@@ -0,0 +1,73 @@
+"""
+ETags for API responses built from a user's own data.
+
+Every change to a user's data bumps `UserStats.version`, so the version,
+the user and the request identify the response. A client sending back the
+ETag it got is answered 304 Not Modified after a single query, before the
+response is built.
+"""
+import hashlib
+
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from core.models import UserStats
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+def user_data_etag(request, version):
+    """Return the ETag of the response to a request at a data version"""
+    key = '%s:%s:%s:%s' % (
+        request.user.pk, version, request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', ''),
+    )
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+class UserDataETagMixin:
+    """Answer repeated GETs of unchanged user data with 304 Not Modified"""
+    etag_actions = ('list',)
+    etag = None
+    user_stats = None
+
+    def uses_etag(self, request):
+        """Return whether the response to a request gets an ETag"""
+        return request.method in ('GET', 'HEAD') \
+            and getattr(self, 'action', None) in self.etag_actions
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not self.uses_etag(request):
+            return
+
+        self.user_stats = UserStats.objects \
+            .filter(user=request.user).first()
+        if self.user_stats is None:
+            return
+
+        self.etag = user_data_etag(request, self.user_stats.version)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if self.etag in parse_etags(if_none_match) or if_none_match == '*':
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=exc.status_code)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.etag is not None and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            # Shared caches must not keep it; clients must revalidate.
+            patch_cache_control(response, private=True, no_cache=True)
+
+        return response
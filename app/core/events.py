@@ -0,0 +1,239 @@
+"""
+Change events for server-sent event streams, carried by LISTEN/NOTIFY.
+
+Writes to recipes, tags and ingredients send a NOTIFY on `CHANNEL` inside
+their transaction, so an event is only delivered once its change commits.
+Events are numbered from a sequence, which gives them the same id in every
+process. Each process listens on one connection of its own, whatever the
+number of streams it serves, and hands events to the streams of their user.
+It also keeps the last events in a ring buffer, so a client reconnecting
+with Last-Event-ID gets what it missed; one that missed more than the buffer
+holds is sent a `reset` event and reloads its data instead.
+
+Ids are taken before their transaction commits, so events can arrive with
+an id lower than one already delivered. A resumed stream is therefore sent
+the events which arrived after its last one, not those with a higher id.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection, connections
+from rest_framework.renderers import BaseRenderer
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'user_changes'
+SEQUENCE = 'core_change_event_id_seq'
+
+
+def notify(user_id, model, action, ids):
+    """Announce a change to objects of a user in the current transaction"""
+    if not ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_notify(%s, json_build_object('
+            "  'id', nextval(%s), 'user', %s, 'type', %s,"
+            "  'action', %s, 'object', object"
+            ')::text) FROM unnest(%s::integer[]) object',
+            [CHANNEL, SEQUENCE, user_id, model._meta.model_name, action,
+             sorted(ids)]
+        )
+
+
+class TooManyStreams(Exception):
+    """Raised when a process already serves as many streams as allowed"""
+
+
+class Subscription:
+    """The events of one user, for one stream"""
+
+    def __init__(self, hub, user_id):
+        self.hub = hub
+        self.user_id = user_id
+        self.queue = queue.Queue()
+
+    def get(self, timeout):
+        """Return the next event, or raise queue.Empty after `timeout`"""
+        return self.queue.get(timeout=timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class ChangeHub:
+    """Fans out the events of one LISTEN connection to the subscriptions"""
+
+    def __init__(self, buffer_size=1000, max_subscriptions=None):
+        self.events = deque(maxlen=buffer_size)
+        self.max_subscriptions = max_subscriptions
+        self.subscriptions = defaultdict(set)
+        # Id of the last event dropped from the buffer, 0 if none, None
+        # while not listening: a client must reload its data unless its
+        # last event is this one or still buffered.
+        self.missed_through = None
+        self.lock = threading.Lock()
+        self.listening = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Subscribe to a user's events following `last_event_id`"""
+        subscription = Subscription(self, user_id)
+        with self.lock:
+            count = sum(len(subs) for subs in self.subscriptions.values())
+            if self.max_subscriptions is not None \
+                    and count >= self.max_subscriptions:
+                raise TooManyStreams()
+
+            if last_event_id is not None:
+                missed = self.missed_after(last_event_id)
+                if missed is None:
+                    subscription.queue.put({'id': None, 'type': 'reset'})
+                else:
+                    for event in missed:
+                        if event['user'] == user_id:
+                            subscription.queue.put(event)
+            self.subscriptions[user_id].add(subscription)
+
+        return subscription
+
+    def missed_after(self, last_event_id):
+        """Return the events which arrived after one, None if unknown"""
+        if self.missed_through is None:
+            return None
+
+        events = list(self.events)
+        if last_event_id == self.missed_through:
+            return events
+        for position, event in enumerate(events):
+            if event['id'] == last_event_id:
+                return events[position + 1:]
+        return None
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subs = self.subscriptions.get(subscription.user_id, set())
+            subs.discard(subscription)
+            if not subs:
+                self.subscriptions.pop(subscription.user_id, None)
+
+    def publish(self, payload):
+        """Buffer a notified event and pass it to its user's streams"""
+        event = json.loads(payload)
+        with self.lock:
+            if len(self.events) == self.events.maxlen:
+                self.missed_through = self.events[0]['id']
+            self.events.append(event)
+            for subscription in self.subscriptions.get(event['user'], ()):
+                subscription.queue.put(event)
+
+    def start(self, timeout=5):
+        """Start listening in a thread, unless already listening"""
+        with self.lock:
+            if self.thread is None:
+                self.stopping.clear()
+                self.thread = threading.Thread(
+                    target=self.run, name='change-hub', daemon=True
+                )
+                self.thread.start()
+        self.listening.wait(timeout)
+
+    def stop(self):
+        """Stop listening and wait for the thread to close its connection"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.stopping.set()
+            thread.join()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                self.listen()
+            except Exception:
+                logger.exception('Lost the change events connection')
+                self.stopping.wait(settings.EVENTS_RECONNECT_SECONDS)
+            finally:
+                self.listening.clear()
+                connections['default'].close()
+
+    def listen(self):
+        """Receive notifications until stopped or the connection fails"""
+        db = connections['default']
+        with db.cursor() as cursor:
+            cursor.execute('LISTEN %s' % CHANNEL)
+        with self.lock:
+            # Events sent while not listening are lost.
+            self.missed_through = 0
+            self.events.clear()
+        self.listening.set()
+
+        raw = db.connection
+        while not self.stopping.is_set():
+            if select.select([raw], [], [], 1)[0]:
+                raw.poll()
+                while raw.notifies:
+                    self.publish(raw.notifies.pop(0).payload)
+
+
+hub = ChangeHub(settings.EVENTS_BUFFER_SIZE, settings.EVENTS_MAX_STREAMS)
+
+
+def get_hub():
+    """Return the hub of this process, listening"""
+    hub.start()
+    return hub
+
+
+def format_event(event):
+    """Return an event in the text/event-stream format"""
+    if event['type'] == 'reset':
+        return 'event: reset\ndata: {}\n\n'
+    return 'id: %d\ndata: %s\n\n' % (event['id'], json.dumps({
+        'type': event['type'],
+        'action': event['action'],
+        'id': event['object'],
+    }))
+
+
+def stream(subscription, heartbeat, duration):
+    """Yield a subscription's events for `duration` seconds
+
+    A comment is sent when no event came for `heartbeat` seconds, which
+    keeps proxies from closing the connection. Once the time is up, the
+    client reconnects with the id of the last event it got.
+    """
+    deadline = time.monotonic() + duration
+    try:
+        # Reconnect quickly when the stream ends.
+        yield 'retry: 1000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = subscription.get(min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+            else:
+                yield format_event(event)
+    finally:
+        subscription.close()
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Accept text/event-stream requests, and render their errors"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ('event: error\ndata: %s\n\n' % json.dumps(data)).encode()
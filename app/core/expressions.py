@@ -0,0 +1,38 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Expression, F, IntegerField, Subquery
+
+
+class ArrayAdd(Expression):
+    """Add a constant to every item of an integer array column"""
+
+    def __init__(self, field, deltas, output_field=None):
+        super().__init__(output_field=output_field)
+        self.expression = F(field) if isinstance(field, str) else field
+        self.deltas = [int(delta) for delta in deltas]
+
+    def get_source_expressions(self):
+        return [self.expression]
+
+    def set_source_expressions(self, exprs):
+        self.expression, = exprs
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.expression)
+        items = [
+            'COALESCE((%s)[%d], 0) + %d' % (sql, index, delta)
+            for index, delta in enumerate(self.deltas, start=1)
+        ]
+        return (
+            'ARRAY[%s]::integer[]' % ', '.join(items),
+            params * len(items)
+        )
+
+
+class ArraySubquery(Subquery):
+    """Collect the integer column returned by a subquery into an array"""
+    template = 'ARRAY(%(subquery)s)'
+
+    def __init__(self, queryset, output_field=None, **extra):
+        if output_field is None:
+            output_field = ArrayField(IntegerField())
+        super().__init__(queryset, output_field=output_field, **extra)
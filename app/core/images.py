@@ -0,0 +1,111 @@
+"""
+Content-addressed storage of recipe images and their renditions.
+
+An upload is stored under the SHA-256 of its bytes, so identical images are
+kept once and a stored file never changes: rendition URLs embed the digest
+and can be cached forever. Renditions are JPEGs fitting a square of one of
+`RECIPE_IMAGE_SIZES`, made only by a background job after the upload; a
+rendition requested before the job ran is not found yet.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+def _originals_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'recipe', 'originals')
+
+
+def original_path(digest):
+    """Return where the uploaded image with the given digest is stored"""
+    return os.path.join(_originals_dir(), digest[:2], digest)
+
+
+def rendition_path(digest, size):
+    """Return where a rendition of an uploaded image is stored"""
+    return os.path.join(
+        settings.MEDIA_ROOT, 'recipe', 'renditions', size, digest[:2],
+        digest + '.jpg'
+    )
+
+
+def _temporary_file(directory):
+    """Open a temporary file in a directory, to be renamed into place"""
+    os.makedirs(directory, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=directory, suffix='.part')
+    return os.fdopen(fd, 'wb'), temp
+
+
+def _check_image(path):
+    """Raise ValueError unless the file is an image we accept"""
+    try:
+        with Image.open(path) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValueError(
+                    'Upload a JPEG, PNG or WebP image.'
+                )
+            if image.width * image.height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                raise ValueError('The image has too many pixels.')
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValueError('Upload a valid image.')
+
+
+def store_original(upload):
+    """Store an uploaded file chunk by chunk and return its digest"""
+    if upload.size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise ValueError(
+            'The image is larger than %d bytes.'
+            % settings.RECIPE_IMAGE_MAX_BYTES
+        )
+
+    digest = hashlib.sha256()
+    out, temp = _temporary_file(_originals_dir())
+    try:
+        with out:
+            for chunk in upload.chunks():
+                digest.update(chunk)
+                out.write(chunk)
+        _check_image(temp)
+
+        path = original_path(digest.hexdigest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+    return digest.hexdigest()
+
+
+def make_rendition(digest, size):
+    """Create a rendition of a stored image unless it exists; return it"""
+    path = rendition_path(digest, size)
+    if os.path.exists(path):
+        return path
+
+    width = settings.RECIPE_IMAGE_SIZES[size]
+    with Image.open(original_path(digest)) as image:
+        # Lets the JPEG decoder downscale while decoding.
+        image.draft('RGB', (width, width))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((width, width), Image.LANCZOS)
+
+    out, temp = _temporary_file(os.path.dirname(path))
+    try:
+        with out:
+            image.save(out, 'JPEG', quality=85, optimize=True)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+    return path
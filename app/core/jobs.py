@@ -0,0 +1,119 @@
+"""
+Background jobs stored in the database, with no broker to run.
+
+Jobs are rows of `core.models.Job`. Workers claim them with
+`SELECT ... FOR UPDATE SKIP LOCKED`, so any number of workers can poll the
+table without handing out a job twice or waiting on each other's locks. The
+claim is committed before the job runs; a job whose worker died is claimed
+again once it has been running for `JOB_TIMEOUT_SECONDS`.
+"""
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Job
+
+
+_registry = {}
+
+
+def job(name):
+    """Register the decorated function as the handler of a job name"""
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def enqueue(name, user=None, run_at=None, max_attempts=3, **payload):
+    """Queue a job; workers see it once the current transaction commits"""
+    if name not in _registry:
+        raise LookupError('No job registered as %r' % name)
+
+    return Job.objects.create(
+        name=name,
+        user=user,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def retry_delay(attempts):
+    """Return the seconds to wait before retrying after a failed attempt"""
+    delay = min(
+        settings.JOB_RETRY_DELAY_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY_SECONDS,
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim():
+    """Lock, mark as running and return the next due job, if any"""
+    now = timezone.now()
+    lost = now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True) \
+            .filter(
+                Q(status=Job.QUEUED, run_at__lte=now)
+                | Q(status=Job.RUNNING, started_at__lt=lost)
+            ) \
+            .order_by('run_at', 'id') \
+            .first()
+        if job is None:
+            return None
+
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = now
+        job.save(update_fields=['status', 'attempts', 'started_at'])
+
+    return job
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome; return whether it passed"""
+    handler = _registry.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError('No job registered as %r' % job.name)
+        if job.attempts > job.max_attempts:
+            raise TimeoutError('Lost while running the last attempt')
+        result = handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=[
+            'status', 'run_at', 'finished_at', 'last_error'
+        ])
+        return False
+
+    job.status = Job.SUCCEEDED
+    job.result = result
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'finished_at'])
+    return True
+
+
+def run_pending():
+    """Run due jobs until none is left; return how many were run"""
+    count = 0
+    job = claim()
+    while job is not None:
+        run_job(job)
+        count += 1
+        job = claim()
+
+    return count
@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.memory import bytes_per_row, is_superlinear, peak_allocation
+from core.models import Ingredient, Recipe, Tag
+from recipe import views
+from user.views import BootstrapView
+
+
+ENDPOINTS = (
+    ('recipe list', views.RecipeViewSet.as_view({'get': 'list'})),
+    ('tag list', views.TagViewSet.as_view({'get': 'list'})),
+    ('ingredient list', views.IngredientViewSet.as_view({'get': 'list'})),
+    ('bootstrap', BootstrapView.as_view()),
+)
+
+
+class Command(BaseCommand):
+    """Django command to measure the peak memory of large list requests"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100,1000,5000',
+            help='Comma separated numbers of recipes, tags and ingredients.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.5,
+            help='Most the memory per row may grow from the smallest sizes.'
+        )
+        parser.add_argument(
+            '--ceiling', type=int, default=settings.MEMORY_CEILING_BYTES,
+            help='Most memory a single request may allocate, in bytes.'
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        peaks = {name: {} for name, _ in ENDPOINTS}
+
+        # Everything created for the benchmark is rolled back. The requests
+        # are made up, so are served whatever the allowed hosts.
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']):
+            user = get_user_model().objects.create_user(
+                'memory-benchmark@londonappdev.com'
+            )
+            for size in sizes:
+                self.grow(user, size)
+                for name, view in ENDPOINTS:
+                    peaks[name][size] = self.measure(view, user)
+                    self.stdout.write(
+                        '%-16s %7d rows  peak %11d bytes  %8.0f bytes/row' % (
+                            name, size, peaks[name][size],
+                            peaks[name][size] / size
+                        )
+                    )
+            transaction.set_rollback(True)
+
+        failures = []
+        for name, _ in ENDPOINTS:
+            if is_superlinear(peaks[name], options['tolerance']):
+                failures.append(
+                    '%s grows super-linearly: %s bytes per extra row' % (
+                        name, ', '.join(
+                            '%.0f' % slope
+                            for slope in bytes_per_row(peaks[name])
+                        )
+                    )
+                )
+            peak = max(peaks[name].values())
+            if peak > options['ceiling']:
+                failures.append('%s peaks at %d bytes, over %d' % (
+                    name, peak, options['ceiling']
+                ))
+        if failures:
+            raise CommandError('\n'.join(failures))
+
+    def grow(self, user, size):
+        """Give the user `size` recipes, tags and ingredients"""
+        for model in (Tag, Ingredient):
+            count = model.objects.filter(user=user).count()
+            model.objects.bulk_create(
+                model(user=user, name='%s %d' % (model.__name__, i))
+                for i in range(count, size)
+            )
+
+        count = Recipe.objects.filter(user=user).count()
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user, title='Recipe %d' % i,
+                time_minute=5 + i % 90, price=1 + i % 40,
+            )
+            for i in range(count, size)
+        )
+        tags = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        ingredients = list(
+            Ingredient.objects.filter(user=user).values_list('id', flat=True)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[i])
+            for recipe in recipes for i in range(recipe.id % 3)
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe_id=recipe.id, ingredient_id=ingredients[-i]
+            )
+            for recipe in recipes for i in range(1, 1 + recipe.id % 5)
+        )
+
+    def measure(self, view, user):
+        """Return the peak allocation of a request rendered by `view`"""
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=user)
+
+        def respond():
+            view(request).render()
+
+        # The first request also fills caches kept for the process.
+        respond()
+        return peak_allocation(respond)
@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core import throttling
+
+
+class BenchmarkThrottle(throttling.TokenBucketThrottle):
+    """Throttle with a rate no benchmark request reaches"""
+    scope = 'benchmark'
+    store = None
+
+    def get_rate(self, scope):
+        return '1000000000/s'
+
+    def get_store(self):
+        return self.store
+
+
+class PingView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        return Response({'status': 'ok'})
+
+
+class Command(BaseCommand):
+    """Django command to time the overhead of throttling a request"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=20000,
+            help='Number of timed requests per scenario.'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=1000,
+            help='Number of distinct client addresses.'
+        )
+        parser.add_argument(
+            '--cache', default='default',
+            help='Cache alias timed as the shared bucket store.'
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = [
+            factory.get('/ping', REMOTE_ADDR='10.0.%d.%d' % divmod(i, 256))
+            for i in range(options['clients'])
+        ]
+        scenarios = (
+            ('no throttling', None),
+            ('local buckets', throttling.LocalBucketStore()),
+            ('cache buckets', throttling.CacheBucketStore(
+                caches[options['cache']]
+            )),
+        )
+
+        baseline = None
+        for name, store in scenarios:
+            throttle_classes = ()
+            if store is not None:
+                throttle_classes = (
+                    type('Throttle', (BenchmarkThrottle,), {'store': store}),
+                )
+            view = PingView.as_view(throttle_classes=throttle_classes)
+            timings = self.time_requests(view, requests, options['requests'])
+            mean = statistics.mean(timings)
+            if baseline is None:
+                baseline = mean
+
+            timings.sort()
+            self.stdout.write(
+                '%-14s mean %7.1fus  p99 %7.1fus  overhead %+6.1fus' % (
+                    name, mean, timings[int(len(timings) * 0.99) - 1],
+                    mean - baseline
+                )
+            )
+
+    def time_requests(self, view, requests, count):
+        """Return the microseconds taken by each of `count` requests"""
+        timings = []
+        for i in range(count):
+            request = requests[i % len(requests)]
+            started = time.perf_counter()
+            view(request)
+            timings.append((time.perf_counter() - started) * 1000000)
+
+        return timings
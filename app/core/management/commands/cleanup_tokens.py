@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import AuthToken
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired API tokens in batches"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of tokens deleted per statement.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to wait between batches.'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            # Each batch commits on its own, holding its locks briefly.
+            count = AuthToken.objects.delete_expired(options['batch_size'])
+            if not count:
+                break
+
+            total += count
+            if options['verbosity'] > 1:
+                self.stdout.write('Deleted %d tokens' % count)
+            time.sleep(options['pause'])
+
+        self.stdout.write(
+            self.style.SUCCESS('Deleted %d expired tokens' % total)
+        )
@@ -0,0 +1,110 @@
+import logging
+import random
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from core import outbox
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait after a database error, doubled up to the maximum while
+# the errors go on.
+ERROR_DELAY = 1.0
+MAX_ERROR_DELAY = 30.0
+
+
+def reconnect():
+    """Drop connections broken by a database restart or failover"""
+    # Not inside a transaction, which closing would break (as in tests).
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """Django command to deliver the outbox to the webhooks"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help='Most events claimed and sent to each webhook at once.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of batches delivered at the same time.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait before looking again for due events.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no event is due instead of waiting for more.'
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.counts = {'sent': 0, 'failed': 0}
+        previous = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        args = (
+            options['batch_size'], options['poll_interval'], options['burst']
+        )
+
+        try:
+            if options['concurrency'] == 1:
+                self.work(*args)
+            else:
+                threads = [
+                    threading.Thread(target=self.work_in_thread, args=args)
+                    for _ in range(options['concurrency'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Sent %(sent)d events, %(failed)d failed' % self.counts
+        ))
+
+    def stop(self, signum, frame):
+        """Finish the batches being sent, then exit"""
+        self.stdout.write('Stopping after the batches being sent ...')
+        self.stopping.set()
+
+    def work_in_thread(self, batch_size, poll_interval, burst):
+        try:
+            self.work(batch_size, poll_interval, burst)
+        finally:
+            connection.close()
+
+    def work(self, batch_size, poll_interval, burst):
+        delay = ERROR_DELAY
+        while not self.stopping.is_set():
+            reconnect()
+            try:
+                counts = outbox.dispatch(batch_size)
+            except DatabaseError:
+                logger.exception('Database error while sending the outbox')
+                self.stopping.wait(delay / 2 + random.uniform(0, delay / 2))
+                delay = min(delay * 2, MAX_ERROR_DELAY)
+                continue
+
+            delay = ERROR_DELAY
+            with self.lock:
+                for key, count in counts.items():
+                    self.counts[key] += count
+            if not any(counts.values()):
+                if burst:
+                    return
+                self.stopping.wait(poll_interval)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.partitioning import orphaned_references, partition_recipe_tables
+
+
+class Command(BaseCommand):
+    """Django command to hash partition the recipe tables of a database"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=settings.RECIPE_PARTITIONS,
+            help='Number of partitions, RECIPE_PARTITIONS by default.'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only look for rows referencing missing recipes.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            if options['partitions'] < 2:
+                raise CommandError('Use at least 2 partitions')
+
+            partition_recipe_tables(
+                options['partitions'], log=self.stdout.write
+            )
+            self.stdout.write(self.style.SUCCESS('Recipe tables partitioned'))
+
+        orphans = orphaned_references()
+        if orphans:
+            raise CommandError('Rows referencing missing recipes: %s' % (
+                ', '.join('%s (%d)' % item for item in sorted(orphans.items()))
+            ))
+        self.stdout.write('No rows reference missing recipes')
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.purge import purge_user
+
+
+class Command(BaseCommand):
+    """Django command to delete the accounts flagged for purging"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows deleted per statement.'
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        user_ids = get_user_model().objects \
+            .filter(purge_requested_at__isnull=False) \
+            .order_by('purge_requested_at') \
+            .values_list('id', flat=True)
+
+        total = 0
+        for user_id in user_ids:
+            self.stdout.write('Purging user %d ...' % user_id)
+            purge_user(
+                user_id,
+                batch_size=options['batch_size'],
+                progress=self.report_progress,
+            )
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS('Purged %d users' % total))
+
+    def report_progress(self, table, count):
+        if self.verbosity > 1:
+            self.stdout.write('Deleted %d rows from %s' % (count, table))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe
+from core.similarity import refresh_signatures
+
+
+class Command(BaseCommand):
+    """Django command to recompute the similarity signature of every recipe"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes recomputed per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = Recipe.objects.order_by('id') \
+            .values_list('id', flat=True)
+
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(
+                recipe_ids.filter(id__gt=last_id)[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            with transaction.atomic():
+                refresh_signatures(batch)
+            last_id = batch[-1]
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt the similarity index of %d recipes' % total
+        ))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.models import UserStats
+
+
+class Command(BaseCommand):
+    """Django command to recount the stats of every user from scratch"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of users recounted per query.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = get_user_model().objects.order_by('id') \
+            .values_list('id', flat=True)
+
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(user_ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            UserStats.objects.recompute(batch)
+            last_id = batch[-1]
+            total += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS('Recomputed stats of %d users' % total)
+        )
@@ -0,0 +1,108 @@
+import logging
+import random
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from core import jobs
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait after a database error, doubled up to the maximum while
+# the errors go on.
+ERROR_DELAY = 1.0
+MAX_ERROR_DELAY = 30.0
+
+
+def reconnect():
+    """Drop connections broken by a database restart or failover"""
+    # Not inside a transaction, which closing would break (as in tests).
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """Django command to run queued background jobs"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of jobs run at the same time, one thread each.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait before looking again for due jobs.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due instead of waiting for more.'
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.counts = {'passed': 0, 'failed': 0}
+        previous = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+        try:
+            if options['concurrency'] == 1:
+                self.work(options['poll_interval'], options['burst'])
+            else:
+                threads = [
+                    threading.Thread(
+                        target=self.work_in_thread,
+                        args=(options['poll_interval'], options['burst']),
+                    )
+                    for _ in range(options['concurrency'])
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Ran %(passed)d jobs, %(failed)d failed' % self.counts
+        ))
+
+    def stop(self, signum, frame):
+        """Finish the running jobs, then exit"""
+        self.stdout.write('Stopping after the running jobs ...')
+        self.stopping.set()
+
+    def work_in_thread(self, poll_interval, burst):
+        try:
+            self.work(poll_interval, burst)
+        finally:
+            connection.close()
+
+    def work(self, poll_interval, burst):
+        delay = ERROR_DELAY
+        while not self.stopping.is_set():
+            reconnect()
+            try:
+                job = jobs.claim()
+                if job is None:
+                    if burst:
+                        return
+                    self.stopping.wait(poll_interval)
+                    continue
+
+                passed = jobs.run_job(job)
+            except DatabaseError:
+                logger.exception('Database error while running jobs')
+                self.stopping.wait(delay / 2 + random.uniform(0, delay / 2))
+                delay = min(delay * 2, MAX_ERROR_DELAY)
+                continue
+
+            delay = ERROR_DELAY
+            with self.lock:
+                self.counts['passed' if passed else 'failed'] += 1
+            self.stdout.write('%s %s' % (job, job.status))
@@ -0,0 +1,49 @@
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    """Django command to report where the start of a worker spends time"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=25,
+            help='Number of slowest imports to list.'
+        )
+        parser.add_argument(
+            '--sort', choices=('cumulative', 'self'), default='cumulative',
+            help='Rank imports including or excluding their own imports.'
+        )
+        parser.add_argument(
+            '--db', action='store_true',
+            help='Also time connecting to the databases.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            phases, imports = startup.profile(
+                settings.SETTINGS_MODULE, connect_db=options['db']
+            )
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(
+                'The project failed to start:\n%s' % exc.stderr[-2000:]
+            )
+
+        self.stdout.write('Settings: %s' % settings.SETTINGS_MODULE)
+        for name, seconds in phases.items():
+            self.stdout.write('%-12s %9.1f ms' % (name, seconds * 1000))
+        self.stdout.write('%d modules imported in %.1f ms' % (
+            len(imports), sum(self_us for _, self_us, _ in imports) / 1000
+        ))
+
+        column = 1 if options['sort'] == 'self' else 2
+        slowest = sorted(imports, key=lambda row: -row[column])
+        self.stdout.write('\n%9s %9s  module' % ('self ms', 'total ms'))
+        for module, self_us, cumulative_us in slowest[:options['top']]:
+            self.stdout.write('%9.1f %9.1f  %s' % (
+                self_us / 1000, cumulative_us / 1000, module
+            ))
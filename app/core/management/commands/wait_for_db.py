@@ -1,21 +1,57 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to wait for.'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60.0,
+            help='Give up after this many seconds.'
+        )
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.1,
+            help='Delay before the first retry, doubled on every attempt.'
+        )
+        parser.add_argument(
+            '--max-delay', type=float, default=5.0,
+            help='Upper bound for the delay between two attempts.'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database ...')
-        db_conn = None
-        while not db_conn:
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        delay = options['initial_delay']
+
+        while True:
             try:
-                db_conn = connections['default']
+                connection.ensure_connection()
+                break
             except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        'Database unavailable after %s seconds'
+                        % options['timeout']
+                    )
+
+                # Half fixed, half random so restarting containers don't
+                # hammer the database in lockstep.
+                wait = min(delay / 2 + random.uniform(0, delay / 2), remaining)
+                self.stdout.write(
+                    'Database unavailable, waiting %.2f seconds...' % wait
+                )
+                time.sleep(wait)
+                delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,40 @@
+"""
+Peak memory of requests, measured with tracemalloc.
+
+An endpoint serving a collection should need a fixed amount of memory plus
+about the same amount per row at any size. The extra memory per extra row
+is measured between consecutive sizes; if it keeps rising, the endpoint
+holds something growing faster than its rows and will eventually get its
+worker killed on a large account.
+"""
+import tracemalloc
+
+
+def peak_allocation(func):
+    """Call `func` and return the most memory it had allocated, in bytes"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bytes_per_row(peaks):
+    """Return the extra bytes per extra row between consecutive sizes
+
+    `peaks` maps collection sizes to the peak allocation at that size.
+    """
+    sizes = sorted(peaks)
+    return [
+        (peaks[high] - peaks[low]) / (high - low)
+        for low, high in zip(sizes, sizes[1:])
+    ]
+
+
+def is_superlinear(peaks, tolerance=1.5):
+    """Return whether the bytes per row grew over `tolerance` times"""
+    slopes = bytes_per_row(peaks)
+    if len(slopes) < 2:
+        return False
+    return slopes[-1] > max(slopes[0], 0) * tolerance
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.routers import allow_replica_reads
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Decide per request whether reads may be served by a replica.
+
+    Unsafe requests always use the primary. Those that succeed pin the
+    client to it for `REPLICA_PIN_SECONDS`, so data it has just written is
+    visible on its next reads even if the replicas lag behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_key = self.get_pin_key(request)
+        is_safe = request.method in SAFE_METHODS
+
+        allow_replica_reads(
+            is_safe and bool(settings.DATABASE_REPLICAS) and
+            not (pin_key and cache.get(pin_key))
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            allow_replica_reads(False)
+
+        if pin_key and not is_safe and response.status_code < 400:
+            cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+
+        return response
+
+    def get_pin_key(self, request):
+        """Return the cache key identifying the client, if any"""
+        credentials = request.META.get('HTTP_AUTHORIZATION')
+        if not credentials:
+            return None
+
+        digest = hashlib.sha1(credentials.encode()).hexdigest()
+        return 'replica-pin:%s' % digest
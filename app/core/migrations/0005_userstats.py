@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BACKFILL_USER_STATS = """
+INSERT INTO core_userstats (user_id, recipe_count, tag_count, ingredient_count)
+SELECT u.id,
+       (SELECT COUNT(*) FROM core_recipe r WHERE r.user_id = u.id),
+       (SELECT COUNT(*) FROM core_tag t WHERE t.user_id = u.id),
+       (SELECT COUNT(*) FROM core_ingredient i WHERE i.user_id = u.id)
+FROM core_user u
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_recipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('tag_count', models.PositiveIntegerField(default=0)),
+                ('ingredient_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL_USER_STATS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:05
+
+import core.models
+import django.contrib.postgres.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_recipe_stats(apps, schema_editor):
+    bounds = [None] + list(settings.RECIPE_TIME_BUCKETS) + [None]
+    buckets = []
+    for low, high in zip(bounds, bounds[1:]):
+        conditions = ['TRUE']
+        if low is not None:
+            conditions.append('r.time_minute > %d' % low)
+        if high is not None:
+            conditions.append('r.time_minute <= %d' % high)
+        buckets.append('COUNT(*) FILTER (WHERE %s)' % ' AND '.join(conditions))
+
+    schema_editor.execute("""
+        UPDATE core_userstats s
+        SET price_total = a.price_total, price_min = a.price_min,
+            price_max = a.price_max, time_histogram = a.time_histogram
+        FROM (
+            SELECT r.user_id, SUM(r.price) AS price_total,
+                   MIN(r.price) AS price_min, MAX(r.price) AS price_max,
+                   ARRAY[%s]::integer[] AS time_histogram
+            FROM core_recipe r
+            GROUP BY r.user_id
+        ) a
+        WHERE s.user_id = a.user_id
+    """ % ', '.join(buckets))
+
+    for model in ('tag', 'ingredient'):
+        schema_editor.execute("""
+            UPDATE core_{model} m SET recipe_count = u.total
+            FROM (
+                SELECT {model}_id, COUNT(*) AS total
+                FROM core_recipe_{model}s GROUP BY {model}_id
+            ) u
+            WHERE m.id = u.{model}_id
+        """.format(model=model))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='price_max',
+            field=models.DecimalField(decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='price_min',
+            field=models.DecimalField(decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='price_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='time_histogram',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=core.models.empty_time_histogram, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count'], name='core_ingredient_user_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count'], name='core_tag_user_usage_idx'),
+        ),
+        migrations.RunPython(backfill_recipe_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:07
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+BACKFILL_INGREDIENT_IDS = """
+UPDATE core_recipe r SET ingredient_ids = ARRAY(
+    SELECT ingredient_id FROM core_recipe_ingredients
+    WHERE recipe_id = r.id
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(BACKFILL_INGREDIENT_IDS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ingredient_ids'], name='core_recipe_ingredients_gin'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:46
+
+from django.conf import settings
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_ingredient_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSignature',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.Recipe')),
+                ('minhash', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+                ('bands', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipesignature',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['bands'], name='core_recipesig_bands_gin'),
+        ),
+    ]
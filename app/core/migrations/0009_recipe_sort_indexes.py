@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipesignature'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'price', 'id'], name='core_recipe_user_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'time_minute', 'id'], name='core_recipe_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'title', 'id'], name='core_recipe_user_title_idx'),
+        ),
+    ]
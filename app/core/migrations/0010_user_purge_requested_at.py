@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='purge_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
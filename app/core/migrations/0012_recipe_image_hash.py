@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+# The admin searches `^` fields with UPPER(column) LIKE UPPER('prefix%'),
+# which only an index on the same expression with text_pattern_ops serves.
+# Built concurrently so the tables stay writable, hence not atomic.
+SEARCH_INDEXES = [
+    ('core_user_email_upper_idx', 'core_user', 'email'),
+    ('core_user_name_upper_idx', 'core_user', 'name'),
+    ('core_recipe_title_upper_idx', 'core_recipe', 'title'),
+    ('core_tag_name_upper_idx', 'core_tag', 'name'),
+    ('core_ingredient_name_upper_idx', 'core_ingredient', 'name'),
+]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_recipe_image_hash'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS %s '
+            'ON %s (UPPER(%s::text) text_pattern_ops)' % index,
+            'DROP INDEX CONCURRENTLY IF EXISTS %s' % index[0],
+        )
+        for index in SEARCH_INDEXES
+    ]
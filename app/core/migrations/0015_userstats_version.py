@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_partition_recipe_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
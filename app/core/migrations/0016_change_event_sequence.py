@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_userstats_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE core_change_event_id_seq',
+            'DROP SEQUENCE core_change_event_id_seq',
+        ),
+    ]
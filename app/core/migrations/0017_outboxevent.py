@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_change_event_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('user_id', models.IntegerField()),
+                ('type', models.CharField(max_length=32)),
+                ('action', models.CharField(max_length=16)),
+                ('object_id', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(status='pending'), fields=['next_attempt_at', 'id'], name='core_outbox_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='share_slug',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(share_slug__isnull=False), fields=['share_slug'], name='core_recipe_share_slug_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def copy_drf_tokens(apps, schema_editor):
+    # Tokens issued before keep working, expiring like new ones.
+    schema_editor.execute(
+        'INSERT INTO core_authtoken (key, user_id, device, created_at,'
+        '                            expires_at)'
+        " SELECT key, user_id, '', created,"
+        "        now() + %s * interval '1 second'"
+        ' FROM authtoken_token',
+        [settings.AUTH_TOKEN_TTL_SECONDS],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0002_auto_20160226_1747'),
+        ('core', '0018_recipe_share_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('device', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_drf_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+# Recipes small enough to be cookable from any pantry are found by their
+# ingredient count, which only an index on the same expression serves.
+# Built concurrently so the table stays writable, hence not atomic, unless
+# the table is partitioned: those cannot build indexes concurrently.
+def create_size_index(apps, schema_editor):
+    from core.partitioning import is_partitioned
+    with schema_editor.connection.cursor() as cursor:
+        concurrently = not is_partitioned(cursor, 'core_recipe')
+        cursor.execute(
+            'CREATE INDEX %s IF NOT EXISTS core_recipe_size_idx '
+            'ON core_recipe (user_id, cardinality(ingredient_ids))'
+            % ('CONCURRENTLY' if concurrently else '')
+        )
+
+
+def drop_size_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_size_idx')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0019_authtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_size_index, drop_size_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_recipe_size_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(status='pending'), fields=['url', 'type', 'object_id', 'id'], name='core_outbox_object_idx'),
+        ),
+    ]
@@ -1,7 +1,22 @@
-from django.db import models
+import secrets
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, Func, Max, Min, OuterRef, Q, \
+    Subquery, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.conf import settings
+from django.utils import timezone
+
+from core.expressions import ArrayAdd, ArraySubquery
 
 
 class UserManager(BaseUserManager):
@@ -34,12 +49,221 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    purge_requested_at = models.DateTimeField(null=True, blank=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
+def time_bucket(time_minute):
+    """Return the index of the histogram bucket holding a cooking time"""
+    return bisect_left(settings.RECIPE_TIME_BUCKETS, time_minute)
+
+
+def empty_time_histogram():
+    """Return a histogram with every cooking time bucket empty"""
+    return [0] * (len(settings.RECIPE_TIME_BUCKETS) + 1)
+
+
+def add_to_counter(field, delta):
+    """Return an expression adding `delta` to a counter, but not below 0"""
+    if delta >= 0:
+        return F(field) + delta
+    # A counter which drifted, say after rows were deleted with raw SQL,
+    # must not fail the CHECK constraint of its positive field.
+    return Greatest(F(field) + delta, 0)
+
+
+class UserStatsManager(models.Manager):
+
+    def adjust(self, user_id, **deltas):
+        """Add the given deltas to a user's counters in a single UPDATE"""
+        changes = {
+            field: add_to_counter(field, delta)
+            for field, delta in deltas.items() if delta
+        }
+        if not changes:
+            return
+
+        changes['version'] = F('version') + 1
+
+        updated = self.filter(user_id=user_id).update(**changes)
+        if not updated and any(delta > 0 for delta in deltas.values()):
+            # The row is missing: recount from scratch, which also covers
+            # the objects whose creation triggered this call.
+            self.recompute([user_id])
+
+    def touch(self, user_id):
+        """Note that some data of a user changed, see `UserStats.version`"""
+        self.filter(user_id=user_id).update(version=F('version') + 1)
+
+    def record(self, model, user_id, added=(), removed=()):
+        """Account for objects of a user being added and removed"""
+        if model is Recipe:
+            self.record_recipes(user_id, added, removed)
+        else:
+            self.adjust(
+                user_id, **{model.counter_field: len(added) - len(removed)}
+            )
+
+    def record_recipes(self, user_id, added=(), removed=()):
+        """Update the counters and aggregates of a user's recipes"""
+        histogram = empty_time_histogram()
+        price_delta = Decimal(0)
+        for recipe, sign in [(r, 1) for r in added] + \
+                [(r, -1) for r in removed]:
+            histogram[time_bucket(recipe.time_minute)] += sign
+            price_delta += sign * Decimal(str(recipe.price))
+
+        changes = {
+            'recipe_count': add_to_counter(
+                'recipe_count', len(added) - len(removed)
+            ),
+            'price_total': F('price_total') + price_delta,
+            'time_histogram': ArrayAdd('time_histogram', histogram),
+            'version': F('version') + 1,
+        }
+        if added:
+            prices = [Decimal(str(recipe.price)) for recipe in added]
+            changes['price_min'] = Least('price_min', Value(min(prices)))
+            changes['price_max'] = Greatest('price_max', Value(max(prices)))
+
+        updated = self.filter(user_id=user_id).update(**changes)
+        if not updated:
+            if added:
+                self.recompute([user_id])
+            return
+
+        if removed:
+            # Only rescan the recipes when a removed price was an extreme.
+            prices = [Decimal(str(recipe.price)) for recipe in removed]
+            recipes = Recipe.objects.filter(user_id=user_id).order_by()
+            self.filter(user_id=user_id).filter(
+                Q(price_min__gte=min(prices)) | Q(price_max__lte=max(prices))
+            ).update(
+                price_min=Subquery(
+                    recipes.order_by('price').values('price')[:1]
+                ),
+                price_max=Subquery(
+                    recipes.order_by('-price').values('price')[:1]
+                ),
+            )
+
+    def recompute(self, user_ids):
+        """Recount the counters and aggregates of the given users"""
+        self.bulk_create(
+            [self.model(user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+
+        buckets = [None] + list(settings.RECIPE_TIME_BUCKETS) + [None]
+        bucket_counts = {}
+        for index, (low, high) in enumerate(zip(buckets, buckets[1:])):
+            condition = Q()
+            if low is not None:
+                condition &= Q(time_minute__gt=low)
+            if high is not None:
+                condition &= Q(time_minute__lte=high)
+            bucket_counts['bucket_%d' % index] = Count('id', filter=condition)
+
+        stats = defaultdict(lambda: {
+            'recipe_count': 0, 'tag_count': 0, 'ingredient_count': 0,
+            'price_total': 0, 'price_min': None, 'price_max': None,
+            'time_histogram': empty_time_histogram(),
+        })
+        recipes = Recipe.objects.filter(user_id__in=user_ids).order_by() \
+            .values('user_id').annotate(
+                total=Count('id'),
+                price_total=Sum('price'),
+                price_min=Min('price'),
+                price_max=Max('price'),
+                **bucket_counts
+            )
+        for row in recipes:
+            stats[row['user_id']].update(
+                recipe_count=row['total'],
+                price_total=row['price_total'],
+                price_min=row['price_min'],
+                price_max=row['price_max'],
+                time_histogram=[
+                    row[name] for name in sorted(bucket_counts)
+                ],
+            )
+
+        for model in (Tag, Ingredient):
+            counts = model.objects.filter(user_id__in=user_ids).order_by() \
+                .values('user_id').annotate(total=Count('id'))
+            for row in counts:
+                stats[row['user_id']][model.counter_field] = row['total']
+
+            usage = model.recipe_set.through.objects \
+                .filter(**{model._meta.model_name: OuterRef('pk')}) \
+                .order_by().values(model._meta.model_name) \
+                .annotate(total=Count('id')).values('total')
+            model.objects.filter(user_id__in=user_ids).update(
+                recipe_count=Coalesce(Subquery(usage), Value(0))
+            )
+
+        for user_id in user_ids:
+            self.filter(user_id=user_id).update(**stats[user_id])
+
+
+class UserStats(models.Model):
+    """Counters and aggregates of what a user owns, maintained on writes"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    tag_count = models.PositiveIntegerField(default=0)
+    ingredient_count = models.PositiveIntegerField(default=0)
+    price_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    price_min = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True
+    )
+    price_max = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True
+    )
+    time_histogram = ArrayField(
+        models.IntegerField(), default=empty_time_histogram
+    )
+    # Bumped on every change to the user's profile, recipes, tags or
+    # ingredients; ETags of the user's API responses are derived from it.
+    version = models.PositiveIntegerField(default=0)
+
+    objects = UserStatsManager()
+
+    @property
+    def price_average(self):
+        """Return the average price of the user's recipes"""
+        if not self.recipe_count:
+            return None
+
+        return (self.price_total / self.recipe_count).quantize(
+            Decimal('0.01')
+        )
+
+
+class UserOwnedQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Create objects in bulk and count them on their owners' stats"""
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            owners = defaultdict(list)
+            for obj in objs:
+                owners[obj.user_id].append(obj)
+            for user_id, created in owners.items():
+                UserStats.objects.record(self.model, user_id, added=created)
+
+        return objs
+
+
 class Tag(models.Model):
     """Tag to be used for recipe"""
     name = models.CharField(max_length=255)
@@ -48,6 +272,20 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    objects = UserOwnedQuerySet.as_manager()
+
+    counter_field = 'tag_count'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-recipe_count'],
+                name='core_tag_user_usage_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -60,10 +298,76 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    recipe_count = models.PositiveIntegerField(default=0)
+
+    objects = UserOwnedQuerySet.as_manager()
+
+    counter_field = 'ingredient_count'
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-recipe_count'],
+                name='core_ingredient_user_usage_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(UserOwnedQuerySet):
+
+    def cookable_with(self, ingredient_ids, max_missing=0):
+        """
+        Return recipes lacking at most `max_missing` of their ingredients
+        from `ingredient_ids`, annotated with `missing` and ordered by it.
+
+        Candidates share an ingredient with the pantry or are small enough
+        to match anyway. The two are separate queries joined with UNION, so
+        the GIN index on `ingredient_ids` answers the overlap and the index
+        on `(user_id, cardinality(ingredient_ids))` the small recipes; their
+        missing ingredients are then counted with array operations in SQL.
+        """
+        pantry = sorted(set(ingredient_ids))
+        max_missing = max(max_missing, 0)
+        missing = RawSQL(
+            'SELECT COUNT(*) FROM unnest(core_recipe.ingredient_ids) AS i '
+            'WHERE i <> ALL(%s::integer[])',
+            (pantry,),
+            output_field=models.IntegerField()
+        )
+        size = Func(
+            F('ingredient_ids'), function='cardinality',
+            output_field=models.IntegerField()
+        )
+        overlap = self.filter(ingredient_ids__overlap=pantry)
+        small = self.annotate(size=size).filter(size__lte=max_missing)
+        candidates = overlap.order_by().values('pk').union(
+            small.order_by().values('pk')
+        )
+        recipes = self.annotate(missing=missing).filter(
+            pk__in=candidates, missing__lte=max_missing
+        )
+
+        return recipes.order_by('missing', 'id')
+
+    def sync_ingredient_ids(self):
+        """Rebuild the denormalized ingredient ids of these recipes"""
+        ids = Recipe.ingredients.through.objects \
+            .filter(recipe=OuterRef('pk')).order_by().values('ingredient_id')
+        return self.update(ingredient_ids=ArraySubquery(ids))
+
+    def forget_ingredient(self, ingredient_id):
+        """Remove an ingredient from the denormalized ingredient ids"""
+        return self.filter(ingredient_ids__contains=[ingredient_id]).update(
+            ingredient_ids=Func(
+                F('ingredient_ids'), Value(ingredient_id),
+                function='array_remove'
+            )
+        )
+
+
 class Recipe(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -73,8 +377,274 @@ class Recipe(models.Model):
     time_minute = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
+    # SHA-256 of the uploaded image, see core.images.
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
 
+    # Copy of the ids in `ingredients`, kept in sync by signals and indexed
+    # for pantry queries. It is never written by `save()`.
+    ingredient_ids = ArrayField(
+        models.IntegerField(), default=list, editable=False
+    )
+    # Unguessable key of the public link of a shared recipe. 128 random bits
+    # cannot collide in practice; a unique constraint could not be kept on
+    # a table partitioned by user.
+    share_slug = models.CharField(
+        max_length=32, null=True, blank=True, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_field = 'recipe_count'
+    # Left out of full saves, so an edit racing with their own updates
+    # cannot write back a stale value.
+    separately_saved_fields = ('ingredient_ids', 'share_slug')
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=['ingredient_ids'],
+                name='core_recipe_ingredients_gin',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minute', 'id'],
+                name='core_recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_recipe_user_title_idx',
+            ),
+            models.Index(
+                fields=['share_slug'],
+                name='core_recipe_share_slug_idx',
+                condition=Q(share_slug__isnull=False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        recipe = super().from_db(db, field_names, values)
+        # Remember what was loaded so updates can adjust the user's stats.
+        recipe._loaded_values = dict(zip(field_names, values))
+        return recipe
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.separately_saved_fields
+            ]
+
+        super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        # Updating by user and id lets a partitioned table be pruned to the
+        # user's partition; a recipe never changes hands.
+        return super()._do_update(
+            base_qs.filter(user_id=self.user_id), using, pk_val, values,
+            update_fields, forced_update
+        )
+
+    @property
+    def is_shared(self):
+        return self.share_slug is not None
+
+    def share(self):
+        """Give the recipe a public link, unless it already has one"""
+        if self.share_slug is None:
+            self.share_slug = secrets.token_urlsafe(16)
+            self.save(update_fields=['share_slug'])
+
+    def unshare(self):
+        """Remove the public link of the recipe"""
+        if self.share_slug is not None:
+            self.share_slug = None
+            self.save(update_fields=['share_slug'])
+
     def __str__(self):
         return self.title
+
+
+class RecipeSignature(models.Model):
+    """MinHash signature of a recipe's tags and ingredients"""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    minhash = ArrayField(models.BigIntegerField())
+    bands = ArrayField(models.BigIntegerField())
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['bands'], name='core_recipesig_bands_gin'),
+        ]
+
+
+class Job(models.Model):
+    """Background job run by the `run_jobs` worker"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+    )
+    name = models.CharField(max_length=255)
+    payload = JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    result = JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Only the jobs a worker may claim; finished jobs stay out.
+            models.Index(
+                fields=['run_at', 'id'],
+                name='core_job_pending_idx',
+                condition=Q(status__in=['queued', 'running']),
+            ),
+            models.Index(fields=['user', '-id'], name='core_job_user_idx'),
+        ]
+
+    def __str__(self):
+        return '%s #%s' % (self.name, self.pk)
+
+
+class OutboxEvent(models.Model):
+    """Change to a user's data waiting to be sent to a webhook"""
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (FAILED, 'Failed'),
+    )
+
+    url = models.URLField(max_length=500)
+    user_id = models.IntegerField()
+    type = models.CharField(max_length=32)
+    action = models.CharField(max_length=16)
+    object_id = models.IntegerField()
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Delivered events are deleted; failed ones stay out.
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                name='core_outbox_pending_idx',
+                condition=Q(status='pending'),
+            ),
+            models.Index(
+                fields=['url', 'type', 'object_id', 'id'],
+                name='core_outbox_object_idx',
+                condition=Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return '%s %s #%s' % (self.type, self.action, self.object_id)
+
+
+def token_ttl():
+    """Return how long a token stays valid after its last renewal"""
+    return timedelta(seconds=settings.AUTH_TOKEN_TTL_SECONDS)
+
+
+class AuthTokenManager(models.Manager):
+
+    def issue(self, user, device=''):
+        """Create a new token for one of a user's devices"""
+        now = timezone.now()
+        return self.create(
+            key=secrets.token_hex(20),
+            user=user,
+            device=device,
+            created_at=now,
+            expires_at=now + token_ttl(),
+        )
+
+    def delete_expired(self, batch_size):
+        """Delete up to `batch_size` expired tokens in one statement"""
+        expired = self.filter(expires_at__lte=timezone.now()) \
+            .values('key')[:batch_size]
+        deleted, _ = self.filter(key__in=expired).delete()
+        return deleted
+
+
+class AuthToken(models.Model):
+    """API token of one of a user's devices, valid until it expires"""
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens',
+    )
+    device = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    def renew(self):
+        """Push the expiry back after a use, writing at most once in a while
+
+        Tokens are renewed by up to AUTH_TOKEN_TTL_SECONDS from now, never
+        past AUTH_TOKEN_MAX_AGE_SECONDS after they were issued.
+        """
+        expires_at = min(
+            timezone.now() + token_ttl(),
+            self.created_at + timedelta(
+                seconds=settings.AUTH_TOKEN_MAX_AGE_SECONDS
+            ),
+        )
+        if expires_at - self.expires_at < timedelta(
+                seconds=settings.AUTH_TOKEN_RENEW_SECONDS):
+            return
+
+        AuthToken.objects.filter(pk=self.pk).update(expires_at=expires_at)
+        self.expires_at = expires_at
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return '%s of user %s' % (self.device or 'Token', self.user_id)
@@ -0,0 +1,170 @@
+"""
+Transactional outbox sending recipe, tag and ingredient changes to webhooks.
+
+Changes are written to `core.models.OutboxEvent` in the transaction of the
+write itself, one row per configured webhook, so a rolled back write is
+never announced and a committed one always is, without any HTTP call while
+serving the request. The `dispatch_outbox` command leases due events with
+`SELECT ... FOR UPDATE SKIP LOCKED`, keeps only the last change to each
+object, and POSTs them as one JSON batch per webhook. Delivered events are
+deleted; failed ones are retried with exponential backoff until
+`OUTBOX_MAX_ATTEMPTS`, then kept as failed.
+
+Events are claimed by object: only the oldest pending event of an object
+can be claimed, and it brings the later ones along. While it is leased or
+backing off, no dispatcher sends a newer change to the same object, so a
+webhook never receives an object's changes out of order.
+"""
+import hashlib
+import hmac
+import json
+import random
+import urllib.request
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from core.models import OutboxEvent
+
+
+def record(user_id, model, action, ids):
+    """Add changes to objects of a user to the outbox of every webhook"""
+    if not ids or not settings.OUTBOX_WEBHOOK_URLS:
+        return
+
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(
+            url=url, user_id=user_id, type=model._meta.model_name,
+            action=action, object_id=id,
+        )
+        for url in settings.OUTBOX_WEBHOOK_URLS for id in sorted(ids)
+    )
+
+
+def retry_delay(attempts):
+    """Return the seconds to wait before retrying after a failed attempt"""
+    delay = min(
+        settings.OUTBOX_RETRY_DELAY_SECONDS * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_DELAY_SECONDS,
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(batch_size):
+    """Lease and return the due events of up to `batch_size` objects"""
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(status=OutboxEvent.PENDING)
+    earlier = pending.filter(
+        url=OuterRef('url'), type=OuterRef('type'),
+        object_id=OuterRef('object_id'), pk__lt=OuterRef('pk'),
+    )
+    with transaction.atomic():
+        events = list(
+            pending.select_for_update(skip_locked=True)
+            .annotate(blocked=Exists(earlier))
+            .filter(next_attempt_at__lte=now, blocked=False)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if events:
+            # Newer events of these objects can only be claimed with them.
+            later = Q()
+            for event in events:
+                later |= Q(
+                    url=event.url, type=event.type,
+                    object_id=event.object_id, pk__gt=event.pk,
+                )
+            events += pending.select_for_update().filter(later)
+        # Leased events come back if the dispatcher dies delivering them.
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]) \
+            .update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(
+                    seconds=settings.OUTBOX_LEASE_SECONDS
+                ),
+            )
+    for event in events:
+        event.attempts += 1
+
+    return events
+
+
+def coalesce(events):
+    """Return the last event for each object, in the order they happened"""
+    latest = {}
+    for event in sorted(events, key=lambda event: event.pk):
+        latest.pop((event.type, event.object_id), None)
+        latest[event.type, event.object_id] = event
+    return list(latest.values())
+
+
+def post(url, events):
+    """POST a batch of events to a webhook; raise if it is not accepted"""
+    body = json.dumps({'events': [
+        {
+            'id': event.pk,
+            'type': event.type,
+            'action': event.action,
+            'object': event.object_id,
+            'user': event.user_id,
+            'created_at': event.created_at.isoformat(),
+        }
+        for event in events
+    ]}).encode()
+    headers = {'Content-Type': 'application/json'}
+    if settings.OUTBOX_WEBHOOK_SECRET:
+        headers['X-Outbox-Signature'] = 'sha256=' + hmac.new(
+            settings.OUTBOX_WEBHOOK_SECRET.encode(), body, hashlib.sha256
+        ).hexdigest()
+
+    request = urllib.request.Request(url, body, headers, method='POST')
+    # Statuses of 400 and above raise HTTPError.
+    with urllib.request.urlopen(
+        request, timeout=settings.OUTBOX_TIMEOUT_SECONDS
+    ) as response:
+        response.read()
+
+
+def fail(events, error):
+    """Schedule the retry of events a webhook did not accept"""
+    # Events of a batch are at different attempts: each is given up or
+    # delayed according to its own.
+    by_attempts = defaultdict(list)
+    for event in events:
+        by_attempts[event.attempts].append(event.pk)
+
+    for attempts, pks in by_attempts.items():
+        pending = OutboxEvent.objects.filter(pk__in=pks)
+        if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            pending.update(status=OutboxEvent.FAILED, last_error=error)
+        else:
+            pending.update(
+                next_attempt_at=timezone.now() + timedelta(
+                    seconds=retry_delay(attempts)
+                ),
+                last_error=error,
+            )
+
+
+def dispatch(batch_size):
+    """Deliver one batch of due events; return the events sent and failed"""
+    by_url = defaultdict(list)
+    for event in claim(batch_size):
+        by_url[event.url].append(event)
+
+    counts = {'sent': 0, 'failed': 0}
+    for url, events in by_url.items():
+        try:
+            post(url, coalesce(events))
+        except (OSError, ValueError) as exc:
+            fail(events, repr(exc))
+            counts['failed'] += len(events)
+        else:
+            OutboxEvent.objects.filter(pk__in=[e.pk for e in events]) \
+                .delete()
+            counts['sent'] += len(events)
+
+    return counts
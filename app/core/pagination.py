@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Return the planner's estimate of the rows a queryset returns"""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator counting large results from Postgres statistics.
+
+    When the planner expects at least `ADMIN_ESTIMATED_COUNT_THRESHOLD` rows,
+    its estimate is used instead of a COUNT(*) scanning all of them; smaller
+    results are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return self.object_list.count()
+
+        return estimate
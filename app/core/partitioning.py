@@ -0,0 +1,183 @@
+"""
+Hash partitioning of the recipe tables (Postgres 11+).
+
+`core_recipe` is partitioned on `user_id`, which every API query filters
+on, so each query reads one partition and its smaller indexes. The M2M
+through tables have no user column; they are partitioned on `recipe_id`,
+which every lookup from a recipe filters on.
+
+A partitioned table can only have unique constraints including its
+partition key, so `core_recipe`'s primary key becomes (id, user_id) and the
+foreign keys referencing `core_recipe` are dropped. Django emulates
+`on_delete` itself, so deletions through the ORM still cascade, but the
+database no longer refuses links to missing recipes: raw SQL deleting
+recipes must delete their links too. `orphaned_references` counts the rows
+pointing at missing recipes; `partition_recipes --check` reports them.
+
+Updates of a recipe filter on its user as well as its id, so that they are
+pruned too. Deletes are not: the ORM collects what to delete and deletes it
+by id alone, so each deleted recipe probes the id index of every partition.
+
+Converting a table copies it while holding an exclusive lock; run
+`partition_recipes` in a maintenance window on large existing databases.
+"""
+from django.db import connection, transaction
+
+
+PARTITIONED_TABLES = (
+    ('core_recipe', 'user_id'),
+    ('core_recipe_tags', 'recipe_id'),
+    ('core_recipe_ingredients', 'recipe_id'),
+)
+
+
+def is_partitioned(cursor, table):
+    """Return whether a table is already partitioned"""
+    cursor.execute(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)",
+        [table]
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def _definitions(cursor, table):
+    """Return the constraints and plain indexes of a table as SQL"""
+    cursor.execute(
+        'SELECT conname, contype, pg_get_constraintdef(oid), '
+        '       confrelid::regclass::text '
+        'FROM pg_constraint WHERE conrelid = %s::regclass '
+        "AND contype IN ('p', 'u', 'f') ORDER BY contype DESC, conname",
+        [table]
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+        'WHERE indrelid = %s::regclass AND NOT EXISTS ('
+        '  SELECT 1 FROM pg_constraint WHERE conindid = indexrelid'
+        ') ORDER BY indexrelid',
+        [table]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    return constraints, indexes
+
+
+def _drop_referencing_keys(cursor, table):
+    """Drop the foreign keys pointing at `table`; return their names"""
+    cursor.execute(
+        'SELECT conrelid::regclass::text, conname FROM pg_constraint '
+        "WHERE confrelid = %s::regclass AND contype = 'f'",
+        [table]
+    )
+    rows = cursor.fetchall()
+    for referencing, name in rows:
+        cursor.execute('ALTER TABLE %s DROP CONSTRAINT %s' % (
+            referencing, connection.ops.quote_name(name)
+        ))
+    return ['%s.%s' % row for row in rows]
+
+
+def partition_table(cursor, table, key, partitions):
+    """
+    Replace a table by a copy hash partitioned on `key`; return the foreign
+    keys of other tables that pointed at it and were dropped.
+    """
+    quote = connection.ops.quote_name
+    old = table + '_unpartitioned'
+    cursor.execute('LOCK TABLE %s IN ACCESS EXCLUSIVE MODE' % quote(table))
+    constraints, indexes = _definitions(cursor, table)
+    cursor.execute(
+        "SELECT pg_get_serial_sequence(%s, 'id')", [table]
+    )
+    sequence = cursor.fetchone()[0]
+
+    dropped = _drop_referencing_keys(cursor, table)
+    cursor.execute('ALTER TABLE %s RENAME TO %s' % (quote(table), quote(old)))
+    cursor.execute(
+        'CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        'PARTITION BY HASH (%s)'
+        % (quote(table), quote(old), quote(key))
+    )
+    for remainder in range(partitions):
+        cursor.execute(
+            'CREATE TABLE %s PARTITION OF %s '
+            'FOR VALUES WITH (MODULUS %d, REMAINDER %d)' % (
+                quote('%s_p%d' % (table, remainder)), quote(table),
+                partitions, remainder
+            )
+        )
+    cursor.execute('INSERT INTO %s SELECT * FROM %s' % (
+        quote(table), quote(old)
+    ))
+    if sequence:
+        cursor.execute('ALTER SEQUENCE %s OWNED BY %s.id' % (
+            sequence, quote(table)
+        ))
+    cursor.execute('DROP TABLE %s' % quote(old))
+
+    for name, kind, definition, referenced in constraints:
+        if kind == 'f' and is_partitioned(cursor, referenced):
+            continue
+        if kind in ('p', 'u') and key not in definition:
+            definition = definition[:-1] + ', %s)' % quote(key)
+        cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s %s' % (
+            quote(table), quote(name), definition
+        ))
+    for definition in indexes:
+        cursor.execute(definition)
+
+    cursor.execute('ANALYZE %s' % quote(table))
+    return dropped
+
+
+def partition_recipe_tables(partitions, log=None):
+    """Hash partition every recipe table not partitioned yet"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Tables with pending deferred foreign key checks cannot be altered.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for table, key in PARTITIONED_TABLES:
+            if is_partitioned(cursor, table):
+                continue
+
+            dropped = partition_table(cursor, table, key, partitions)
+            if log is not None:
+                log('Partitioned %s on %s into %d partitions' % (
+                    table, key, partitions
+                ))
+                for name in dropped:
+                    log('Dropped foreign key %s' % name)
+
+
+def recipe_references():
+    """Return the table and column of every reference to a recipe"""
+    from core.models import Recipe
+    references = [
+        (relation.related_model._meta.db_table, relation.field.column)
+        for relation in Recipe._meta.related_objects
+        if not relation.many_to_many
+    ]
+    for field in Recipe._meta.many_to_many:
+        references.append((
+            field.remote_field.through._meta.db_table,
+            field.m2m_column_name(),
+        ))
+
+    return references
+
+
+def orphaned_references():
+    """Count the rows referencing missing recipes, by table and column"""
+    quote = connection.ops.quote_name
+    orphans = {}
+    with connection.cursor() as cursor:
+        for table, column in recipe_references():
+            cursor.execute(
+                'SELECT COUNT(*) FROM %s AS r WHERE NOT EXISTS ('
+                '  SELECT 1 FROM core_recipe WHERE id = r.%s'
+                ')' % (quote(table), quote(column))
+            )
+            count = cursor.fetchone()[0]
+            if count:
+                orphans['%s.%s' % (table, column)] = count
+
+    return orphans
@@ -0,0 +1,81 @@
+"""
+Account purge that deletes a user's data with set-based SQL.
+
+Deleting a user through the ORM makes the collector load every related row
+into memory before deleting it. The purge instead removes the rows in
+dependency order, children first, one bounded batch per statement and
+transaction. That keeps memory flat and locks short, and lets the purge be
+resumed after an interruption. Once the children are gone the user row is
+deleted through the ORM, so only a handful of rows are collected.
+
+The raw DELETEs send no `post_delete` signal, so the purge itself records
+the deletions in the outbox and purges the CDN copies of shared recipes.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core import cdn, outbox
+from core.models import Ingredient, Recipe, RecipeSignature, Tag
+
+
+def _purge_steps(user_id):
+    """Yield a label and a DELETE of one batch for each purge step"""
+    recipe_table = Recipe._meta.db_table
+    for through in (Recipe.tags.through, Recipe.ingredients.through):
+        table = through._meta.db_table
+        yield table, (
+            'DELETE FROM {table} WHERE id IN ('
+            ' SELECT link.id FROM {table} link'
+            ' JOIN {recipe} recipe ON recipe.id = link.recipe_id'
+            ' WHERE recipe.user_id = %(user)s LIMIT %(limit)s)'
+        ).format(table=table, recipe=recipe_table)
+
+    for model in (RecipeSignature, Recipe, Tag, Ingredient):
+        table = model._meta.db_table
+        pk = model._meta.pk.column
+        # The outer user_id test lets a partitioned table be pruned.
+        yield table, (
+            'DELETE FROM {table} WHERE user_id = %(user)s AND {pk} IN ('
+            ' SELECT {pk} FROM {table} WHERE user_id = %(user)s'
+            ' LIMIT %(limit)s)'
+        ).format(table=table, pk=pk)
+
+
+def purge_user(user_id, batch_size=1000, progress=None):
+    """Delete a user and everything they own in bounded batches
+
+    `progress` is called with the table and the number of rows deleted after
+    every batch. Returns the total number of rows deleted per table.
+    """
+    shared = list(
+        Recipe.objects.filter(user_id=user_id, share_slug__isnull=False)
+        .values_list('id', flat=True)
+    )
+    # Recorded up front, so an interrupted purge has announced the rows the
+    # next run deletes.
+    with transaction.atomic():
+        for model in (Recipe, Tag, Ingredient):
+            ids = model.objects.filter(user_id=user_id) \
+                .values_list('id', flat=True)
+            outbox.record(user_id, model, 'deleted', list(ids))
+
+    deleted = {}
+    for table, sql in _purge_steps(user_id):
+        deleted[table] = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, {'user': user_id, 'limit': batch_size})
+                count = cursor.rowcount
+            if not count:
+                break
+
+            deleted[table] += count
+            if progress is not None:
+                progress(table, count)
+
+    _, collected = get_user_model().objects.filter(pk=user_id).delete()
+    for label, count in collected.items():
+        deleted[label] = deleted.get(label, 0) + count
+    cdn.purge([cdn.key(Recipe, id) for id in shared])
+
+    return deleted
@@ -0,0 +1,78 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+_state = threading.local()
+_health = {}
+
+
+def allow_replica_reads(allowed):
+    """Allow or forbid reads from replicas for the current thread"""
+    _state.replica_reads = allowed
+
+
+def replica_reads_allowed():
+    """Return whether the current thread may read from a replica"""
+    return getattr(_state, 'replica_reads', False)
+
+
+def replica_is_healthy(alias):
+    """Return whether the replica accepts queries, cached briefly"""
+    now = time.monotonic()
+    healthy, expires = _health.get(alias, (False, 0.0))
+    if now < expires:
+        return healthy
+
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+    except DatabaseError:
+        healthy = False
+
+    if not healthy:
+        connection.close()
+
+    _health[alias] = (healthy, now + settings.REPLICA_HEALTH_CHECK_SECONDS)
+    return healthy
+
+
+class ReplicaRouter:
+    """
+    Send reads to a healthy replica when the current request allows it.
+
+    Reads are only routed to replicas while `allow_replica_reads(True)` is
+    in effect, which `ReplicaPinningMiddleware` does for safe requests from
+    clients that haven't written recently. Everything else, including
+    management commands and background work, stays on the primary.
+    """
+
+    # Read right after they are written by another request, e.g. a token
+    # used just after signing in, before any replica may have it.
+    primary_models = {'core.authtoken'}
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads_allowed() \
+                or model._meta.label_lower in self.primary_models:
+            return DEFAULT_DB_ALIAS
+
+        replicas = list(settings.DATABASE_REPLICAS)
+        random.shuffle(replicas)
+        for alias in replicas:
+            if replica_is_healthy(alias):
+                return alias
+
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,305 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+
+from core import cdn, events, outbox, similarity
+from core.models import Ingredient, Recipe, Tag, UserStats, add_to_counter
+
+
+@receiver(post_save, sender=get_user_model())
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    """Give every new user an empty row of counters"""
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+def count_created(sender, instance, created, raw=False, **kwargs):
+    """Count a newly created object on its owner's stats"""
+    if created and not raw:
+        UserStats.objects.record(sender, instance.user_id, added=[instance])
+
+
+def count_deleted(sender, instance, **kwargs):
+    """Remove a deleted object from its owner's stats"""
+    UserStats.objects.record(sender, instance.user_id, removed=[instance])
+
+
+for model in (Recipe, Tag, Ingredient):
+    post_save.connect(count_created, sender=model)
+    post_delete.connect(count_deleted, sender=model)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_stats(sender, instance, created, raw=False, **kwargs):
+    """Move an updated recipe's old price and time out of the stats"""
+    loaded = getattr(instance, '_loaded_values', None)
+    instance._loaded_values = {
+        'price': instance.price,
+        'time_minute': instance.time_minute,
+    }
+    if created or raw:
+        return
+
+    if loaded is None or not {'price', 'time_minute'} <= loaded.keys():
+        UserStats.objects.recompute([instance.user_id])
+        return
+
+    old = SimpleNamespace(
+        price=loaded['price'], time_minute=loaded['time_minute']
+    )
+    if (old.price, old.time_minute) != (instance.price, instance.time_minute):
+        UserStats.objects.record_recipes(
+            instance.user_id, added=[instance], removed=[old]
+        )
+    else:
+        UserStats.objects.touch(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def touch_user(sender, instance, created, raw=False, **kwargs):
+    """Note a change to a user's profile"""
+    if not created and not raw:
+        UserStats.objects.touch(instance.pk)
+
+
+def touch_attr_owner(sender, instance, created, raw=False, **kwargs):
+    """Note a change to a tag or ingredient on its owner's stats"""
+    if not created and not raw:
+        UserStats.objects.touch(instance.user_id)
+
+
+for model in (Tag, Ingredient):
+    post_save.connect(touch_attr_owner, sender=model)
+
+
+@receiver(pre_delete, sender=Recipe)
+def release_recipe_attrs(sender, instance, **kwargs):
+    """Stop counting a deleted recipe's tags and ingredients as used"""
+    for model in (Tag, Ingredient):
+        model.objects.filter(recipe=instance).update(
+            recipe_count=add_to_counter('recipe_count', -1)
+        )
+
+
+def remember_removed_links(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Note which of the ids to remove are actually linked
+
+    `remove()` passes every id it was given, linked or not; receivers of
+    `post_remove` use `removed_ids` instead of `pk_set`.
+    """
+    if action != 'pre_remove':
+        return
+
+    attr_field = 'ingredient_id' \
+        if sender is Recipe.ingredients.through else 'tag_id'
+    if not reverse:
+        own_field, other_field = 'recipe_id', attr_field
+    else:
+        own_field, other_field = attr_field, 'recipe_id'
+    # Locked so a concurrent removal of the same links waits for this one.
+    instance._removed_ids = set(
+        sender.objects.select_for_update()
+        .filter(**{own_field: instance.pk, other_field + '__in': pk_set})
+        .values_list(other_field, flat=True)
+    )
+
+
+def removed_ids(instance, action, pk_set):
+    """Return the ids whose links an add or remove actually changed"""
+    if action == 'post_remove':
+        return instance._removed_ids
+    return pk_set
+
+
+def count_attr_usage(sender, instance, action, reverse, model, pk_set,
+                     **kwargs):
+    """Keep the number of recipes using each tag or ingredient"""
+    attr_model = Ingredient if sender is Recipe.ingredients.through else Tag
+
+    if action in ('post_add', 'post_remove'):
+        pk_set = removed_ids(instance, action, pk_set)
+        if not pk_set:
+            return
+        delta = 1 if action == 'post_add' else -1
+        if not reverse:
+            attrs = attr_model.objects.filter(pk__in=pk_set)
+        else:
+            attrs = attr_model.objects.filter(pk=instance.pk)
+            delta *= len(pk_set)
+        attrs.update(recipe_count=add_to_counter('recipe_count', delta))
+
+    elif action == 'pre_clear':
+        if not reverse:
+            attr_model.objects.filter(recipe=instance).update(
+                recipe_count=add_to_counter('recipe_count', -1)
+            )
+        else:
+            attr_model.objects.filter(pk=instance.pk).update(recipe_count=0)
+
+
+def touch_recipe_owner(sender, instance, action, **kwargs):
+    """Note a change to the tags or ingredients of a user's recipes"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        UserStats.objects.touch(instance.user_id)
+
+
+for through in (Recipe.tags.through, Recipe.ingredients.through):
+    m2m_changed.connect(remember_removed_links, sender=through)
+    m2m_changed.connect(count_attr_usage, sender=through)
+    m2m_changed.connect(touch_recipe_owner, sender=through)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def sync_ingredient_ids(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    """Keep the denormalized ingredient ids of recipes up to date"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        Recipe.objects.filter(pk=instance.pk, user_id=instance.user_id) \
+            .sync_ingredient_ids()
+    elif action == 'post_clear':
+        Recipe.objects.forget_ingredient(instance.pk)
+    else:
+        Recipe.objects.filter(pk__in=pk_set).sync_ingredient_ids()
+
+
+@receiver(post_delete, sender=Ingredient)
+def forget_deleted_ingredient(sender, instance, **kwargs):
+    """Drop a deleted ingredient from the recipes that used it"""
+    Recipe.objects.forget_ingredient(instance.pk)
+
+
+def refresh_recipe_signatures(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    """Recompute the similarity signatures of recipes whose M2M changed"""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove') and reverse:
+        similarity.refresh_signatures(pk_set)
+    elif action == 'post_clear' and reverse:
+        similarity.refresh_signatures(instance._cleared_recipe_ids)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        similarity.refresh_signatures([instance.pk])
+
+
+def remember_attr_recipes(sender, instance, **kwargs):
+    """Note which recipes use a tag or ingredient about to be deleted"""
+    instance._deleted_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+def refresh_attr_recipes(sender, instance, **kwargs):
+    """Recompute the signatures of recipes that used a deleted attribute"""
+    similarity.refresh_signatures(
+        getattr(instance, '_deleted_recipe_ids', ()), create=False
+    )
+
+
+for through in (Recipe.tags.through, Recipe.ingredients.through):
+    m2m_changed.connect(refresh_recipe_signatures, sender=through)
+
+for model in (Tag, Ingredient):
+    pre_delete.connect(remember_attr_recipes, sender=model)
+    post_delete.connect(refresh_attr_recipes, sender=model)
+
+
+def announce(user_id, model, action, ids):
+    """Tell the event streams and the webhooks about a change"""
+    events.notify(user_id, model, action, ids)
+    outbox.record(user_id, model, action, ids)
+
+
+def announce_saved(sender, instance, created, raw=False, **kwargs):
+    """Announce a created or updated object"""
+    if not raw:
+        announce(
+            instance.user_id, sender, 'created' if created else 'updated',
+            [instance.pk]
+        )
+
+
+def announce_deleted(sender, instance, **kwargs):
+    """Announce a deleted object and the recipes it was on"""
+    announce(instance.user_id, sender, 'deleted', [instance.pk])
+    announce(
+        instance.user_id, Recipe, 'updated',
+        getattr(instance, '_deleted_recipe_ids', ())
+    )
+
+
+def announce_recipe_links(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Announce the recipes whose tags or ingredients changed"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_remove' and not instance._removed_ids:
+        return
+
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = instance._cleared_recipe_ids
+    else:
+        recipe_ids = removed_ids(instance, action, pk_set)
+    announce(instance.user_id, Recipe, 'updated', recipe_ids)
+
+
+for model in (Recipe, Tag, Ingredient):
+    post_save.connect(announce_saved, sender=model)
+    post_delete.connect(announce_deleted, sender=model)
+
+for through in (Recipe.tags.through, Recipe.ingredients.through):
+    m2m_changed.connect(announce_recipe_links, sender=through)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def purge_shared_recipe(sender, instance, update_fields=None, **kwargs):
+    """Purge the public copies of a changed, shared or unshared recipe"""
+    if instance.is_shared or 'share_slug' in (update_fields or ()):
+        cdn.purge([cdn.key(Recipe, instance.pk)])
+
+
+def purge_attr(sender, instance, created=False, raw=False, **kwargs):
+    """Purge the shared recipes showing a changed tag or ingredient"""
+    if not created and not raw:
+        cdn.purge([cdn.key(sender, instance.pk)])
+
+
+for model in (Tag, Ingredient):
+    post_save.connect(purge_attr, sender=model)
+    post_delete.connect(purge_attr, sender=model)
+
+
+def purge_linked_recipes(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Purge the shared recipes whose tags or ingredients changed"""
+    if action not in ('post_add', 'post_remove', 'post_clear') \
+            or not cdn.is_enabled():
+        return
+    if action == 'post_remove' and not instance._removed_ids:
+        return
+
+    if not reverse:
+        recipe_ids = [instance.pk] if instance.is_shared else []
+    else:
+        recipe_ids = Recipe.objects.filter(
+            pk__in=instance._cleared_recipe_ids
+            if action == 'post_clear'
+            else removed_ids(instance, action, pk_set),
+            share_slug__isnull=False,
+        ).values_list('id', flat=True)
+    cdn.purge([cdn.key(Recipe, id) for id in recipe_ids])
+
+
+for through in (Recipe.tags.through, Recipe.ingredients.through):
+    m2m_changed.connect(purge_linked_recipes, sender=through)
@@ -0,0 +1,133 @@
+"""
+Similar recipe lookups using MinHash signatures and locality-sensitive
+hashing over the tags and ingredients of recipes.
+
+Every recipe gets a signature of `SIGNATURE_SIZE` min-hashes; the fraction
+of equal positions between two signatures estimates the Jaccard similarity
+of their tag and ingredient sets. Signatures are cut into bands of
+`BAND_SIZE` rows and each band is hashed; recipes sharing any band hash are
+candidates, found through a GIN index instead of comparing every pair.
+"""
+import hashlib
+import random
+import struct
+from collections import defaultdict
+
+from core.models import Recipe, RecipeSignature
+
+
+SIGNATURE_SIZE = 64
+BAND_SIZE = 4
+MERSENNE_PRIME = (1 << 61) - 1
+
+_rng = random.Random(20200512)
+_PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(SIGNATURE_SIZE)
+]
+
+
+def recipe_features(tag_ids, ingredient_ids):
+    """Return the features of a recipe as a set of distinct integers"""
+    return {2 * id for id in tag_ids} | {2 * id + 1 for id in ingredient_ids}
+
+
+def minhash(features):
+    """Return the MinHash signature of a non-empty set of integers"""
+    return [
+        min((a * feature + b) % MERSENNE_PRIME for feature in features)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_hashes(signature):
+    """Return one signed 64 bit hash per band of a signature"""
+    hashes = []
+    for index in range(0, len(signature), BAND_SIZE):
+        band = signature[index:index + BAND_SIZE]
+        digest = hashlib.blake2b(
+            struct.pack('>%dQ' % (len(band) + 1), index, *band),
+            digest_size=8
+        ).digest()
+        hashes.append(int.from_bytes(digest, 'big', signed=True))
+
+    return hashes
+
+
+def estimate_similarity(signature, other):
+    """Return the estimated Jaccard similarity of two signatures"""
+    equal = sum(1 for a, b in zip(signature, other) if a == b)
+    return equal / len(signature)
+
+
+def refresh_signatures(recipe_ids, create=True):
+    """
+    Recompute the signatures of the given recipes.
+
+    With `create=False` only existing signatures are updated or removed,
+    which is safe while the recipes themselves may be being deleted.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+
+    features = defaultdict(lambda: (set(), set()))
+    tags = Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids) \
+        .values_list('recipe_id', 'tag_id')
+    for recipe_id, tag_id in tags:
+        features[recipe_id][0].add(tag_id)
+    ingredients = Recipe.ingredients.through.objects \
+        .filter(recipe_id__in=recipe_ids) \
+        .values_list('recipe_id', 'ingredient_id')
+    for recipe_id, ingredient_id in ingredients:
+        features[recipe_id][1].add(ingredient_id)
+
+    RecipeSignature.objects.filter(recipe_id__in=recipe_ids) \
+        .exclude(recipe_id__in=features).delete()
+
+    existing = set(
+        RecipeSignature.objects.filter(recipe_id__in=features)
+        .values_list('recipe_id', flat=True)
+    )
+    if create:
+        owners = Recipe.objects.filter(id__in=features)
+    else:
+        owners = Recipe.objects.filter(id__in=existing)
+
+    updated, created = [], []
+    for recipe_id, user_id in owners.values_list('id', 'user_id'):
+        signature = minhash(recipe_features(*features[recipe_id]))
+        row = RecipeSignature(
+            recipe_id=recipe_id,
+            user_id=user_id,
+            minhash=signature,
+            bands=band_hashes(signature),
+        )
+        (updated if recipe_id in existing else created).append(row)
+
+    RecipeSignature.objects.bulk_update(updated, ['minhash', 'bands'])
+    RecipeSignature.objects.bulk_create(created)
+
+
+def similar_recipes(recipe, limit=10):
+    """Return up to `limit` (recipe, similarity) pairs, most similar first"""
+    try:
+        signature = RecipeSignature.objects.get(recipe=recipe)
+    except RecipeSignature.DoesNotExist:
+        return []
+
+    candidates = RecipeSignature.objects.filter(
+        user_id=signature.user_id,
+        bands__overlap=signature.bands,
+    ).exclude(recipe_id=recipe.pk).values_list('recipe_id', 'minhash')
+
+    scores = sorted(
+        (
+            (estimate_similarity(signature.minhash, other), recipe_id)
+            for recipe_id, other in candidates
+        ),
+        key=lambda item: (-item[0], item[1])
+    )[:limit]
+
+    recipes = Recipe.objects.in_bulk([recipe_id for _, recipe_id in scores])
+    return [(recipes[recipe_id], score) for score, recipe_id in scores]
@@ -0,0 +1,153 @@
+"""
+Profiling and warming up the start of worker processes.
+
+Past the imports of every installed app, the first requests of a worker
+build what Django and DRF create lazily: model metadata caches, serializer
+fields, compiled URL patterns and database connections. `warm_up` builds
+them before the worker accepts traffic. Gunicorn runs it in the master, so
+forked workers share the result, and connects each worker thread to the
+database after the fork. `profile` times the start of the project in a
+fresh interpreter, with `python -X importtime` timing each import.
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import wait
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+WARM_SERIALIZERS = (
+    'recipe.serializer.RecipeSerializer',
+    'recipe.serializer.RecipeDetailSerializer',
+    'recipe.serializer.TagSerializer',
+    'recipe.serializer.IngredientSerializer',
+    'user.serializer.UserSerializer',
+)
+WARM_NAMESPACES = ('recipe', 'user')
+
+# Run by `profile` in the new interpreter, timing from before Django loads.
+# -X importtime skips modules loaded by importlib.import_module, as Django
+# loads apps, models and URL confs, so they are imported with __import__.
+PROFILE_SCRIPT = """
+import importlib.util, sys, time
+start = time.perf_counter()
+
+def import_module(name, package=None):
+    name = importlib.util.resolve_name(name, package)
+    __import__(name)
+    return sys.modules[name]
+
+importlib.import_module = import_module
+import django
+django.setup()
+from core import startup
+startup.print_phases(start, connect_db=sys.argv[1] == '1')
+"""
+
+
+def build_serializers():
+    """Build the fields of the serializers of the busiest endpoints"""
+    for path in WARM_SERIALIZERS:
+        import_string(path)().fields
+
+
+def _compile_patterns(patterns):
+    for pattern in patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            _compile_patterns(pattern.url_patterns)
+
+
+def resolve_urls():
+    """Import the URL conf and compile the patterns of the API"""
+    resolver = get_resolver()
+    for namespace in WARM_NAMESPACES:
+        _, included = resolver.namespace_dict[namespace]
+        included.reverse_dict
+        _compile_patterns(included.url_patterns)
+
+
+def connect():
+    """Open the connections of this thread to every database"""
+    try:
+        for alias in settings.DATABASES:
+            connections[alias].ensure_connection()
+    except DatabaseError:
+        # Requests will report the database; the worker should still boot.
+        logger.exception('Could not connect while warming up')
+
+
+def connect_threads(executor, count, timeout=10):
+    """Open database connections in each of the threads of an executor"""
+    # Holding every task until all of them run puts each in its own thread.
+    barrier = threading.Barrier(count, timeout=timeout)
+
+    def run():
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        connect()
+
+    wait([executor.submit(run) for _ in range(count)], timeout=timeout * 2)
+
+
+def warm_up(connect_db=True):
+    """Build what the first requests would; return the seconds of each step"""
+    steps = [('urls', resolve_urls), ('serializers', build_serializers)]
+    if connect_db:
+        steps.append(('db', connect))
+
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+
+    return timings
+
+
+def print_phases(start, connect_db):
+    """Print the seconds taken by each phase of a start as JSON"""
+    phases = {'setup': time.perf_counter() - start}
+    phases.update(warm_up(connect_db=connect_db))
+    print(json.dumps(phases))
+
+
+def parse_importtime(output):
+    """Return the module, self and cumulative microseconds of each import"""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            imports.append(
+                (module.strip(), int(self_us), int(cumulative_us))
+            )
+
+    return imports
+
+
+def profile(settings_module, connect_db=False):
+    """Start the project in a new interpreter; return its phases and imports"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    result = subprocess.run(
+        [
+            sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT,
+            '1' if connect_db else '0',
+        ],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    )
+    phases = json.loads(result.stdout.splitlines()[-1])
+    return phases, parse_importtime(result.stderr)
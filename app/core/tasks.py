@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from core import cdn, images, purge
+from core.jobs import job
+from core.models import UserStats
+
+
+@job('purge_user')
+def purge_user(user_id):
+    """Delete an account flagged for purging with everything it owns"""
+    flagged = get_user_model().objects \
+        .filter(pk=user_id, purge_requested_at__isnull=False) \
+        .exists()
+    if not flagged:
+        return {'deleted': {}}
+
+    return {'deleted': purge.purge_user(user_id)}
+
+
+@job('recompute_stats')
+def recompute_stats(user_ids):
+    """Recount the stats of the given users from scratch"""
+    UserStats.objects.recompute(user_ids)
+
+
+@job('make_renditions')
+def make_renditions(digest):
+    """Create every rendition of an uploaded recipe image"""
+    for size in settings.RECIPE_IMAGE_SIZES:
+        images.make_rendition(digest, size)
+
+
+@job('purge_cdn')
+def purge_cdn(keys):
+    """Drop the cached public responses tagged with any of the keys"""
+    cdn.purge_now(keys)
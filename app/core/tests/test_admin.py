@@ -1,7 +1,12 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
+from core.models import Ingredient, Recipe, Tag
+from core.pagination import EstimatedCountPaginator
+
 
 class AdminSiteTests(TestCase):
 
@@ -41,3 +46,86 @@ class AdminSiteTests(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
+
+    def test_changelists(self):
+        """Test that every core model has a working changelist"""
+        for model in ('tag', 'ingredient', 'recipe', 'userstats',
+                      'recipesignature', 'job'):
+            response = self.client.get(
+                reverse('admin:core_%s_changelist' % model)
+            )
+
+            self.assertEqual(response.status_code, 200, model)
+
+    def test_recipe_changelist_queries(self):
+        """Test listing more recipes does not take more queries"""
+        url = reverse('admin:core_recipe_changelist')
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            return len(context.captured_queries)
+
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=1
+        )
+        queries = count_queries()
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title='Stew %d' % i, time_minute=5, price=1
+            )
+
+        self.assertEqual(count_queries(), queries)
+
+    def test_search_by_prefix(self):
+        """Test that search matches prefixes of names"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Not vegan')
+
+        response = self.client.get(
+            reverse('admin:core_tag_changelist'), {'q': 'veg'}
+        )
+
+        self.assertContains(response, 'Vegan')
+        self.assertNotContains(response, 'Not vegan')
+
+    def test_recipe_change_page_autocompletes(self):
+        """Test the recipe form uses autocomplete widgets"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=1
+        )
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        response = self.client.get(
+            reverse('admin:core_recipe_change', args=[recipe.id])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'data-ajax--url', count=3)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user('u@idco.io', 'pass1234')
+        Tag.objects.bulk_create(
+            Tag(user=user, name='Tag %d' % i) for i in range(30)
+        )
+
+    def test_small_results_counted(self):
+        """Test results expected to be small are counted exactly"""
+        paginator = EstimatedCountPaginator(Tag.objects.order_by('id'), 10)
+
+        self.assertEqual(paginator.count, 30)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=0)
+    def test_large_results_estimated(self):
+        """Test results expected to be large are not counted"""
+        paginator = EstimatedCountPaginator(Tag.objects.order_by('id'), 10)
+
+        with CaptureQueriesContext(connection) as context:
+            count = paginator.count
+
+        self.assertGreater(count, 0)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertIn('EXPLAIN', context.captured_queries[0]['sql'])
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken
+
+ME_URL = reverse('user:me')
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+@override_settings(
+    AUTH_TOKEN_TTL_SECONDS=7 * DAY,
+    AUTH_TOKEN_RENEW_SECONDS=HOUR,
+    AUTH_TOKEN_MAX_AGE_SECONDS=30 * DAY,
+)
+class ExpiringTokenTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'token@londonappdev.com', 'testpass'
+        )
+        self.token = AuthToken.objects.issue(self.user, device='Phone')
+
+    def request(self, token=None):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Token ' + (token or self.token).key
+        )
+        return client.get(ME_URL)
+
+    def set_token(self, created_ago, expires_in):
+        now = timezone.now()
+        AuthToken.objects.filter(pk=self.token.pk).update(
+            created_at=now - timedelta(seconds=created_ago),
+            expires_at=now + timedelta(seconds=expires_in),
+        )
+
+    def expires_in(self):
+        self.token.refresh_from_db()
+        return (self.token.expires_at - timezone.now()).total_seconds()
+
+    def test_issue(self):
+        """Test tokens are issued per device, expiring after the TTL"""
+        other = AuthToken.objects.issue(self.user, device='Laptop')
+
+        self.assertNotEqual(other.key, self.token.key)
+        self.assertEqual(len(other.key), 40)
+        self.assertAlmostEqual(self.expires_in(), 7 * DAY, delta=60)
+        self.assertEqual(self.request(other).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.request().status_code, status.HTTP_200_OK)
+
+    def test_expired_token_refused(self):
+        """Test an expired token no longer authenticates"""
+        self.set_token(created_ago=8 * DAY, expires_in=-1)
+
+        response = self.request()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['detail'], 'Token has expired.')
+
+    def test_sliding_renewal(self):
+        """Test a used token is renewed, at most once an hour"""
+        self.set_token(created_ago=2 * DAY, expires_in=5 * DAY)
+
+        self.request()
+        self.assertAlmostEqual(self.expires_in(), 7 * DAY, delta=60)
+
+        self.set_token(created_ago=2 * DAY, expires_in=7 * DAY - 600)
+        with self.assertNumQueries(1):
+            self.request()
+        self.assertAlmostEqual(self.expires_in(), 7 * DAY - 600, delta=60)
+
+    def test_renewal_capped(self):
+        """Test tokens are not renewed past their maximum age"""
+        self.set_token(created_ago=28 * DAY, expires_in=DAY)
+
+        self.request()
+
+        self.assertAlmostEqual(self.expires_in(), 2 * DAY, delta=60)
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    @patch('core.routers.replica_is_healthy', return_value=True)
+    def test_token_read_from_primary(self, healthy):
+        """Test a new token works before the replicas have it"""
+        token = AuthToken.objects.issue(self.user, device='Tablet')
+
+        response = self.request(token)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cleanup_command(self):
+        """Test expired tokens are deleted in batches, keeping valid ones"""
+        now = timezone.now()
+        AuthToken.objects.bulk_create(
+            AuthToken(
+                key='expired%d' % i, user=self.user,
+                expires_at=now - timedelta(seconds=i + 1),
+            )
+            for i in range(5)
+        )
+        out = StringIO()
+
+        call_command('cleanup_tokens', batch_size=2, verbosity=2, stdout=out)
+
+        self.assertEqual(
+            out.getvalue().splitlines(), [
+                'Deleted 2 tokens', 'Deleted 2 tokens', 'Deleted 1 tokens',
+                'Deleted 5 expired tokens',
+            ]
+        )
+        self.assertEqual(
+            list(AuthToken.objects.values_list('key', flat=True)),
+            [self.token.key]
+        )
@@ -0,0 +1,96 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from core import cdn, jobs
+from core.models import Job, Recipe, Tag
+
+
+class PurgeHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.server.requests.append(self.headers)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(CDN_PURGE_URL='http://cdn.invalid/purge')
+class CdnPurgeTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'cdn@londonappdev.com', 'testpass'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=2
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Winter')
+        self.recipe.tags.add(self.tag)
+
+    def purged(self):
+        """Return the keys of every queued purge and forget them"""
+        keys = [
+            key for job in Job.objects.filter(name='purge_cdn')
+            for key in job.payload['keys']
+        ]
+        Job.objects.all().delete()
+        return keys
+
+    def test_unshared_recipe_not_purged(self):
+        """Test changes to recipes which are not shared purge nothing"""
+        self.recipe.title = 'Stew'
+        self.recipe.save()
+        self.recipe.tags.remove(self.tag)
+
+        self.assertEqual(self.purged(), [])
+
+    def test_shared_recipe_purged(self):
+        """Test sharing, changing and unsharing a recipe purge its copies"""
+        key = cdn.key(Recipe, self.recipe.pk)
+
+        self.recipe.share()
+        self.assertEqual(self.purged(), [key])
+        self.recipe.title = 'Stew'
+        self.recipe.save()
+        self.assertEqual(self.purged(), [key])
+        self.recipe.tags.clear()
+        self.assertEqual(self.purged(), [key])
+        self.recipe.unshare()
+        self.assertEqual(self.purged(), [key])
+
+    def test_tag_change_purged(self):
+        """Test a renamed tag purges the copies showing it"""
+        self.tag.name = 'Autumn'
+        self.tag.save()
+
+        self.assertEqual(self.purged(), [cdn.key(Tag, self.tag.pk)])
+
+    def test_nothing_queued_without_cdn(self):
+        """Test no purge is queued when no CDN is configured"""
+        with self.settings(CDN_PURGE_URL=''):
+            self.recipe.share()
+
+        self.assertEqual(self.purged(), [])
+
+    def test_purge_job(self):
+        """Test the purge job sends the keys to the CDN"""
+        server = HTTPServer(('127.0.0.1', 0), PurgeHandler)
+        server.requests = []
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:%d/purge' % server.server_port
+
+        with self.settings(CDN_PURGE_URL=url, CDN_PURGE_TOKEN='token'):
+            cdn.purge(['recipe-1', 'tag-2'])
+            jobs.run_pending()
+
+        self.assertEqual(server.requests[0]['Surrogate-Key'], 'recipe-1 tag-2')
+        self.assertEqual(server.requests[0]['Fastly-Key'], 'token')
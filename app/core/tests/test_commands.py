@@ -1,23 +1,64 @@
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Tag, UserStats
+
+
+ENSURE_CONNECTION = \
+    'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection'
+
 
 class CommandTests(TestCase):
 
     def test_for_db_ready(self):
         """Test waiting for db when db is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.return_value = None
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(ec.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backs_off(self, ts):
+        """Test the delay between attempts grows up to the maximum"""
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 6 + [None]
+            call_command('wait_for_db', initial_delay=1, max_delay=4)
+
+        delays = [c[0][0] for c in ts.call_args_list]
+        self.assertTrue(0.5 <= delays[0] <= 1)
+        self.assertTrue(1 <= delays[1] <= 2)
+        self.assertTrue(all(2 <= d <= 4 for d in delays[3:]))
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test the command fails once the timeout has elapsed"""
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
+
+        ts.assert_not_called()
+
+    def test_recompute_stats(self):
+        """Test recomputing the stats of every user"""
+        user = get_user_model().objects.create_user('demo@idco.io', 'pass')
+        Tag.objects.create(user=user, name='Vegan')
+        UserStats.objects.all().delete()
+
+        call_command('recompute_stats', batch_size=1)
+
+        self.assertEqual(UserStats.objects.get(user=user).tag_count, 1)
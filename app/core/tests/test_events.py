@@ -0,0 +1,143 @@
+import json
+import queue
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core import events
+from core.models import Recipe, Tag
+
+
+def payload(id, user=1, type='recipe', action='updated', object=1):
+    return json.dumps({
+        'id': id, 'user': user, 'type': type, 'action': action,
+        'object': object,
+    })
+
+
+def drain(subscription):
+    """Return the events waiting for a subscription"""
+    received = []
+    while True:
+        try:
+            received.append(subscription.get(0))
+        except queue.Empty:
+            return received
+
+
+class ChangeHubTests(SimpleTestCase):
+
+    def setUp(self):
+        self.hub = events.ChangeHub(buffer_size=3, max_subscriptions=2)
+        self.hub.missed_through = 0
+
+    def test_publish_to_user(self):
+        """Test events only reach the streams of their user"""
+        mine = self.hub.subscribe(1)
+        theirs = self.hub.subscribe(2)
+
+        self.hub.publish(payload(1, object=7))
+
+        self.assertEqual([event['object'] for event in drain(mine)], [7])
+        self.assertEqual(drain(theirs), [])
+
+    def test_resume_after_last_event(self):
+        """Test a resumed stream gets the buffered events it missed"""
+        for id in (1, 2, 3):
+            self.hub.publish(payload(id, user=1 if id != 2 else 2))
+
+        subscription = self.hub.subscribe(1, last_event_id=1)
+
+        self.assertEqual([event['id'] for event in drain(subscription)], [3])
+
+    def test_resume_beyond_buffer(self):
+        """Test a stream resumed from a dropped event is told to reset"""
+        for id in range(1, 6):
+            self.hub.publish(payload(id))
+
+        kept = self.hub.subscribe(1, last_event_id=2)
+        reset = self.hub.subscribe(1, last_event_id=1)
+
+        self.assertEqual([event['id'] for event in drain(kept)], [3, 4, 5])
+        self.assertEqual(drain(reset), [{'id': None, 'type': 'reset'}])
+
+    def test_resume_after_late_event(self):
+        """Test events committed after a higher id are not skipped"""
+        for id in (1, 3, 2):
+            self.hub.publish(payload(id))
+
+        subscription = self.hub.subscribe(1, last_event_id=3)
+
+        self.assertEqual([event['id'] for event in drain(subscription)], [2])
+
+    def test_resume_unknown_event(self):
+        """Test a stream resumed from an event never buffered is reset"""
+        self.hub.publish(payload(5))
+
+        subscription = self.hub.subscribe(1, last_event_id=4)
+
+        self.assertEqual(
+            drain(subscription), [{'id': None, 'type': 'reset'}]
+        )
+
+    def test_too_many_streams(self):
+        """Test a process refuses streams over its limit until one closes"""
+        self.hub.subscribe(1)
+        second = self.hub.subscribe(2)
+
+        with self.assertRaises(events.TooManyStreams):
+            self.hub.subscribe(3)
+        second.close()
+        self.hub.subscribe(3)
+
+    def test_stream(self):
+        """Test a stream sends events, heartbeats, and ends in time"""
+        subscription = self.hub.subscribe(1)
+        self.hub.publish(payload(4, type='tag', action='deleted', object=9))
+
+        chunks = list(events.stream(subscription, 0.05, 0.12))
+
+        self.assertEqual(chunks[0], 'retry: 1000\n\n')
+        self.assertEqual(
+            chunks[1],
+            'id: 4\ndata: {"type": "tag", "action": "deleted", "id": 9}\n\n'
+        )
+        self.assertIn(': heartbeat\n\n', chunks[2:])
+        self.assertEqual(self.hub.subscriptions, {})
+
+
+class ChangeNotifyTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'events@londonappdev.com', 'testpass'
+        )
+        self.hub = events.ChangeHub()
+        self.hub.start()
+        self.addCleanup(self.hub.stop)
+        self.subscription = self.hub.subscribe(self.user.pk)
+
+    def receive(self, count):
+        return [
+            (event['type'], event['action'], event['object'])
+            for event in (self.subscription.get(5) for _ in range(count))
+        ]
+
+    def test_writes_are_announced(self):
+        """Test committed writes reach the listening hub in order"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=2
+        )
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        tag_id = tag.pk
+        recipe.tags.add(tag)
+        tag.delete()
+
+        self.assertEqual(self.receive(5), [
+            ('recipe', 'created', recipe.pk),
+            ('tag', 'created', tag_id),
+            ('recipe', 'updated', recipe.pk),
+            ('tag', 'deleted', tag_id),
+            ('recipe', 'updated', recipe.pk),
+        ])
+        self.assertEqual(drain(self.subscription), [])
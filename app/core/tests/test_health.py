@@ -0,0 +1,52 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import views
+
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthCheckTests(TestCase):
+
+    def setUp(self) -> None:
+        views._readiness['expires'] = 0.0
+
+    def test_healthz_does_not_query_database(self):
+        """Test the liveness probe answers without any query"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_readyz_database_available(self):
+        """Test the readiness probe succeeds when the database answers"""
+        response = self.client.get(READYZ_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readyz_is_cached(self):
+        """Test consecutive readiness probes reuse the previous result"""
+        self.client.get(READYZ_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(READYZ_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_readyz_database_unavailable(self):
+        """Test the readiness probe fails when the database is down"""
+        with patch('django.db.backends.utils.CursorWrapper.execute') as ex:
+            ex.side_effect = OperationalError
+            response = self.client.get(READYZ_URL)
+
+        self.assertEqual(response.status_code, 503)
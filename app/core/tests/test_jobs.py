@@ -0,0 +1,151 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job, Recipe
+
+
+calls = []
+calls_lock = threading.Lock()
+
+
+@jobs.job('test_echo')
+def echo(value):
+    with calls_lock:
+        calls.append(value)
+    return {'value': value}
+
+
+@jobs.job('test_fail')
+def fail():
+    raise ValueError('broken')
+
+
+class JobTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_job(self):
+        """Test a queued job is run and its result recorded"""
+        job = jobs.enqueue('test_echo', value=3)
+
+        self.assertEqual(jobs.run_pending(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'value': 3})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_enqueue_unknown_job(self):
+        """Test queueing a job nobody handles fails straight away"""
+        with self.assertRaises(LookupError):
+            jobs.enqueue('test_missing')
+
+    def test_future_job_waits(self):
+        """Test a job is not run before it is due"""
+        jobs.enqueue(
+            'test_echo', run_at=timezone.now() + timedelta(hours=1), value=1
+        )
+
+        self.assertEqual(jobs.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_retried_with_backoff(self):
+        """Test a failing job is retried later, then marked failed"""
+        job = jobs.enqueue('test_fail', max_attempts=2)
+
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError: broken', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_lost_job_claimed_again(self):
+        """Test a job left running by a dead worker is run again"""
+        job = jobs.enqueue('test_echo', value=5)
+        jobs.claim()
+        Job.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - timedelta(days=1)
+        )
+
+        self.assertEqual(jobs.run_pending(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_purge_user_job(self):
+        """Test the purge job deletes a flagged account"""
+        user = get_user_model().objects.create_user(
+            'gone@gmail.com', 'password123', purge_requested_at=timezone.now()
+        )
+        Recipe.objects.create(user=user, title='Soup', time_minute=5, price=1)
+        job = jobs.enqueue('purge_user', user=user, user_id=user.id)
+
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertIsNone(job.user)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class JobWorkerTests(TransactionTestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_workers_run_each_job_once(self):
+        """Test concurrent workers never run the same job twice"""
+        for value in range(40):
+            jobs.enqueue('test_echo', value=value)
+
+        out = StringIO()
+        call_command('run_jobs', concurrency=4, burst=True, stdout=out)
+
+        self.assertEqual(sorted(calls), list(range(40)))
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 40
+        )
+        self.assertIn('Ran 40 jobs, 0 failed', out.getvalue())
+
+    @patch('core.management.commands.run_jobs.ERROR_DELAY', 0)
+    def test_workers_survive_database_errors(self):
+        """Test a database error is logged and the workers keep going"""
+        for value in range(10):
+            jobs.enqueue('test_echo', value=value)
+        claim = jobs.claim
+        errors = iter([OperationalError('server closed the connection')])
+
+        def flaky_claim():
+            for error in errors:
+                raise error
+            return claim()
+
+        out = StringIO()
+        with patch('core.jobs.claim', side_effect=flaky_claim), \
+                self.assertLogs('core.management.commands.run_jobs') as logs:
+            call_command('run_jobs', concurrency=2, burst=True, stdout=out)
+
+        self.assertEqual(sorted(calls), list(range(10)))
+        self.assertIn('Ran 10 jobs, 0 failed', out.getvalue())
+        self.assertIn('Database error', logs.output[0])
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.memory import bytes_per_row, is_superlinear, peak_allocation
+from core.models import Recipe
+
+
+class MemoryTests(TestCase):
+
+    def test_peak_allocation(self):
+        """Test the peak includes memory freed before the call returns"""
+        def allocate():
+            data = bytearray(10 ** 6)
+            del data
+
+        self.assertGreaterEqual(peak_allocation(allocate), 10 ** 6)
+
+    def test_bytes_per_row(self):
+        """Test the memory per extra row between consecutive sizes"""
+        peaks = {1000: 600000, 100: 150000, 5000: 2600000}
+
+        self.assertEqual(bytes_per_row(peaks), [500, 500])
+
+    def test_linear_growth(self):
+        """Test memory proportional to the rows plus a constant passes"""
+        peaks = {size: 50000 + size * 1200 for size in (100, 1000, 5000)}
+
+        self.assertFalse(is_superlinear(peaks))
+
+    def test_superlinear_growth(self):
+        """Test memory growing with the square of the rows is detected"""
+        peaks = {size: 50000 + size * size for size in (100, 1000, 5000)}
+
+        self.assertTrue(is_superlinear(peaks))
+        self.assertFalse(is_superlinear({100: 1000}))
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports every endpoint and rolls back"""
+        out = StringIO()
+
+        call_command('benchmark_memory', sizes='100,300,900', stdout=out)
+
+        for name in ('recipe list', 'tag list', 'ingredient list',
+                     'bootstrap'):
+            self.assertIn(name, out.getvalue())
+        self.assertIn('bytes/row', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_command_ceiling(self):
+        """Test the benchmark fails when a request exceeds the ceiling"""
+        with self.assertRaisesMessage(CommandError, 'over 1000'):
+            call_command(
+                'benchmark_memory', sizes='10,20', ceiling=1000,
+                stdout=StringIO()
+            )
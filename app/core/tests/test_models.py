@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -86,3 +88,226 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(recipe), recipe.title)
+
+
+class UserStatsTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = sample_user()
+
+    def stats(self):
+        """Return the current counters of the sample user"""
+        return models.UserStats.objects.get(user=self.user)
+
+    def test_stats_created_with_user(self):
+        """Test a new user starts with zeroed counters"""
+        stats = self.stats()
+
+        self.assertEqual(stats.recipe_count, 0)
+        self.assertEqual(stats.tag_count, 0)
+        self.assertEqual(stats.ingredient_count, 0)
+
+    def test_counters_follow_create_and_delete(self):
+        """Test counters are updated when objects are created and deleted"""
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        models.Ingredient.objects.create(user=self.user, name='Salt')
+        models.Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=1
+        )
+        tag.delete()
+
+        stats = self.stats()
+        self.assertEqual(stats.tag_count, 0)
+        self.assertEqual(stats.ingredient_count, 1)
+        self.assertEqual(stats.recipe_count, 1)
+
+    def test_counters_follow_bulk_paths(self):
+        """Test counters are updated by bulk creates and queryset deletes"""
+        other = sample_user(email='other@idco.io')
+        models.Tag.objects.bulk_create([
+            models.Tag(user=self.user, name='a'),
+            models.Tag(user=self.user, name='b'),
+            models.Tag(user=other, name='c'),
+        ])
+        models.Tag.objects.filter(user=self.user, name='a').delete()
+
+        self.assertEqual(self.stats().tag_count, 1)
+        self.assertEqual(
+            models.UserStats.objects.get(user=other).tag_count, 1
+        )
+
+    def test_recompute_restores_counters(self):
+        """Test recomputing fixes counters that drifted or are missing"""
+        models.Ingredient.objects.create(user=self.user, name='Salt')
+        models.UserStats.objects.filter(user=self.user).update(
+            ingredient_count=42, recipe_count=7
+        )
+
+        models.UserStats.objects.recompute([self.user.id])
+
+        stats = self.stats()
+        self.assertEqual(stats.ingredient_count, 1)
+        self.assertEqual(stats.recipe_count, 0)
+
+    def test_missing_stats_recreated_on_create(self):
+        """Test a missing counters row is rebuilt on the next create"""
+        models.UserStats.objects.filter(user=self.user).delete()
+
+        models.Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertEqual(self.stats().tag_count, 1)
+
+    def test_delete_user_with_objects(self):
+        """Test deleting a user cascades through its counted objects"""
+        models.Tag.objects.create(user=self.user, name='Vegan')
+
+        self.user.delete()
+
+        self.assertFalse(models.UserStats.objects.exists())
+
+
+class RecipeStatsTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = sample_user()
+
+    def recipe(self, price, time_minute=10):
+        """Create a recipe of the sample user"""
+        return models.Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=time_minute,
+            price=price
+        )
+
+    def stats(self):
+        """Return the current stats of the sample user"""
+        return models.UserStats.objects.get(user=self.user)
+
+    def assertStatsRecomputed(self):
+        """Assert the incremental stats match a full recompute"""
+        incremental = self.stats()
+        models.UserStats.objects.recompute([self.user.id])
+        recomputed = self.stats()
+
+        for field in ('recipe_count', 'price_total', 'price_min',
+                      'price_max', 'time_histogram'):
+            self.assertEqual(
+                getattr(incremental, field), getattr(recomputed, field)
+            )
+
+    def test_drifted_counters_stop_at_zero(self):
+        """Test deletes succeed when the counters are already too low"""
+        recipe = self.recipe(2)
+        tag = models.Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        models.UserStats.objects.filter(user=self.user) \
+            .update(recipe_count=0, tag_count=0)
+        models.Tag.objects.filter(pk=tag.pk).update(recipe_count=0)
+
+        recipe.delete()
+        tag.delete()
+
+        stats = self.stats()
+        self.assertEqual((stats.recipe_count, stats.tag_count), (0, 0))
+
+    def test_price_aggregates(self):
+        """Test price aggregates follow recipes created and deleted"""
+        self.recipe(2)
+        cheapest = self.recipe(1)
+        self.recipe(6)
+
+        stats = self.stats()
+        self.assertEqual(stats.price_average, Decimal('3.00'))
+        self.assertEqual(stats.price_min, Decimal('1'))
+        self.assertEqual(stats.price_max, Decimal('6'))
+
+        cheapest.delete()
+
+        stats = self.stats()
+        self.assertEqual(stats.price_average, Decimal('4.00'))
+        self.assertEqual(stats.price_min, Decimal('2'))
+        self.assertStatsRecomputed()
+
+    def test_update_moves_recipe_in_stats(self):
+        """Test updating a recipe replaces its old price and time"""
+        self.recipe(2)
+        recipe = models.Recipe.objects.get(id=self.recipe(3, 200).id)
+
+        recipe.price = 9
+        recipe.time_minute = 20
+        recipe.save()
+
+        stats = self.stats()
+        self.assertEqual(stats.price_max, Decimal('9'))
+        self.assertEqual(stats.time_histogram, [1, 1, 0, 0, 0])
+        self.assertStatsRecomputed()
+
+    def test_time_histogram(self):
+        """Test cooking times are counted in their buckets"""
+        for minutes in (5, 15, 16, 45, 120, 500):
+            self.recipe(1, minutes)
+
+        self.assertEqual(self.stats().time_histogram, [2, 1, 1, 1, 1])
+        self.assertStatsRecomputed()
+
+    def test_bulk_create_recipes(self):
+        """Test bulk created recipes are added to the stats"""
+        models.Recipe.objects.bulk_create([
+            models.Recipe(user=self.user, title='a', time_minute=5, price=3),
+            models.Recipe(user=self.user, title='b', time_minute=50, price=1),
+        ])
+
+        stats = self.stats()
+        self.assertEqual(stats.recipe_count, 2)
+        self.assertEqual(stats.price_min, Decimal('1'))
+        self.assertStatsRecomputed()
+
+    def test_tag_usage_counts(self):
+        """Test tags count the recipes using them through every M2M path"""
+        vegan = models.Tag.objects.create(user=self.user, name='Vegan')
+        quick = models.Tag.objects.create(user=self.user, name='Quick')
+        soup, stew, salad = self.recipe(1), self.recipe(2), self.recipe(3)
+
+        soup.tags.add(vegan, quick)
+        stew.tags.set([vegan])
+        vegan.recipe_set.add(salad)
+        soup.tags.remove(quick)
+        stew.tags.clear()
+        salad.delete()
+
+        vegan.refresh_from_db()
+        quick.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 1)
+        self.assertEqual(quick.recipe_count, 0)
+
+        vegan.recipe_set.clear()
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 0)
+
+    def test_removing_unlinked_tags(self):
+        """Test removing links that don't exist leaves the counts alone"""
+        vegan = models.Tag.objects.create(user=self.user, name='Vegan')
+        quick = models.Tag.objects.create(user=self.user, name='Quick')
+        soup, stew = self.recipe(1), self.recipe(2)
+        soup.tags.add(vegan)
+
+        soup.tags.remove(quick)
+        vegan.recipe_set.remove(soup, stew)
+
+        vegan.refresh_from_db()
+        quick.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 0)
+        self.assertEqual(quick.recipe_count, 0)
+
+    def test_save_keeps_ingredient_ids(self):
+        """Test saving a stale recipe doesn't overwrite its ingredient ids"""
+        recipe = self.recipe(1)
+        salt = models.Ingredient.objects.create(user=self.user, name='Salt')
+        stale = models.Recipe.objects.get(id=recipe.id)
+        recipe.ingredients.add(salt)
+
+        stale.title = 'Salty soup'
+        stale.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredient_ids, [salt.id])
+        self.assertEqual(recipe.title, 'Salty soup')
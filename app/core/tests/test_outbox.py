@@ -0,0 +1,253 @@
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import outbox
+from core.models import OutboxEvent, Recipe, Tag
+
+
+class WebhookServer(HTTPServer):
+    """Local stand-in for a webhook, recording what it is sent"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), WebhookHandler)
+        self.status = 204
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/hook' % self.server_port
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.headers, body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.server = WebhookServer()
+        self.addCleanup(self.server.close)
+        settings = override_settings(
+            OUTBOX_WEBHOOK_URLS=[self.server.url],
+            OUTBOX_WEBHOOK_SECRET='secret',
+            OUTBOX_MAX_ATTEMPTS=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            'outbox@londonappdev.com', 'testpass'
+        )
+
+    def sent_events(self):
+        """Return the (type, action, object) of every event received"""
+        return [
+            [(e['type'], e['action'], e['object']) for e in batch['events']]
+            for batch in (json.loads(body) for _, body in self.server.requests)
+        ]
+
+    def test_writes_are_recorded(self):
+        """Test writes add events to the outbox in their transaction"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=2
+        )
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name='Undone')
+            transaction.set_rollback(True)
+
+        events = OutboxEvent.objects.values_list(
+            'url', 'user_id', 'type', 'action', 'object_id'
+        )
+        self.assertEqual(list(events), [
+            (self.server.url, self.user.pk, 'recipe', 'created', recipe.pk),
+        ])
+
+    def test_nothing_recorded_without_webhooks(self):
+        """Test no event is kept when no webhook is configured"""
+        with self.settings(OUTBOX_WEBHOOK_URLS=[]):
+            Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_dispatch_coalesced_batch(self):
+        """Test due events are sent once, keeping each object's last change"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=2
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.title = 'Stew'
+        recipe.save()
+
+        counts = outbox.dispatch(batch_size=10)
+
+        self.assertEqual(counts, {'sent': 3, 'failed': 0})
+        self.assertEqual(self.sent_events(), [
+            [('tag', 'created', tag.pk), ('recipe', 'updated', recipe.pk)],
+        ])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_signed_batch(self):
+        """Test batches are signed with the webhook secret"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        outbox.dispatch(batch_size=10)
+
+        headers, body = self.server.requests[0]
+        signature = hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+        self.assertEqual(headers['X-Outbox-Signature'], 'sha256=' + signature)
+
+    def test_batch_size(self):
+        """Test a dispatch claims at most a batch of events"""
+        for name in ('Vegan', 'Spicy', 'Quick'):
+            Tag.objects.create(user=self.user, name=name)
+
+        outbox.dispatch(batch_size=2)
+
+        self.assertEqual(len(self.sent_events()[0]), 2)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_retry_then_fail(self):
+        """Test refused events are retried later, then given up"""
+        self.server.status = 500
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        counts = outbox.dispatch(batch_size=10)
+        event = OutboxEvent.objects.get()
+
+        self.assertEqual(counts, {'sent': 0, 'failed': 1})
+        self.assertEqual(event.status, OutboxEvent.PENDING)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertIn('500', event.last_error)
+        self.assertEqual(outbox.dispatch(batch_size=10)['failed'], 0)
+
+        event.next_attempt_at = timezone.now() - timedelta(seconds=1)
+        event.save()
+        outbox.dispatch(batch_size=10)
+        event.refresh_from_db()
+
+        self.assertEqual(event.status, OutboxEvent.FAILED)
+        self.assertEqual(event.attempts, 2)
+
+    def test_events_given_up_on_their_own(self):
+        """Test an exhausted event fails alone, sparing newer and others"""
+        self.server.status = 500
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        OutboxEvent.objects.update(attempts=1)
+        tag.name = 'Vegetarian'
+        tag.save()
+        other = Tag.objects.create(user=self.user, name='Spicy')
+
+        counts = outbox.dispatch(batch_size=10)
+
+        self.assertEqual(counts, {'sent': 0, 'failed': 3})
+        events = OutboxEvent.objects.order_by('pk')
+        self.assertEqual(
+            [(e.object_id, e.action, e.status, e.attempts) for e in events],
+            [
+                (tag.pk, 'created', OutboxEvent.FAILED, 2),
+                (tag.pk, 'updated', OutboxEvent.PENDING, 1),
+                (other.pk, 'created', OutboxEvent.PENDING, 1),
+            ]
+        )
+        self.assertTrue(all(
+            event.next_attempt_at > timezone.now() for event in events[1:]
+        ))
+
+    def test_retry_keeps_object_order(self):
+        """Test newer changes wait for a refused change of the object"""
+        self.server.status = 500
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        outbox.dispatch(batch_size=10)
+        self.server.status = 204
+        tag.name = 'Vegetarian'
+        tag.save()
+        other = Tag.objects.create(user=self.user, name='Spicy')
+
+        counts = outbox.dispatch(batch_size=10)
+
+        self.assertEqual(counts, {'sent': 1, 'failed': 0})
+        self.assertEqual(self.sent_events(), [
+            [('tag', 'created', tag.pk)], [('tag', 'created', other.pk)],
+        ])
+
+        OutboxEvent.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        counts = outbox.dispatch(batch_size=10)
+
+        self.assertEqual(counts, {'sent': 2, 'failed': 0})
+        self.assertEqual(
+            self.sent_events()[-1], [('tag', 'updated', tag.pk)]
+        )
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_object_claimed_once(self):
+        """Test events of an object being delivered are not claimed again"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        first = outbox.claim(batch_size=1)
+        tag.delete()
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(outbox.claim(batch_size=10), [])
+
+    def test_dispatch_command(self):
+        """Test the dispatcher sends every due event and exits"""
+        for name in ('Vegan', 'Spicy', 'Quick'):
+            Tag.objects.create(user=self.user, name=name)
+        out = StringIO()
+
+        call_command(
+            'dispatch_outbox', batch_size=2, burst=True, stdout=out
+        )
+
+        self.assertIn('Sent 3 events, 0 failed', out.getvalue())
+        self.assertEqual(len(self.server.requests), 2)
+
+    @patch('core.management.commands.dispatch_outbox.ERROR_DELAY', 0)
+    def test_dispatch_command_survives_database_errors(self):
+        """Test a database error is logged and delivery goes on"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        dispatch = outbox.dispatch
+        errors = iter([OperationalError('server closed the connection')])
+
+        def flaky_dispatch(batch_size):
+            for error in errors:
+                raise error
+            return dispatch(batch_size)
+
+        out = StringIO()
+        with patch('core.outbox.dispatch', side_effect=flaky_dispatch), \
+                self.assertLogs('core.management.commands.dispatch_outbox'):
+            call_command('dispatch_outbox', burst=True, stdout=out)
+
+        self.assertIn('Sent 1 events, 0 failed', out.getvalue())
@@ -0,0 +1,183 @@
+import re
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.partitioning import is_partitioned, orphaned_references, \
+    partition_recipe_tables
+from core.purge import purge_user
+
+
+PARTITIONS = 4
+
+
+def scanned_partitions(queryset, table):
+    """Return the partitions of a table the plan of a queryset reads"""
+    return plan_partitions(queryset.explain(), table)
+
+
+def statement_partitions(sql, table):
+    """Return the partitions of a table the plan of a statement reads"""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql)
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+    return plan_partitions(plan, table)
+
+
+def plan_partitions(plan, table):
+    """Return the partitions of a table named in a plan"""
+    return set(re.findall(r'\b%s_p\d+\b' % table, plan))
+
+
+class PartitioningTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com', 'password123'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minute=60, price=8
+        )
+        self.recipe.tags.add(self.tag)
+        # DDL is transactional in Postgres: rolled back after each test.
+        partition_recipe_tables(PARTITIONS)
+
+    def test_tables_partitioned_with_data(self):
+        """Test the tables are partitioned and keep their rows"""
+        with connection.cursor() as cursor:
+            for table in ('core_recipe', 'core_recipe_tags',
+                          'core_recipe_ingredients'):
+                self.assertTrue(is_partitioned(cursor, table))
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        other = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=2
+        )
+        self.assertGreater(other.id, self.recipe.id)
+
+    def test_user_queries_read_one_partition(self):
+        """Test filtering on the user prunes every other partition"""
+        for i in range(20):
+            user = get_user_model().objects.create_user(
+                'user%d@gmail.com' % i, 'password123'
+            )
+            Recipe.objects.create(user=user, title='Toast', time_minute=5,
+                                  price=1)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        self.assertEqual(len(scanned_partitions(recipes, 'core_recipe')), 1)
+
+        recipes = Recipe.objects.filter(user=self.user, price__lte=10) \
+            .order_by('price', 'id')
+        self.assertEqual(len(scanned_partitions(recipes, 'core_recipe')), 1)
+
+        links = Recipe.tags.through.objects.filter(recipe_id=self.recipe.id)
+        self.assertEqual(
+            len(scanned_partitions(links, 'core_recipe_tags')), 1
+        )
+
+        everyone = Recipe.objects.all()
+        self.assertEqual(
+            len(scanned_partitions(everyone, 'core_recipe')), PARTITIONS
+        )
+
+    def test_recipe_writes(self):
+        """Test recipe updates read one partition and deletes all of them"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.recipe.title = 'Goulash'
+            self.recipe.save()
+            self.recipe.ingredients.add(ingredient)
+            self.recipe.delete()
+
+        statements = [query['sql'] for query in queries]
+        updates = [
+            sql for sql in statements
+            if sql.startswith('UPDATE "core_recipe" ')
+        ]
+        self.assertEqual(len(updates), 2)
+        for sql in updates:
+            self.assertEqual(
+                len(statement_partitions(sql, 'core_recipe')), 1, sql
+            )
+        # The ORM deletes the recipes it collected by id alone.
+        delete, = [
+            sql for sql in statements
+            if sql.startswith('DELETE FROM "core_recipe" ')
+        ]
+        self.assertEqual(
+            len(statement_partitions(delete, 'core_recipe')), PARTITIONS
+        )
+
+    def test_api_on_partitioned_tables(self):
+        """Test the recipe API works on the partitioned tables"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        response = client.post(reverse('recipe:recipe-list'), {
+            'title': 'Curry',
+            'time_minute': 30,
+            'price': 6,
+            'tags': [self.tag.id],
+            'ingredients': [ingredient.id],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = client.get(reverse('recipe:recipe-list'))
+        self.assertEqual(len(response.data), 2)
+
+        response = client.delete(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+
+    def test_purge_partitioned_account(self):
+        """Test accounts are purged from the partitioned tables"""
+        purge_user(self.user.id)
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+
+    def test_orphaned_links_reported(self):
+        """Test links to recipes deleted by raw SQL are found"""
+        self.assertEqual(orphaned_references(), {})
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM core_recipe WHERE id = %s', [self.recipe.id]
+            )
+
+        self.assertEqual(orphaned_references(), {
+            'core_recipe_tags.recipe_id': 1,
+            'core_recipesignature.recipe_id': 1,
+        })
+        with self.assertRaisesMessage(CommandError,
+                                      'core_recipe_tags.recipe_id (1)'):
+            call_command('partition_recipes', check=True, stdout=StringIO())
+
+
+class PartitionCommandTests(TestCase):
+
+    def test_dropped_keys_listed(self):
+        """Test the command lists the foreign keys it drops"""
+        out = StringIO()
+        call_command('partition_recipes', partitions=PARTITIONS, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Dropped foreign key core_recipe_tags.', output)
+        self.assertIn('Dropped foreign key core_recipesignature.', output)
+        self.assertIn('No rows reference missing recipes', output)
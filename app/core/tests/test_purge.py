@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core import cdn, similarity
+from core.models import Ingredient, Job, OutboxEvent, Recipe, \
+    RecipeSignature, Tag, UserStats
+from core.purge import purge_user
+
+
+def seed_account(user, recipes):
+    """Give a user many recipes, each linked to a tag and an ingredient"""
+    tag = Tag.objects.create(user=user, name='Dinner')
+    ingredient = Ingredient.objects.create(user=user, name='Salt')
+    Recipe.objects.bulk_create(
+        Recipe(user=user, title='Recipe %d' % i, time_minute=10, price=1)
+        for i in range(recipes)
+    )
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=id, tag=tag) for id in recipe_ids
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(recipe_id=id, ingredient=ingredient)
+        for id in recipe_ids
+    )
+    similarity.refresh_signatures(recipe_ids)
+    # As autovacuum would after a bulk load: the statistics left by earlier
+    # tests may describe these tables as empty, and the batches then get
+    # planned as nested loops over every link.
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class PurgeTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'purged@gmail.com', 'password123'
+        )
+        self.other = get_user_model().objects.create_user(
+            'kept@gmail.com', 'password123'
+        )
+
+    def test_purge_large_account(self):
+        """Test a big account is deleted in batches, sparing other users"""
+        seed_account(self.user, 5000)
+        seed_account(self.other, 10)
+        batches = []
+
+        deleted = purge_user(
+            self.user.id,
+            batch_size=1000,
+            progress=lambda table, count: batches.append((table, count)),
+        )
+
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(deleted[Recipe._meta.db_table], 5000)
+        self.assertEqual(deleted[Recipe.tags.through._meta.db_table], 5000)
+        self.assertTrue(all(count <= 1000 for _, count in batches))
+        self.assertEqual(len(batches), 4 * 5 + 2)
+        self.assertEqual(Recipe.objects.count(), 10)
+        self.assertEqual(Recipe.tags.through.objects.count(), 10)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 10)
+        self.assertEqual(RecipeSignature.objects.count(), 10)
+        self.assertEqual(Tag.objects.get().user, self.other)
+        self.assertEqual(UserStats.objects.get().user, self.other)
+
+    @override_settings(CDN_PURGE_URL='http://cdn.invalid/purge')
+    def test_shared_recipes_purged_from_cdn(self):
+        """Test the CDN copies of the purged user's shared recipes go"""
+        seed_account(self.user, 3)
+        shared = Recipe.objects.filter(user=self.user).first()
+        shared.share()
+        Recipe.objects.create(
+            user=self.other, title='Kept', time_minute=5, price=1
+        ).share()
+        Job.objects.all().delete()
+
+        purge_user(self.user.id)
+
+        self.assertEqual(
+            [job.payload['keys'] for job in Job.objects.all()],
+            [[cdn.key(Recipe, shared.id)]]
+        )
+
+    @override_settings(OUTBOX_WEBHOOK_URLS=['http://hook.invalid/'])
+    def test_deletions_recorded_in_outbox(self):
+        """Test the purged objects are announced as deleted to webhooks"""
+        seed_account(self.user, 2)
+        seed_account(self.other, 1)
+        OutboxEvent.objects.all().delete()
+        expected = {
+            (model._meta.model_name, id)
+            for model in (Recipe, Tag, Ingredient)
+            for id in model.objects.filter(user=self.user)
+            .values_list('id', flat=True)
+        }
+
+        purge_user(self.user.id)
+
+        events = OutboxEvent.objects.filter(user_id=self.user.id)
+        self.assertEqual(
+            set(events.values_list('type', 'object_id')), expected
+        )
+        self.assertEqual(set(events.values_list('action', flat=True)),
+                         {'deleted'})
+        self.assertFalse(
+            OutboxEvent.objects.exclude(user_id=self.user.id).exists()
+        )
+
+    def test_purge_users_command(self):
+        """Test the command purges only accounts flagged for purging"""
+        seed_account(self.user, 3)
+        get_user_model().objects.filter(id=self.user.id) \
+            .update(is_active=False, purge_requested_at='2020-01-01T00:00Z')
+
+        call_command('purge_users', stdout=StringIO())
+
+        self.assertEqual(
+            list(get_user_model().objects.values_list('id', flat=True)),
+            [self.other.id]
+        )
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,305 @@
+"""
+Query plan regression tests.
+
+Every recipe and user endpoint is called against a dataset large enough for
+the planner to prefer indexes, and each statement it issued is explained.
+A sequential scan of a recipe, tag, ingredient or link table fails the test
+with the plan of the statement. How each statement reads those tables is
+also compared with `query_plans.json`, so a changed plan shows up as a diff;
+run with UPDATE_QUERY_PLANS=1 to record the plans again after a change.
+"""
+import difflib
+import json
+import os
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import similarity
+from core.models import Ingredient, Recipe, Tag, UserStats
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'query_plans.json')
+
+USERS = 40
+RECIPES_PER_USER = 500
+TAGS_PER_USER = 500
+INGREDIENTS_PER_USER = 1000
+TAGS_PER_RECIPE = 3
+INGREDIENTS_PER_RECIPE = 8
+
+WATCHED_TABLES = (
+    'core_recipe', 'core_tag', 'core_ingredient',
+    'core_recipe_tags', 'core_recipe_ingredients',
+)
+EXPLAINED = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def watched_table(relation):
+    """Return the watched table a relation or one of its partitions is of"""
+    table = re.sub(r'_p\d+$', '', relation or '')
+    return table if table in WATCHED_TABLES else None
+
+
+def plan_nodes(node, depth=0):
+    """Yield every node of a JSON plan with its depth"""
+    yield node, depth
+    for child in node.get('Plans', ()):
+        yield from plan_nodes(child, depth + 1)
+
+
+def describe_node(node):
+    """Return a line describing what a plan node does"""
+    line = node['Node Type']
+    if 'Relation Name' in node:
+        line += ' on %s' % node['Relation Name']
+    if 'Index Name' in node:
+        line += ' using %s' % node['Index Name']
+    return line
+
+
+def format_plan(plan):
+    """Return a plan as an indented tree"""
+    return '\n'.join(
+        '  ' * depth + describe_node(node) for node, depth in plan_nodes(plan)
+    )
+
+
+def access_kind(node):
+    """Return how a plan node touches its table"""
+    if node['Node Type'] == 'ModifyTable':
+        return node['Operation'].lower()
+    if node['Node Type'] == 'Seq Scan':
+        return 'seq scan'
+    if 'Index' in node['Node Type'] or node['Node Type'].startswith('Bitmap'):
+        return 'index'
+    return node['Node Type'].lower()
+
+
+def table_accesses(plan):
+    """Return the watched tables a plan reads, and whether through an index
+
+    Which of several fitting indexes is picked varies with the statistics,
+    so only the kind of access is recorded.
+    """
+    accesses = set()
+    for node, _ in plan_nodes(plan):
+        table = watched_table(node.get('Relation Name'))
+        if table is not None:
+            accesses.add('%s: %s' % (table, access_kind(node)))
+    return sorted(accesses)
+
+
+def explain(sql):
+    """Return the root node of the plan of a statement"""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def seed():
+    """Create many users, each with their tags, ingredients and recipes"""
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(email='plans%d@londonappdev.com' % i, name='Plans')
+        for i in range(USERS)
+    )
+    for user in users:
+        Tag.objects.bulk_create(
+            Tag(user=user, name='Tag %d' % i) for i in range(TAGS_PER_USER)
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(user=user, name='Ingredient %d' % i)
+            for i in range(INGREDIENTS_PER_USER)
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=user, title='Recipe %d' % i,
+                time_minute=5 + i % 90, price=1 + i % 40,
+            )
+            for i in range(RECIPES_PER_USER)
+        )
+
+    # Link each recipe to a spread of its owner's tags and ingredients,
+    # whose ids are consecutive per user.
+    with connection.cursor() as cursor:
+        for model, per_user, per_recipe in (
+            (Tag, TAGS_PER_USER, TAGS_PER_RECIPE),
+            (Ingredient, INGREDIENTS_PER_USER, INGREDIENTS_PER_RECIPE),
+        ):
+            through = Recipe._meta.get_field(
+                model._meta.model_name + 's'
+            ).remote_field.through
+            cursor.execute(
+                'INSERT INTO {through} (recipe_id, {column}) '
+                'SELECT recipe.id, first.id + (recipe.id * 7 + k * 31) %% %s '
+                'FROM core_recipe recipe '
+                'JOIN (SELECT user_id, MIN(id) AS id FROM {table} '
+                '      GROUP BY user_id) first '
+                '  ON first.user_id = recipe.user_id '
+                'CROSS JOIN generate_series(0, %s) k'.format(
+                    through=through._meta.db_table,
+                    column=model._meta.model_name + '_id',
+                    table=model._meta.db_table,
+                ),
+                [per_user, per_recipe - 1]
+            )
+    Recipe.objects.all().sync_ingredient_ids()
+    UserStats.objects.recompute([user.id for user in users])
+    similarity.refresh_signatures(
+        Recipe.objects.filter(user=users[0]).values_list('id', flat=True)
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    return users[0]
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed()
+        cls.recipes = list(
+            Recipe.objects.filter(user=cls.user).order_by('id')
+            .values_list('id', flat=True)
+        )
+        cls.tags = list(
+            Tag.objects.filter(user=cls.user).order_by('id')
+            .values_list('id', flat=True)
+        )
+        cls.ingredients = list(
+            Ingredient.objects.filter(user=cls.user).order_by('id')
+            .values_list('id', flat=True)
+        )
+        cls.shared = Recipe.objects.get(pk=cls.recipes[11])
+        cls.shared.share()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # The row counts ANALYZE stores outlive the rollback of the seed;
+        # count again so the following tests are planned for what is left.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, ids):
+        return ','.join(str(id) for id in ids)
+
+    def get_requests(self):
+        """Return the name, method, URL and data of each request to check"""
+        recipe = self.recipes[10]
+        recipe_url = reverse('recipe:recipe-detail', args=[recipe])
+        list_url = reverse('recipe:recipe-list')
+        return [
+            ('recipe list', 'get', list_url, {'page_size': 20}),
+            ('recipe list by price', 'get', list_url, {
+                'price_min': 10, 'price_max': 12, 'ordering': 'price',
+                'page_size': 20,
+            }),
+            ('recipe list by time', 'get', list_url, {
+                'time_max': 20, 'ordering': '-time_minute', 'page_size': 20,
+            }),
+            ('recipe list by title', 'get', list_url, {
+                'ordering': 'title', 'page_size': 20,
+            }),
+            ('recipe detail', 'get', recipe_url, {}),
+            ('recipe batch', 'get', reverse('recipe:recipe-batch'), {
+                'ids': self.ids(self.recipes[:20]),
+            }),
+            ('recipe pantry', 'get', reverse('recipe:recipe-pantry'), {
+                'ingredients': self.ids(self.ingredients[:30]),
+                'missing': 1,
+            }),
+            ('recipe shopping list', 'get',
+             reverse('recipe:recipe-shopping-list'), {
+                 'recipes': self.ids(self.recipes[:10]),
+             }),
+            ('recipe similar', 'get',
+             reverse('recipe:recipe-similar', args=[recipe]), {}),
+            ('recipe create', 'post', list_url, {
+                'title': 'Plans', 'time_minute': 5, 'price': '3.00',
+                'tags': self.tags[:3], 'ingredients': self.ingredients[:5],
+            }),
+            ('recipe update', 'patch', recipe_url, {
+                'tags_add': self.tags[-2:],
+                'ingredients_remove': self.ingredients[:5],
+            }),
+            ('recipe shared', 'get',
+             reverse('recipe:shared-recipe', args=[self.shared.share_slug]),
+             {}),
+            ('recipe delete', 'delete',
+             reverse('recipe:recipe-detail', args=[self.recipes[-1]]), {}),
+            ('tag list', 'get', reverse('recipe:tag-list'), {}),
+            ('tag recipes', 'post',
+             reverse('recipe:tag-recipes', args=[self.tags[0]]), {
+                 'add': self.recipes[20:30],
+                 'remove': self.recipes[30:35],
+             }),
+            ('ingredient list', 'get', reverse('recipe:ingredient-list'), {}),
+            ('user me', 'get', reverse('user:me'), {}),
+            ('user stats', 'get', reverse('user:stats'), {}),
+            ('user bootstrap', 'get', reverse('user:bootstrap'), {}),
+        ]
+
+    def capture(self, method, url, data):
+        """Make a request and return the statements it issued"""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format=(
+                None if method == 'get' else 'json'
+            ))
+        self.assertLess(response.status_code, 300, response.content)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith(EXPLAINED)
+        ]
+
+    def test_no_sequential_scans(self):
+        """Test no endpoint reads a recipe table sequentially"""
+        plans = {}
+        for name, method, url, data in self.get_requests():
+            plans[name] = []
+            for sql in self.capture(method, url, data):
+                plan = explain(sql)
+                accesses = table_accesses(plan)
+                plans[name].append(accesses)
+                with self.subTest(endpoint=name):
+                    self.assertNotIn('seq scan', [
+                        access.split(': ')[1] for access in accesses
+                    ],
+                        '%s\n\n%s' % (sql, format_plan(plan))
+                    )
+
+        self.compare_with_baseline(plans)
+
+    def compare_with_baseline(self, plans):
+        """Fail with a diff if the plans differ from the recorded ones"""
+        current = json.dumps(plans, indent=2, sort_keys=True) + '\n'
+        if os.environ.get('UPDATE_QUERY_PLANS'):
+            with open(BASELINE, 'w') as baseline:
+                baseline.write(current)
+            return
+
+        with open(BASELINE) as baseline:
+            recorded = baseline.read()
+        if current != recorded:
+            diff = difflib.unified_diff(
+                recorded.splitlines(), current.splitlines(),
+                'recorded plans', 'current plans', lineterm='',
+            )
+            self.fail(
+                'The query plans changed; if this is expected, run the '
+                'tests with UPDATE_QUERY_PLANS=1.\n' + '\n'.join(diff)
+            )
@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import routers
+from core.middleware import ReplicaPinningMiddleware
+from core.models import Recipe
+
+
+REPLICAS = ['replica_0', 'replica_1']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self) -> None:
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+        self.status = 200
+        self.middleware = ReplicaPinningMiddleware(self.read_alias)
+        cache.clear()
+
+    def tearDown(self) -> None:
+        routers.allow_replica_reads(False)
+
+    def read_alias(self, request):
+        """Record the database a read would be routed to"""
+        self.seen.append(self.router.db_for_read(Recipe))
+        return HttpResponse(status=self.status)
+
+    def request(self, method, token='Token abc'):
+        """Run a request through the middleware and return its read alias"""
+        request = getattr(self.factory, method)(
+            '/', HTTP_AUTHORIZATION=token
+        )
+        self.middleware(request)
+        return self.seen[-1]
+
+    def test_reads_default_to_primary(self):
+        """Test reads outside a request use the primary"""
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_writes_use_primary(self):
+        """Test writes are never routed to a replica"""
+        routers.allow_replica_reads(True)
+
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    @patch('core.routers.replica_is_healthy', return_value=True)
+    def test_safe_request_reads_from_replica(self, healthy):
+        """Test safe requests read from a replica"""
+        self.assertIn(self.request('get'), REPLICAS)
+
+    @patch('core.routers.replica_is_healthy', return_value=True)
+    def test_unsafe_request_reads_from_primary(self, healthy):
+        """Test reads made while handling a write use the primary"""
+        self.assertEqual(self.request('post'), 'default')
+
+    @patch('core.routers.replica_is_healthy', return_value=True)
+    def test_client_pinned_after_write(self, healthy):
+        """Test a client reads from the primary right after writing"""
+        self.request('post')
+
+        self.assertEqual(self.request('get'), 'default')
+        self.assertIn(self.request('get', token='Token other'), REPLICAS)
+
+    @patch('core.routers.replica_is_healthy', return_value=True)
+    def test_client_not_pinned_after_failed_write(self, healthy):
+        """Test a refused write leaves the client reading from replicas"""
+        self.status = 400
+        self.request('post')
+        self.status = 200
+
+        self.assertIn(self.request('get'), REPLICAS)
+
+    @patch('core.routers.replica_is_healthy')
+    def test_unhealthy_replica_skipped(self, healthy):
+        """Test reads avoid replicas failing their health check"""
+        healthy.side_effect = lambda alias: alias == 'replica_1'
+
+        for _ in range(5):
+            self.assertEqual(self.request('get'), 'replica_1')
+
+    @patch('core.routers.replica_is_healthy', return_value=False)
+    def test_falls_back_to_primary(self, healthy):
+        """Test reads use the primary when no replica is healthy"""
+        self.assertEqual(self.request('get'), 'default')
+
+    @patch('core.routers.replica_is_healthy', return_value=True)
+    def test_state_reset_after_request(self, healthy):
+        """Test replica reads are disabled again after the request"""
+        self.request('get')
+
+        self.assertFalse(routers.replica_reads_allowed())
+
+    def test_replica_health_check(self):
+        """Test the health check reports a reachable database as healthy"""
+        routers._health.clear()
+
+        self.assertTrue(routers.replica_is_healthy('default'))
+        self.assertIn('default', routers._health)
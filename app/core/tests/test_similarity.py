@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import similarity
+from core.models import Ingredient, Recipe, RecipeSignature, Tag
+
+
+class SimilarityTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'demo@idco.io', 'pass1234'
+        )
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name='i%d' % i)
+            for i in range(8)
+        ]
+
+    def recipe(self, *ingredients, user=None):
+        """Create a recipe using the given sample ingredients"""
+        recipe = Recipe.objects.create(
+            user=user or self.user, title='Recipe', time_minute=5, price=1
+        )
+        recipe.ingredients.set([self.ingredients[i] for i in ingredients])
+        return recipe
+
+    def test_estimate_close_to_jaccard(self):
+        """Test signatures estimate the Jaccard similarity of sets"""
+        a = similarity.minhash(set(range(0, 100)))
+        b = similarity.minhash(set(range(50, 150)))
+
+        self.assertAlmostEqual(
+            similarity.estimate_similarity(a, b), 1 / 3, delta=0.15
+        )
+        self.assertEqual(similarity.estimate_similarity(a, a), 1.0)
+
+    def test_similar_recipes_ranked(self):
+        """Test similar recipes are returned most similar first"""
+        # Similar enough to be found by the bands whatever the ids are.
+        base = self.recipe(0, 1, 2, 3, 4, 5)
+        close = self.recipe(0, 1, 2, 3, 4, 5)
+        farther = self.recipe(0, 1, 2, 3, 4, 5, 6, 7)
+        self.recipe(6, 7)
+
+        matches = similarity.similar_recipes(base)
+
+        self.assertEqual([r for r, _ in matches][:2], [close, farther])
+        self.assertGreater(matches[0][1], matches[1][1])
+
+    def test_signature_follows_changes(self):
+        """Test signatures are updated when tags or ingredients change"""
+        base = self.recipe(0, 1, 2, 3)
+        other = self.recipe(4, 5, 6, 7)
+        self.assertEqual(similarity.similar_recipes(base), [])
+
+        other.ingredients.set(self.ingredients[:4])
+        self.assertEqual(similarity.similar_recipes(base), [(other, 1.0)])
+
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tag.recipe_set.add(other)
+        score = similarity.similar_recipes(base)[0][1]
+        self.assertLess(score, 1.0)
+
+        tag.delete()
+        self.assertEqual(similarity.similar_recipes(base), [(other, 1.0)])
+
+        other.ingredients.clear()
+        self.assertFalse(RecipeSignature.objects.filter(recipe=other).exists())
+
+    def test_other_users_recipes_excluded(self):
+        """Test only the owner's recipes are considered similar"""
+        base = self.recipe(0, 1, 2)
+        other_user = get_user_model().objects.create_user('o@idco.io', 'pass')
+        self.recipe(0, 1, 2, user=other_user)
+
+        self.assertEqual(similarity.similar_recipes(base), [])
+
+    def test_delete_user_with_signatures(self):
+        """Test deleting a user removes its recipes and their signatures"""
+        self.recipe(0, 1)
+        Tag.objects.create(user=self.user, name='Vegan').recipe_set.add(
+            self.recipe(1, 2)
+        )
+
+        self.user.delete()
+
+        self.assertFalse(RecipeSignature.objects.exists())
+
+    def test_rebuild_index(self):
+        """Test the rebuild command recreates missing signatures"""
+        base = self.recipe(0, 1, 2)
+        other = self.recipe(0, 1, 2)
+        RecipeSignature.objects.all().delete()
+
+        call_command('rebuild_similarity_index', batch_size=1)
+
+        self.assertEqual(similarity.similar_recipes(base), [(other, 1.0)])
@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase
+
+from core import startup
+
+
+IMPORTTIME = '''\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _json
+import time:      1500 |       1620 |   json
+other output
+import time:        80 |       1700 | core.startup
+'''
+
+
+class StartupProfileTests(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        """Test the time of each import is read from the interpreter"""
+        self.assertEqual(startup.parse_importtime(IMPORTTIME), [
+            ('_json', 120, 120),
+            ('json', 1500, 1620),
+            ('core.startup', 80, 1700),
+        ])
+
+    def test_api_settings_skip_admin(self):
+        """Test the API only settings start without the admin site"""
+        phases, imports = startup.profile('app.settings_api')
+        _, full_imports = startup.profile('app.settings')
+
+        self.assertEqual(set(phases), {'setup', 'urls', 'serializers'})
+        modules = {module for module, _, _ in imports}
+        self.assertIn('core.models', modules)
+        self.assertIn('recipe.serializer', modules)
+        self.assertNotIn('core.admin', modules)
+        self.assertNotIn('django.contrib.sessions.models', modules)
+        self.assertIn('core.admin', {module for module, _, _ in full_imports})
+
+    def test_profile_command(self):
+        """Test the report lists the phases and the slowest imports"""
+        out = StringIO()
+
+        call_command('startup_profile', top=3, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Settings: app.settings')
+        self.assertIn('modules imported in', lines[4])
+        self.assertEqual(len(lines), 5 + 2 + 3)
+
+
+class WarmUpTests(TestCase):
+
+    def test_warm_up(self):
+        """Test warming up times each step"""
+        timings = startup.warm_up()
+
+        self.assertEqual(set(timings), {'urls', 'serializers', 'db'})
+        self.assertIsNotNone(connection.connection)
+
+    def test_connect_threads(self):
+        """Test every thread of a pool is connected to the database"""
+        executor = ThreadPoolExecutor(3)
+        self.addCleanup(executor.shutdown)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def on_each_thread(func):
+            def run():
+                barrier.wait()
+                return func()
+            return [
+                future.result()
+                for future in [executor.submit(run) for _ in range(3)]
+            ]
+
+        startup.connect_threads(executor, 3)
+        connected = on_each_thread(
+            lambda: connection.connection is not None
+        )
+        on_each_thread(connections.close_all)
+
+        self.assertEqual(connected, [True, True, True])
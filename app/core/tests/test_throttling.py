@@ -0,0 +1,138 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+RATES = {
+    'DEFAULT_THROTTLE_RATES': {
+        'read': '2/min',
+        'write': '1/min',
+        'login': '1/hour',
+    },
+}
+
+
+class TokenBucketTests(TestCase):
+
+    def test_take_token(self):
+        """Test a bucket empties, then refills at its rate"""
+        state, wait = throttling.take_token(None, 2, 1.0, 100.0)
+        self.assertEqual(wait, 0)
+        state, wait = throttling.take_token(state, 2, 1.0, 100.0)
+        self.assertEqual(wait, 0)
+        state, wait = throttling.take_token(state, 2, 1.0, 100.0)
+        self.assertEqual(wait, 1.0)
+
+        state, wait = throttling.take_token(state, 2, 1.0, 100.5)
+        self.assertEqual(wait, 0.5)
+        state, wait = throttling.take_token(state, 2, 1.0, 101.0)
+        self.assertEqual(wait, 0)
+
+    def test_parse_rate(self):
+        """Test rates are read as a capacity and tokens per second"""
+        self.assertEqual(throttling.parse_rate('120/min'), (120, 2.0))
+        self.assertEqual(throttling.parse_rate('10/s'), (10, 10.0))
+
+    def test_prune_full_buckets(self):
+        """Test idle buckets are dropped once they would be full again"""
+        store = throttling.LocalBucketStore()
+        store.take('old', 1, 1.0, 0.0)
+        store.take('new', 1, 1.0, 5.0)
+
+        store.prune(5.5)
+
+        self.assertEqual(list(store.buckets), ['new'])
+
+
+@override_settings(REST_FRAMEWORK=RATES)
+class ThrottleApiTests(TestCase):
+
+    def setUp(self):
+        throttling.local_buckets.clear()
+        self.addCleanup(throttling.local_buckets.clear)
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com', 'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_throttled(self):
+        """Test a client over the read rate is told when to retry"""
+        for _ in range(2):
+            response = self.client.get(RECIPE_URL)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_scopes_and_users_separate(self):
+        """Test reads, writes and other users draw from their own buckets"""
+        for _ in range(3):
+            self.client.get(RECIPE_URL)
+
+        response = self.client.post(RECIPE_URL, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(RECIPE_URL, {})
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'password123'
+        )
+        self.client.force_authenticate(other)
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login_throttled_by_address(self):
+        """Test token requests from one address share the login bucket"""
+        client = APIClient()
+        payload = {'email': 'test@gmail.com', 'password': 'wrong'}
+
+        response = client.post(TOKEN_URL, payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = client.post(TOKEN_URL, payload)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(response['Retry-After'], '3600')
+
+    @override_settings(THROTTLE_CACHE='default')
+    def test_shared_cache_buckets(self):
+        """Test buckets can be kept in a cache shared by all workers"""
+        self.addCleanup(cache.clear)
+        for _ in range(2):
+            self.client.get(RECIPE_URL)
+
+        response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(throttling.local_buckets.buckets, {})
+
+    def test_benchmark_command(self):
+        """Test the throttling benchmark reports every scenario"""
+        out = StringIO()
+
+        call_command('benchmark_throttle', requests=50, clients=5, stdout=out)
+
+        self.assertIn('local buckets', out.getvalue())
+        self.assertIn('cache buckets', out.getvalue())
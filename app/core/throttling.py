@@ -0,0 +1,161 @@
+"""
+Token bucket throttling for the API.
+
+Each client gets a bucket per scope holding up to N tokens, refilled at N
+per period (rates are given as in DRF, e.g. '600/min'); a request takes a
+token or is refused with the time until one is available, sent back as
+`Retry-After`. Buckets live in this process, which is exact for a single
+worker and costs no I/O. Setting `THROTTLE_CACHE` to a cache alias keeps
+them in that cache instead, shared by every worker.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """Return the capacity and tokens per second of a 'N/period' rate"""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def take_token(state, capacity, rate, now):
+    """Refill a bucket and take a token; return the new state and the wait"""
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Buckets kept in the memory of this process"""
+    max_buckets = 100000
+
+    def __init__(self):
+        self.buckets = {}
+        self.refill_time = 0.0
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self.lock:
+            state, wait = take_token(
+                self.buckets.get(key), capacity, rate, now
+            )
+            self.buckets[key] = state
+            self.refill_time = max(self.refill_time, capacity / rate)
+            if len(self.buckets) > self.max_buckets:
+                self.prune(now)
+
+        return wait
+
+    def prune(self, now):
+        """Forget the buckets left alone long enough to be full again"""
+        self.buckets = {
+            key: state for key, state in self.buckets.items()
+            if now - state[1] < self.refill_time
+        }
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets kept in a Django cache shared by every worker.
+
+    Reading and writing a bucket are separate cache calls, so concurrent
+    requests of one client may both take the same token; the count stays
+    accurate to within the client's own concurrency.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, rate, now):
+        state, wait = take_token(self.cache.get(key), capacity, rate, now)
+        self.cache.set(key, state, math.ceil(capacity / rate) + 1)
+        return wait
+
+
+local_buckets = LocalBucketStore()
+
+
+def get_bucket_store():
+    """Return the store selected by the THROTTLE_CACHE setting"""
+    if settings.THROTTLE_CACHE:
+        return CacheBucketStore(caches[settings.THROTTLE_CACHE])
+    return local_buckets
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle a client to the rate of `scope` with a token bucket"""
+    scope = None
+    timer = time.time
+
+    def get_scope(self, request, view):
+        """Return the scope to throttle the request in, or None to skip"""
+        return self.scope
+
+    def get_rate(self, scope):
+        """Return the 'N/period' rate of a scope, or None if unthrottled"""
+        return api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+    def get_store(self):
+        return get_bucket_store()
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return 'user:%s' % request.user.pk
+        return 'ip:%s' % super().get_ident(request)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+
+        capacity, refill = parse_rate(rate)
+        self.wait_time = self.get_store().take(
+            'throttle:%s:%s' % (scope, self.get_ident(request)),
+            capacity, refill, self.timer(),
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class ReadRateThrottle(TokenBucketThrottle):
+    """Throttle the safe requests of a client"""
+    scope = 'read'
+
+    def get_scope(self, request, view):
+        return self.scope if request.method in SAFE_METHODS else None
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    """Throttle the requests of a client that change data"""
+    scope = 'write'
+
+    def get_scope(self, request, view):
+        return self.scope if request.method not in SAFE_METHODS else None
+
+
+class ScopedRateThrottle(TokenBucketThrottle):
+    """Throttle the requests to views of the same `throttle_scope`"""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, \
+    transaction
+from django.http import JsonResponse
+
+
+_readiness = {'ready': False, 'expires': 0.0}
+_readiness_lock = threading.Lock()
+
+
+def database_ready():
+    """Return whether the database answers a trivial query, cached briefly"""
+    now = time.monotonic()
+    if now < _readiness['expires']:
+        return _readiness['ready']
+
+    with _readiness_lock:
+        if now < _readiness['expires']:
+            return _readiness['ready']
+
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                    cursor.execute(
+                        'SET LOCAL statement_timeout = %s',
+                        [settings.READINESS_DB_TIMEOUT_MS]
+                    )
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            ready = True
+        except DatabaseError:
+            ready = False
+
+        _readiness['ready'] = ready
+        _readiness['expires'] = now + settings.READINESS_CACHE_SECONDS
+
+    return ready
+
+
+def healthz(request):
+    """Liveness probe, answered without touching the database"""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """Readiness probe, checks that the database accepts queries"""
+    if database_ready():
+        return JsonResponse({'status': 'ok'})
+
+    return JsonResponse({'status': 'unavailable'}, status=503)
@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration for serving the app in production.
+
+Every value can be overridden with a GUNICORN_* environment variable so the
+same image can be tuned per deployment without rebuilding it.
+"""
+
+import gc
+import os
+
+
+def cpu_count():
+    """Return the number of CPUs this process is allowed to run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.environ.get('GUNICORN_WORKERS', cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import Django and the whole URL conf once in the master so every forked
+# worker shares those pages copy-on-write instead of importing them again.
+preload_app = True
+
+# Recycle workers periodically to bound the effect of any slow memory leak,
+# jittered so they don't all restart at the same moment.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Warm up the preloaded app and move it out of the collector's reach"""
+    if server.cfg.preload_app:
+        from core import startup
+        timings = startup.warm_up(connect_db=False)
+        server.log.info('Warmed up in %.1f ms', sum(timings.values()) * 1000)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master process"""
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    """Finish warming up and connect every thread before taking requests"""
+    from core import startup
+    startup.warm_up(connect_db=False)
+    # gthread workers serve requests from a pool of threads, each with its
+    # own database connections; sync workers from their main thread.
+    if hasattr(worker, 'tpool'):
+        startup.connect_threads(worker.tpool, worker.cfg.threads)
+    else:
+        startup.connect()
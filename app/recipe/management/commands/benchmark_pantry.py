@@ -0,0 +1,117 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """Django command to time pantry queries on a large seeded collection"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100000,
+            help='Number of recipes to seed.'
+        )
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Number of users the recipes are spread across.'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=500,
+            help='Number of distinct ingredients per user.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Number of timed queries per scenario.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed, to compare runs.'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Everything seeded is rolled back once the timings are taken.
+        with transaction.atomic():
+            started = time.perf_counter()
+            users = [
+                self.seed(
+                    rng, options['recipes'] // options['users'],
+                    options['ingredients']
+                )
+                for _ in range(options['users'])
+            ]
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_recipe')
+
+            self.stdout.write('Seeded %d recipes for %d users in %.1fs' % (
+                options['recipes'], options['users'],
+                time.perf_counter() - started
+            ))
+            self.run_scenarios(rng, users[-1], options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, rng, recipe_count, ingredient_count):
+        """Create a user owning the given number of recipes"""
+        user = get_user_model().objects.create_user(
+            'benchmark-%s@example.com' % uuid.uuid4().hex, 'benchmark'
+        )
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name='ingredient %d' % i)
+            for i in range(ingredient_count)
+        ])
+        self.ingredient_ids = [ingredient.id for ingredient in ingredients]
+
+        through = Recipe.ingredients.through
+        batch_size = 10000
+        for offset in range(0, recipe_count, batch_size):
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=user, title='recipe %d' % i,
+                    time_minute=rng.randint(5, 180),
+                    price=rng.randint(100, 9999) / 100,
+                )
+                for i in range(offset, min(offset + batch_size, recipe_count))
+            ])
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, ingredient_id=ingredient_id)
+                for recipe in recipes
+                for ingredient_id in rng.sample(
+                    self.ingredient_ids, rng.randint(3, 10)
+                )
+            ])
+
+        Recipe.objects.filter(user=user).sync_ingredient_ids()
+        return user
+
+    def run_scenarios(self, rng, user, repeat):
+        """Time pantry queries for several pantry sizes and tolerances"""
+        recipes = Recipe.objects.filter(user=user)
+        for pantry_size in (10, 50, 200):
+            for max_missing in (0, 1, 3):
+                timings = []
+                matches = 0
+                for _ in range(repeat):
+                    pantry = rng.sample(self.ingredient_ids, pantry_size)
+                    started = time.perf_counter()
+                    matches = len(list(
+                        recipes.cookable_with(pantry, max_missing)[:50]
+                        .values_list('id', 'missing')
+                    ))
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                timings.sort()
+                self.stdout.write(
+                    'pantry=%-4d missing<=%d  mean %7.2fms  p95 %7.2fms  '
+                    '(%d results)' % (
+                        pantry_size, max_missing, statistics.mean(timings),
+                        timings[int(len(timings) * 0.95) - 1], matches
+                    )
+                )
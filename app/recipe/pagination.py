@@ -0,0 +1,34 @@
+from functools import partial
+
+from django.core.paginator import Paginator
+from rest_framework.pagination import PageNumberPagination
+
+
+class CountedPaginator(Paginator):
+    """Paginator that can be given its total instead of counting it"""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class CountedPageNumberPagination(PageNumberPagination):
+    """
+    Opt-in page number pagination, enabled by the `page_size` parameter.
+
+    When the view knows the number of objects listed (see
+    `get_total_count`), it is used instead of a COUNT(*) query.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        get_total_count = getattr(view, 'get_total_count', None)
+        if get_total_count is not None \
+                and self.get_page_size(request) is not None:
+            self.django_paginator_class = partial(
+                CountedPaginator, count=get_total_count()
+            )
+
+        return super().paginate_queryset(queryset, request, view)
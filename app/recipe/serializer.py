@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.db.models import CharField, Value
+from django.urls import reverse
+
 from rest_framework import serializers
 
 from core.models import Tag
@@ -5,6 +9,50 @@ from core.models import Ingredient
 from core.models import Recipe
 
 
+def image_urls(recipe, request=None):
+    """Return the rendition URLs of a recipe image, or None without one"""
+    if not recipe.image_hash:
+        return None
+
+    urls = {}
+    for size in settings.RECIPE_IMAGE_SIZES:
+        url = reverse(
+            'recipe:recipe-image',
+            kwargs={'size': size, 'digest': recipe.image_hash},
+        )
+        urls[size] = request.build_absolute_uri(url) if request else url
+
+    return urls
+
+
+def owned_ids(user, tag_ids=(), ingredient_ids=()):
+    """Return which of the given tags and ingredients a user owns
+
+    Both are checked in one query; returns a set of ids per model name.
+    """
+    querysets = [
+        model.objects.filter(user=user, id__in=ids)
+        .annotate(kind=Value(model._meta.model_name, output_field=CharField()))
+        .values_list('kind', 'id')
+        for model, ids in ((Tag, tag_ids), (Ingredient, ingredient_ids))
+    ]
+    owned = {'tag': set(), 'ingredient': set()}
+    for kind, id in querysets[0].union(querysets[1], all=True):
+        owned[kind].add(id)
+
+    return owned
+
+
+def id_list(**kwargs):
+    """Return a write-only field taking a list of ids"""
+    return serializers.ListField(
+        child=serializers.IntegerField(),
+        write_only=True,
+        required=False,
+        **kwargs
+    )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for the tag object"""
 
@@ -33,6 +81,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    images = serializers.SerializerMethodField()
+    shared = serializers.BooleanField(source='is_shared', required=False)
+    share_url = serializers.SerializerMethodField()
+    tags_add = id_list()
+    tags_remove = id_list()
+    ingredients_add = id_list()
+    ingredients_remove = id_list()
+
+    # The fields changing part of a relation: name, model, whether to add.
+    delta_fields = {
+        'tags_add': ('tags', Tag, True),
+        'tags_remove': ('tags', Tag, False),
+        'ingredients_add': ('ingredients', Ingredient, True),
+        'ingredients_remove': ('ingredients', Ingredient, False),
+    }
 
     class Meta:
         model = Recipe
@@ -43,12 +106,213 @@ class RecipeSerializer(serializers.ModelSerializer):
             'tags',
             'time_minute',
             'price',
-            'link'
+            'link',
+            'images',
+            'shared',
+            'share_url',
+            'tags_add',
+            'tags_remove',
+            'ingredients_add',
+            'ingredients_remove',
         )
         read_only_fields = ('id',)
 
+    def get_images(self, obj):
+        """Return the URL of each rendition of the recipe image"""
+        return image_urls(obj, self.context.get('request'))
+
+    def get_share_url(self, obj):
+        """Return the public link of a shared recipe"""
+        if not obj.is_shared:
+            return None
+
+        url = reverse('recipe:shared-recipe', args=[obj.share_slug])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate(self, attrs):
+        """Check the added and removed tags and ingredients are owned"""
+        deltas = {
+            field: set(attrs[field]) for field in self.delta_fields
+            if attrs.get(field)
+        }
+        if not deltas:
+            return attrs
+
+        errors = {}
+        requested = {'tags': set(), 'ingredients': set()}
+        for field, ids in deltas.items():
+            name, _, adding = self.delta_fields[field]
+            if name in attrs:
+                errors[field] = 'Cannot be sent with %s.' % name
+            if adding and ids & deltas.get(name + '_remove', set()):
+                errors[field] = 'Cannot add and remove the same ids.'
+            requested[name] |= ids
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        owned = owned_ids(
+            self.context['request'].user,
+            requested['tags'], requested['ingredients'],
+        )
+        for field, ids in deltas.items():
+            name, model, _ = self.delta_fields[field]
+            unknown = sorted(ids - owned[model._meta.model_name])
+            if unknown:
+                errors[field] = 'Unknown ids: %s.' % ', '.join(
+                    str(id) for id in unknown
+                )
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def create(self, validated_data):
+        deltas = self.pop_deltas(validated_data)
+        shared = validated_data.pop('is_shared', None)
+        recipe = super().create(validated_data)
+        self.apply_deltas(recipe, deltas)
+        self.apply_shared(recipe, shared)
+        return recipe
+
+    def update(self, instance, validated_data):
+        deltas = self.pop_deltas(validated_data)
+        shared = validated_data.pop('is_shared', None)
+        recipe = super().update(instance, validated_data)
+        self.apply_deltas(recipe, deltas)
+        self.apply_shared(recipe, shared)
+        return recipe
+
+    def apply_shared(self, recipe, shared):
+        """Create or remove the public link of the recipe"""
+        if shared:
+            recipe.share()
+        elif shared is not None:
+            recipe.unshare()
+
+    def pop_deltas(self, validated_data):
+        return {
+            field: validated_data.pop(field) for field in self.delta_fields
+            if field in validated_data
+        }
+
+    def apply_deltas(self, recipe, deltas):
+        """Add and remove only the through rows of the changed ids"""
+        for field, ids in deltas.items():
+            name, model, adding = self.delta_fields[field]
+            related = getattr(recipe, name)
+            if adding:
+                related.add(*ids)
+                continue
+
+            # remove() reports every id given as removed: keep linked ones.
+            column = '%s_id' % model._meta.model_name
+            linked = related.through.objects \
+                .filter(recipe=recipe, **{column + '__in': ids}) \
+                .values_list(column, flat=True)
+            related.remove(*linked)
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+
+
+class SharedRecipeSerializer(serializers.ModelSerializer):
+    """Serializer for the public view of a shared recipe"""
+    tags = serializers.SlugRelatedField(
+        many=True, read_only=True, slug_field='name'
+    )
+    ingredients = serializers.SlugRelatedField(
+        many=True, read_only=True, slug_field='name'
+    )
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'title', 'ingredients', 'tags', 'time_minute', 'price', 'link',
+            'images',
+        )
+        read_only_fields = fields
+
+    def get_images(self, obj):
+        """Return the URL of each rendition of the recipe image"""
+        return image_urls(obj, self.context.get('request'))
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Serializer for uploading an image to a recipe"""
+    image = serializers.FileField(write_only=True)
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'images')
+        read_only_fields = ('id',)
+
+    def get_images(self, obj):
+        """Return the URL of each rendition of the recipe image"""
+        return image_urls(obj, self.context.get('request'))
+
+
+class AttrRecipesSerializer(serializers.Serializer):
+    """Serializer for attaching a tag or ingredient to recipes"""
+    add = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+    def validate(self, attrs):
+        """Check every recipe is owned, in one query"""
+        ids = set(attrs['add']) | set(attrs['remove'])
+        if set(attrs['add']) & set(attrs['remove']):
+            raise serializers.ValidationError(
+                'Cannot add and remove the same recipes.'
+            )
+
+        owned = set(Recipe.objects.filter(
+            user=self.context['request'].user, id__in=ids
+        ).values_list('id', flat=True))
+        unknown = sorted(ids - owned)
+        if unknown:
+            raise serializers.ValidationError(
+                'Unknown recipes: %s.' % ', '.join(str(id) for id in unknown)
+            )
+
+        return attrs
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """Serialize a recipe matched against the ingredients a user has"""
+    missing = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'missing',
+            'missing_ingredients',
+        )
+
+    def get_missing_ingredients(self, obj):
+        """Return the ids of the recipe ingredients outside the pantry"""
+        pantry = set(self.context.get('pantry', ()))
+        return sorted(id for id in obj.ingredient_ids if id not in pantry)
+
+
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serialize a recipe with its estimated similarity to another one"""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('similarity',)
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Serialize an ingredient and how many of the planned recipes need it"""
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    recipe_count = serializers.IntegerField(source='recipes', read_only=True)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import events
+
+EVENTS_URL = reverse('recipe:events')
+
+
+@override_settings(EVENTS_HEARTBEAT_SECONDS=0.05, EVENTS_STREAM_SECONDS=0.1)
+class ChangeEventsApiTests(TestCase):
+    """Test the change events stream"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'stream@londonappdev.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(events.hub.stop)
+
+    def test_login_required(self):
+        """Test that login is required to stream events"""
+        response = APIClient().get(EVENTS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stream_events(self):
+        """Test the stream starts with the reconnection delay"""
+        response = self.client.get(
+            EVENTS_URL, HTTP_ACCEPT='text/event-stream'
+        )
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertTrue(body.startswith('retry: 1000\n\n'))
+        self.assertIn(': heartbeat\n\n', body)
+
+    def test_resume_missed_events(self):
+        """Test a client which missed dropped events is told to reset"""
+        events.get_hub().missed_through = 5
+
+        response = self.client.get(
+            EVENTS_URL, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID='2'
+        )
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertIn('event: reset\n', body)
+
+    def test_invalid_last_event_id(self):
+        """Test an invalid last event id is refused"""
+        response = self.client.get(EVENTS_URL, {'last_event_id': 'x'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,16 +1,29 @@
+import io
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core import images, jobs
+from core.models import Job, Recipe, Tag, Ingredient
 
 from recipe.serializer import RecipeSerializer, RecipeDetailSerializer
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+PANTRY_URL = reverse('recipe:recipe-pantry')
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
+BATCH_URL = reverse('recipe:recipe-batch')
 
 
 def detail_url(recipe_id):
@@ -18,6 +31,25 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+def similar_url(recipe_id):
+    """Return the similar recipes URL of a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Return the image upload URL of a recipe"""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image(size=(800, 600), format='PNG'):
+    """Return an in-memory image file"""
+    image_file = io.BytesIO()
+    Image.new('RGB', size, color=(200, 80, 40)).save(image_file, format)
+    image_file.name = 'photo.' + format.lower()
+    image_file.seek(0)
+    return image_file
+
+
 def sample_tag(user, name='Main Course'):
     """Create and return a sample tag"""
     return Tag.objects.create(user=user, name=name)
@@ -163,3 +195,594 @@ class ProtectedRecipeApiTest(TestCase):
         self.assertEqual(ingredients.count(), 2)
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
+
+    def test_paginated_list_uses_counters(self):
+        """Test paginated lists take their total from the user counters"""
+        for _ in range(3):
+            sample_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_similar_recipes(self):
+        """Test listing the recipes most similar to a recipe"""
+        vegan = sample_tag(self.user, name='Vegan')
+        quick = sample_tag(self.user, name='Quick')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(vegan, quick)
+        twin = sample_recipe(self.user, title='Twin')
+        twin.tags.add(vegan, quick)
+        sample_recipe(self.user, title='Unrelated')
+
+        response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['title'], 'Twin')
+        self.assertEqual(response.data[0]['similarity'], 1.0)
+
+    def test_similar_recipes_limit_clamped(self):
+        """Test the number of similar recipes is kept between 1 and 50"""
+        vegan = sample_tag(self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(vegan)
+        for title in ('Twin', 'Triplet', 'Quadruplet'):
+            sample_recipe(self.user, title=title).tags.add(vegan)
+
+        for limit in (-1, 0):
+            response = self.client.get(
+                similar_url(recipe.id), {'limit': limit}
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), 1)
+
+
+class RecipeFilterApiTests(TestCase):
+    """Test range filters and ordering of the recipe list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.cheap = sample_recipe(
+            self.user, title='Toast', price=2.00, time_minute=5
+        )
+        self.quick = sample_recipe(
+            self.user, title='Salad', price=6.00, time_minute=10
+        )
+        self.slow = sample_recipe(
+            self.user, title='Roast', price=12.00, time_minute=90
+        )
+
+    def titles(self, response):
+        return [recipe['title'] for recipe in response.data]
+
+    def test_filter_by_price_range(self):
+        """Test only recipes within the price range are returned"""
+        response = self.client.get(
+            RECIPE_URL, {'price_min': '3', 'price_max': '10.50'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(response), ['Salad'])
+
+    def test_filter_by_time(self):
+        """Test only recipes ready within the given time are returned"""
+        response = self.client.get(
+            RECIPE_URL, {'time_max': 10, 'ordering': 'time_minute'}
+        )
+
+        self.assertEqual(self.titles(response), ['Toast', 'Salad'])
+
+    def test_ordering(self):
+        """Test the list is sorted by the requested fields"""
+        response = self.client.get(RECIPE_URL, {'ordering': '-price'})
+        self.assertEqual(self.titles(response), ['Roast', 'Salad', 'Toast'])
+
+        response = self.client.get(RECIPE_URL, {'ordering': 'title'})
+        self.assertEqual(self.titles(response), ['Roast', 'Salad', 'Toast'])
+
+    def test_ordering_ties_broken_by_id(self):
+        """Test recipes with equal sort keys keep a stable order"""
+        twin = sample_recipe(self.user, title='Salad', price=1.00)
+
+        response = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        ids = [recipe['id'] for recipe in response.data]
+        self.assertEqual(ids[1:3], [self.quick.id, twin.id])
+
+    def test_ties_broken_in_direction_of_last_field(self):
+        """Test the id tie-breaker follows the last field's direction"""
+        for ordering, expected in (
+            ('-price', ['price" DESC', 'id" DESC']),
+            ('title', ['title" ASC', 'id" ASC']),
+            ('price,-time_minute', [
+                'price" ASC', 'time_minute" DESC', 'id" DESC',
+            ]),
+        ):
+            order_by = 'ORDER BY ' + ', '.join(
+                '"core_recipe"."' + field for field in expected
+            )
+            with self.subTest(ordering=ordering), \
+                    CaptureQueriesContext(connection) as queries:
+                self.client.get(RECIPE_URL, {'ordering': ordering})
+                self.assertTrue(any(
+                    query['sql'].endswith(order_by)
+                    for query in queries.captured_queries
+                ), order_by)
+
+    def test_ordering_with_repeated_minus_rejected(self):
+        """Test a field prefixed with more than one minus is refused"""
+        for ordering in ('--price', 'title,--id'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(RECIPE_URL, {'ordering': ordering})
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+
+        response = self.client.get(RECIPE_URL, {'ordering': ','})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_parameters_rejected(self):
+        """Test unknown ordering fields and malformed numbers fail"""
+        response = self.client.get(RECIPE_URL, {'ordering': 'user'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(RECIPE_URL, {'price_min': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filtered_page_counts_matches(self):
+        """Test a filtered page counts the matches, not the counter"""
+        response = self.client.get(
+            RECIPE_URL, {'page_size': 1, 'price_max': 7}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class RecipeImageApiTests(TestCase):
+    """Test uploading recipe images and serving their renditions"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self):
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image()},
+            format='multipart',
+        )
+
+    def test_upload_image(self):
+        """Test an upload is stored and its renditions left to a job"""
+        response = self.upload()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        digest = self.recipe.image_hash
+        self.assertEqual(len(digest), 64)
+        self.assertTrue(os.path.exists(images.original_path(digest)))
+        self.assertFalse(
+            os.path.exists(images.rendition_path(digest, 'thumbnail'))
+        )
+        self.assertIn('/%s.jpg' % digest, response.data['images']['large'])
+        self.assertEqual(Job.objects.get().name, 'make_renditions')
+
+        jobs.run_pending()
+
+        with Image.open(images.rendition_path(digest, 'thumbnail')) as thumb:
+            self.assertEqual(thumb.format, 'JPEG')
+            self.assertEqual(thumb.size, (160, 120))
+
+    def test_upload_invalid_image(self):
+        """Test a file that is no image is rejected and not kept"""
+        upload = io.BytesIO(b'not an image')
+        upload.name = 'photo.png'
+
+        response = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': upload},
+            format='multipart',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_hash, '')
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, 'recipe', 'originals')),
+            []
+        )
+
+    def test_serve_rendition(self):
+        """Test renditions are served with long-lived cache headers"""
+        url = self.upload().data['images']['thumbnail']
+        jobs.run_pending()
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_rendition_not_made_yet(self):
+        """Test missing renditions are left to the job, queued if lost"""
+        url = self.upload().data['images']['thumbnail']
+        self.recipe.refresh_from_db()
+        path = images.rendition_path(self.recipe.image_hash, 'thumbnail')
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(Job.objects.count(), 1)
+
+        Job.objects.all().delete()
+        self.client.get(url)
+
+        self.assertEqual(Job.objects.get().name, 'make_renditions')
+        self.assertFalse(os.path.exists(path))
+
+    def test_unknown_rendition(self):
+        """Test renditions of unknown images or sizes are not found"""
+        self.upload()
+        self.recipe.refresh_from_db()
+
+        response = self.client.get(reverse(
+            'recipe:recipe-image',
+            kwargs={'size': 'huge', 'digest': self.recipe.image_hash}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse(
+            'recipe:recipe-image',
+            kwargs={'size': 'thumbnail', 'digest': '0' * 64}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_includes_image_urls(self):
+        """Test the recipe list links the renditions of each image"""
+        self.upload()
+
+        response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            set(response.data[0]['images']), {'thumbnail', 'medium', 'large'}
+        )
+
+
+class RecipeRelationDeltaApiTests(TestCase):
+    """Test adding and removing single tags and ingredients of a recipe"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user)
+        self.ingredients = [
+            sample_ingredient(self.user, name='Ingredient %d' % i)
+            for i in range(40)
+        ]
+        self.recipe.ingredients.add(*self.ingredients)
+        self.tag = sample_tag(self.user)
+
+    def test_add_and_remove(self):
+        """Test only the named through rows are written"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(detail_url(self.recipe.id), {
+                'tags_add': [self.tag.id],
+                'ingredients_remove': [self.ingredients[0].id],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'], [self.tag.id])
+        self.assertEqual(len(response.data['ingredients']), 39)
+        self.assertNotIn(self.ingredients[0].id, response.data['ingredients'])
+        through = Recipe.ingredients.through._meta.db_table
+        writes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+            and through in query['sql']
+        ]
+        self.assertEqual(len(writes), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(len(self.recipe.ingredient_ids), 39)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+
+    def test_remove_unlinked_keeps_counts(self):
+        """Test removing a tag the recipe does not have changes nothing"""
+        other_recipe = sample_recipe(self.user)
+        other_recipe.tags.add(self.tag)
+
+        response = self.client.patch(detail_url(self.recipe.id), {
+            'tags_remove': [self.tag.id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+
+    def test_foreign_ids_rejected(self):
+        """Test tags and ingredients of other users cannot be added"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'password123'
+        )
+        foreign = sample_tag(other)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(detail_url(self.recipe.id), {
+                'tags_add': [foreign.id, self.tag.id],
+                'ingredients_add': [self.ingredients[0].id],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(foreign.id), str(response.data['tags_add']))
+        self.assertEqual(
+            len([q for q in queries if 'UNION' in q['sql']]), 1
+        )
+        self.assertFalse(self.recipe.tags.exists())
+
+    def test_deltas_conflicting_with_full_list(self):
+        """Test a full list and changes to it cannot be mixed"""
+        response = self.client.patch(detail_url(self.recipe.id), {
+            'tags': [self.tag.id],
+            'tags_remove': [self.tag.id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeBatchApiTests(TestCase):
+    """Test retrieving several recipes in one request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipes = []
+        for i in range(5):
+            recipe = sample_recipe(self.user, title='Recipe %d' % i)
+            recipe.tags.add(sample_tag(self.user, name='Tag %d' % i))
+            recipe.ingredients.add(sample_ingredient(self.user))
+            self.recipes.append(recipe)
+
+    def get_batch(self, ids):
+        return self.client.get(
+            BATCH_URL, {'ids': ','.join(str(id) for id in ids)}
+        )
+
+    def test_batch_keeps_request_order(self):
+        """Test recipes come back detailed and in the order asked"""
+        ids = [self.recipes[3].id, self.recipes[0].id, self.recipes[3].id]
+
+        response = self.get_batch(ids)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = RecipeDetailSerializer(
+            [self.recipes[3], self.recipes[0]], many=True
+        ).data
+        self.assertEqual(response.data['results'], expected)
+        self.assertEqual(response.data['missing'], [])
+
+    def test_batch_reports_missing(self):
+        """Test unknown ids and recipes of others are reported missing"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'password123'
+        )
+        foreign = sample_recipe(other)
+        ids = [foreign.id, self.recipes[1].id, 999999]
+
+        response = self.get_batch(ids)
+
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[1].id]
+        )
+        self.assertEqual(response.data['missing'], [foreign.id, 999999])
+
+    def test_batch_queries_fixed(self):
+        """Test the number of queries does not grow with the batch"""
+        def count_queries(ids):
+            with CaptureQueriesContext(connection) as queries:
+                self.get_batch(ids)
+            return len(queries)
+
+        small = count_queries([self.recipes[0].id])
+        large = count_queries([recipe.id for recipe in self.recipes])
+
+        self.assertEqual(small, large)
+
+    def test_batch_limits(self):
+        """Test too many or malformed ids are rejected"""
+        with self.settings(RECIPE_BATCH_MAX_IDS=2):
+            response = self.get_batch([1, 2, 3])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(BATCH_URL, {'ids': '1,two'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PantryApiTests(TestCase):
+    """Test matching recipes against the ingredients a user has"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'demo@idco.io',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.egg = sample_ingredient(self.user, name='Egg')
+        self.milk = sample_ingredient(self.user, name='Milk')
+        self.flour = sample_ingredient(self.user, name='Flour')
+        self.sugar = sample_ingredient(self.user, name='Sugar')
+
+        self.omelette = sample_recipe(self.user, title='Omelette')
+        self.omelette.ingredients.add(self.egg)
+        self.pancake = sample_recipe(self.user, title='Pancake')
+        self.pancake.ingredients.add(self.egg, self.milk, self.flour)
+        self.cake = sample_recipe(self.user, title='Cake')
+        self.cake.ingredients.add(
+            self.egg, self.milk, self.flour, self.sugar
+        )
+
+    def pantry(self, *ingredients, **params):
+        """Query the pantry endpoint with the given ingredients"""
+        params['ingredients'] = ','.join(str(i.id) for i in ingredients)
+        return self.client.get(PANTRY_URL, params)
+
+    def test_fully_covered_recipes(self):
+        """Test only recipes made of pantry ingredients are returned"""
+        response = self.pantry(self.egg, self.milk, self.flour)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['title'] for r in response.data], ['Omelette', 'Pancake']
+        )
+        self.assertEqual(response.data[0]['missing'], 0)
+
+    def test_recipes_missing_ingredients(self):
+        """Test recipes missing a few ingredients are ranked after others"""
+        response = self.pantry(self.egg, self.milk, missing=2)
+
+        self.assertEqual(
+            [(r['title'], r['missing']) for r in response.data],
+            [('Omelette', 0), ('Pancake', 1), ('Cake', 2)]
+        )
+        self.assertEqual(
+            response.data[1]['missing_ingredients'], [self.flour.id]
+        )
+
+    def test_small_recipes_without_shared_ingredients(self):
+        """Test recipes sharing no pantry ingredient match if small enough"""
+        sample_recipe(self.user, title='Water')
+
+        response = self.pantry(self.milk, missing=1)
+
+        self.assertEqual(
+            [(r['title'], r['missing']) for r in response.data],
+            [('Water', 0), ('Omelette', 1)]
+        )
+
+    def test_ingredient_changes_update_matches(self):
+        """Test the match index follows ingredients added and removed"""
+        self.pancake.ingredients.remove(self.flour)
+        self.sugar.recipe_set.add(self.omelette)
+
+        response = self.pantry(self.egg, self.milk)
+
+        self.assertEqual([r['title'] for r in response.data], ['Pancake'])
+
+    def test_deleted_ingredient_no_longer_required(self):
+        """Test deleting an ingredient removes it from the recipes"""
+        self.flour.delete()
+        self.sugar.delete()
+
+        response = self.pantry(self.egg, self.milk)
+
+        self.assertEqual(len(response.data), 3)
+
+    def test_invalid_ingredients(self):
+        """Test malformed ingredient ids are rejected"""
+        response = self.client.get(PANTRY_URL, {'ingredients': '1,a'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pantry_limited_to_user(self):
+        """Test other users' recipes are never matched"""
+        other = get_user_model().objects.create_user('o@idco.io', 'pass123')
+        sample_recipe(other, title='Toast')
+
+        response = self.pantry(self.egg)
+
+        self.assertEqual([r['title'] for r in response.data], ['Omelette'])
+
+
+class ShoppingListApiTests(TestCase):
+    """Test merging the ingredients of several recipes"""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'demo@idco.io',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_shopping_list(self):
+        """Test ingredients are deduplicated and counted per recipe"""
+        egg = sample_ingredient(self.user, name='Egg')
+        milk = sample_ingredient(self.user, name='Milk')
+        salt = sample_ingredient(self.user, name='Salt')
+        pancake = sample_recipe(self.user, title='Pancake')
+        pancake.ingredients.add(egg, milk)
+        omelette = sample_recipe(self.user, title='Omelette')
+        omelette.ingredients.add(egg)
+        soup = sample_recipe(self.user, title='Soup')
+        soup.ingredients.add(salt)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(SHOPPING_LIST_URL, {
+                'recipes': '%d,%d' % (pancake.id, omelette.id)
+            })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': egg.id, 'name': 'Egg', 'recipe_count': 2},
+            {'id': milk.id, 'name': 'Milk', 'recipe_count': 1},
+        ])
+        self.assertEqual(len(queries), 1)
+
+    def test_shopping_list_limited_to_user(self):
+        """Test other users' recipes are ignored"""
+        other = get_user_model().objects.create_user('o@idco.io', 'pass123')
+        recipe = sample_recipe(other)
+        recipe.ingredients.add(sample_ingredient(other))
+
+        response = self.client.get(
+            SHOPPING_LIST_URL, {'recipes': str(recipe.id)}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def shared_url(slug):
+    """Return the public URL of a shared recipe"""
+    return reverse('recipe:shared-recipe', args=[slug])
+
+
+class SharedRecipeApiTests(TestCase):
+    """Test sharing recipes through public links"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'share@londonappdev.com', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=2
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Winter')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Leek'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def share(self, shared=True):
+        return self.client.patch(
+            detail_url(self.recipe.pk), {'shared': shared}, format='json'
+        )
+
+    def test_share_recipe(self):
+        """Test sharing a recipe gives it a public link"""
+        response = self.share()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(response.data['shared'])
+        self.assertTrue(response.data['share_url'].endswith(
+            shared_url(self.recipe.share_slug)
+        ))
+
+    def test_retrieve_shared_recipe(self):
+        """Test anyone can read a shared recipe, cacheable by the CDN"""
+        url = self.share().data['share_url']
+
+        response = APIClient().get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'title': 'Soup', 'ingredients': ['Leek'], 'tags': ['Winter'],
+            'time_minute': 5, 'price': '2.00', 'link': '',
+            'images': None,
+        })
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=86400', response['Cache-Control'])
+        self.assertEqual(
+            sorted(response['Surrogate-Key'].split()), [
+                'ingredient-%d' % self.ingredient.pk,
+                'recipe-%d' % self.recipe.pk,
+                'tag-%d' % self.tag.pk,
+            ]
+        )
+
+    def test_not_modified(self):
+        """Test a shared recipe is not sent again while unchanged"""
+        url = self.share().data['share_url']
+        etag = APIClient().get(url)['ETag']
+
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.tag.name = 'Autumn'
+        self.tag.save()
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unshare_recipe(self):
+        """Test an unshared recipe is no longer public"""
+        url = self.share().data['share_url']
+
+        response = self.share(False)
+
+        self.assertIsNone(response.data['share_url'])
+        self.assertEqual(
+            APIClient().get(url).status_code, status.HTTP_404_NOT_FOUND
+        )
@@ -5,13 +5,18 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.models import Tag
+from core.models import Recipe, Tag
 
 from recipe.serializer import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
 
 
+def tag_recipes_url(tag_id):
+    """Return the URL attaching a tag to recipes"""
+    return reverse('recipe:tag-recipes', args=[tag_id])
+
+
 class PublicTagsApiTests(TestCase):
     """Test the publicly available tags API"""
 
@@ -86,3 +91,44 @@ class ProtectedTagsApiTests(TestCase):
         response = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_attach_tag_to_recipes(self):
+        """Test a tag is attached to and detached from many recipes"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipes = [
+            Recipe.objects.create(
+                user=self.user, title='Recipe %d' % i, time_minute=5, price=1
+            )
+            for i in range(3)
+        ]
+        recipes[2].tags.add(tag)
+
+        response = self.client.post(tag_recipes_url(tag.id), {
+            'add': [recipes[0].id, recipes[1].id],
+            'remove': [recipes[2].id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            set(tag.recipe_set.values_list('id', flat=True)),
+            {recipes[0].id, recipes[1].id}
+        )
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 2)
+
+    def test_attach_tag_to_foreign_recipe(self):
+        """Test a tag cannot be attached to recipes of other users"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'password123'
+        )
+        foreign = Recipe.objects.create(
+            user=other, title='Soup', time_minute=5, price=1
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        response = self.client.post(
+            tag_recipes_url(tag.id), {'add': [foreign.id]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(tag.recipe_set.exists())
@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 
 from recipe import views
@@ -11,5 +11,16 @@ router.register('recipe', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    re_path(
+        r'^images/(?P<size>\w+)/(?P<digest>[0-9a-f]{64})\.jpg$',
+        views.recipe_image,
+        name='recipe-image',
+    ),
+    path('events/', views.ChangeEventsView.as_view(), name='events'),
+    path(
+        'shared/<slug>/',
+        views.SharedRecipeView.as_view(),
+        name='shared-recipe',
+    ),
     path('', include(router.urls))
 ]
@@ -1,30 +1,105 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+import hashlib
+import os
+from decimal import Decimal, InvalidOperation
 
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Count, prefetch_related_objects
+from django.http import FileResponse, Http404, HttpResponse, \
+    HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.http import etag, require_safe
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import cdn, events, images, jobs
+from core.authentication import ExpiringTokenAuthentication
+from core.etags import UserDataETagMixin
 from core.models import Tag
 from core.models import Ingredient
+from core.models import Job
 from core.models import Recipe
+from core.models import UserStats
+from core.similarity import similar_recipes
 
 from recipe import serializer
+from recipe.pagination import CountedPageNumberPagination
+
+
+class UserCountedMixin(UserDataETagMixin):
+    """Read the total of the listed objects from the user's counters"""
+    pagination_class = CountedPageNumberPagination
+
+    def is_filtered(self):
+        """Return whether the list is narrowed by query parameters"""
+        return False
 
+    def get_total_count(self):
+        """Return the number of objects the current user owns"""
+        if self.action != 'list' or self.is_filtered():
+            return None
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+        field = self.queryset.model.counter_field
+        if self.user_stats is not None:
+            return getattr(self.user_stats, field)
+
+        counts = UserStats.objects.filter(user=self.request.user) \
+            .values_list(field, flat=True)
+        return next(iter(counts), None)
+
+
+class BaseRecipeAttrViewSet(UserCountedMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base view set for user owned attrs"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (ExpiringTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
         """Fetch objects for the current authenticated user only"""
         return self.queryset.filter(user=self.request.user).order_by('-name')
 
+    def get_serializer_class(self):
+        if self.action == 'recipes':
+            return serializer.AttrRecipesSerializer
+
+        return self.serializer_class
+
+    @transaction.atomic
     def perform_create(self, serializer):
         """Create a new object"""
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=['post'])
+    def recipes(self, request, pk=None):
+        """Attach the object to some of the user's recipes, or detach it"""
+        attr = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # Going through recipe_set keeps the m2m signals firing.
+            if serializer.validated_data['remove']:
+                linked = attr.recipe_set.filter(
+                    id__in=serializer.validated_data['remove']
+                ).values_list('id', flat=True)
+                attr.recipe_set.remove(*linked)
+            if serializer.validated_data['add']:
+                attr.recipe_set.add(*serializer.validated_data['add'])
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
@@ -38,24 +113,326 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializer.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(UserCountedMixin, viewsets.ModelViewSet):
     """Manage recipes in database"""
     queryset = Recipe.objects.all()
     serializer_class = serializer.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (ExpiringTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
+    # Query parameters narrowing the list, with their lookup and type.
+    range_filters = {
+        'price_min': ('price__gte', Decimal),
+        'price_max': ('price__lte', Decimal),
+        'time_max': ('time_minute__lte', int),
+    }
+    # Each is backed by a (user, field, id) index.
+    ordering_fields = ('price', 'time_minute', 'title', 'id')
+    default_ordering = ('-id',)
+
     def get_queryset(self):
         """Retrieve recipe for current user"""
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = queryset.filter(**self._get_range_filters()) \
+                .order_by(*self._get_ordering()) \
+                .prefetch_related('tags', 'ingredients')
+
+        return queryset
+
+    def is_filtered(self):
+        """Return whether a range filter is applied to the list"""
+        return any(
+            param in self.request.query_params for param in self.range_filters
+        )
+
+    def _get_range_filters(self):
+        """Return the lookups for the range filters in the request"""
+        lookups = {}
+        for param, (lookup, convert) in self.range_filters.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                lookups[lookup] = convert(value)
+            except (ValueError, InvalidOperation):
+                raise ValidationError({param: 'Expected a number.'})
+
+        return lookups
+
+    def _get_ordering(self):
+        """Return the ordering requested, restricted to indexed fields"""
+        value = self.request.query_params.get('ordering') or ''
+        ordering = [field.strip() for field in value.split(',')]
+        ordering = [field for field in ordering if field]
+        if not ordering:
+            return self.default_ordering
+
+        names = [
+            field[1:] if field.startswith('-') else field
+            for field in ordering
+        ]
+        invalid = [
+            field for field, name in zip(ordering, names)
+            if name not in self.ordering_fields
+        ]
+        if invalid:
+            raise ValidationError({
+                'ordering': 'Cannot order by %s.' % ', '.join(invalid)
+            })
+
+        # The tie-breaker follows the direction of the last field, so that
+        # (user, field, id) indexes can be scanned in either direction.
+        if 'id' not in names:
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def _params_to_ints(self, name):
+        """Convert a comma separated query parameter to a list of ints"""
+        value = self.request.query_params.get(name, '')
+        try:
+            return [int(item) for item in value.split(',') if item]
+        except ValueError:
+            raise ValidationError(
+                {name: 'Expected a comma separated list of ids.'}
+            )
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'batch'):
             return serializer.RecipeDetailSerializer
+        if self.action == 'pantry':
+            return serializer.PantryRecipeSerializer
+        if self.action == 'similar':
+            return serializer.SimilarRecipeSerializer
+        if self.action == 'shopping_list':
+            return serializer.ShoppingListItemSerializer
+        if self.action == 'upload_image':
+            return serializer.RecipeImageSerializer
 
         return self.serializer_class
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Update a recipe"""
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Delete a recipe"""
+        instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def pantry(self, request):
+        """List recipes that can be cooked with the given ingredients"""
+        ingredient_ids = self._params_to_ints('ingredients')
+        try:
+            max_missing = int(request.query_params.get('missing', 0))
+        except ValueError:
+            raise ValidationError({'missing': 'Expected an integer.'})
+
+        recipes = self.get_queryset() \
+            .cookable_with(ingredient_ids, max_missing) \
+            .prefetch_related('tags', 'ingredients')
+        serializer_class = self.get_serializer_class()
+        context = dict(self.get_serializer_context(), pantry=ingredient_ids)
+
+        page = self.paginate_queryset(recipes)
+        if page is not None:
+            data = serializer_class(page, many=True, context=context).data
+            return self.get_paginated_response(data)
+
+        data = serializer_class(recipes, many=True, context=context).data
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='shopping-list')
+    def shopping_list(self, request):
+        """List the ingredients needed by a set of the user's recipes"""
+        recipe_ids = self._params_to_ints('recipes')
+        ingredients = Ingredient.objects.filter(
+            recipe__in=recipe_ids,
+            recipe__user=request.user,
+        ).values('id', 'name').annotate(recipes=Count('recipe')) \
+            .order_by('name', 'id')
+
+        data = self.get_serializer(ingredients, many=True).data
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """Retrieve several recipes by id, in the order requested"""
+        recipe_ids = list(dict.fromkeys(self._params_to_ints('ids')))
+        if len(recipe_ids) > settings.RECIPE_BATCH_MAX_IDS:
+            raise ValidationError({
+                'ids': 'Ask for at most %d recipes.'
+                % settings.RECIPE_BATCH_MAX_IDS
+            })
+
+        recipes = self.get_queryset().filter(id__in=recipe_ids) \
+            .prefetch_related('tags', 'ingredients') \
+            .in_bulk()
+        # Recipes of other users are reported missing too, not forbidden,
+        # so ids of other accounts cannot be probed.
+        found = [recipes[id] for id in recipe_ids if id in recipes]
+
+        return Response({
+            'results': self.get_serializer(found, many=True).data,
+            'missing': [id for id in recipe_ids if id not in recipes],
+        })
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """List the recipes sharing the most tags and ingredients"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        limit = max(1, min(limit, 50))
+
+        recipes = []
+        for recipe, similarity in similar_recipes(self.get_object(), limit):
+            recipe.similarity = similarity
+            recipes.append(recipe)
+        prefetch_related_objects(recipes, 'tags', 'ingredients')
+
+        return Response(self.get_serializer(recipes, many=True).data)
+
+    @action(
+        detail=True,
+        methods=['post'],
+        url_path='upload-image',
+        parser_classes=(MultiPartParser,),
+    )
+    def upload_image(self, request, pk=None):
+        """Upload an image to a recipe; its renditions are made later"""
+        # Spool the upload to disk however small it is, then copy it into
+        # the image store chunk by chunk.
+        request._request.upload_handlers = [
+            TemporaryFileUploadHandler(request._request)
+        ]
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe, data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            digest = images.store_original(serializer.validated_data['image'])
+        except ValueError as error:
+            raise ValidationError({'image': str(error)})
+
+        with transaction.atomic():
+            recipe.image_hash = digest
+            recipe.save(update_fields=['image_hash'])
+            jobs.enqueue('make_renditions', user=request.user, digest=digest)
+
+        return Response(serializer.data)
+
+
+class ChangeEventsView(APIView):
+    """Stream changes to the user's recipes, tags and ingredients"""
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer, events.EventStreamRenderer)
+
+    def get(self, request):
+        """Send events as they happen, after the last one the client got"""
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') \
+            or request.query_params.get('last_event_id')
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                raise ValidationError({'last_event_id': 'Expected an id.'})
+
+        try:
+            subscription = events.get_hub().subscribe(
+                request.user.pk, last_event_id
+            )
+        except events.TooManyStreams:
+            return Response(
+                {'detail': 'Too many streams, try again later.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': settings.EVENTS_HEARTBEAT_SECONDS},
+            )
+
+        response = StreamingHttpResponse(
+            events.stream(
+                subscription,
+                settings.EVENTS_HEARTBEAT_SECONDS,
+                settings.EVENTS_STREAM_SECONDS,
+            ),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class SharedRecipeView(APIView):
+    """Show a shared recipe to anyone with its link, cacheable by a CDN"""
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    # Requests mostly come from the few addresses of the CDN.
+    throttle_classes = ()
+    renderer_classes = (JSONRenderer,)
+
+    def get(self, request, slug):
+        """Return the recipe with a strong ETag and its surrogate keys"""
+        recipe = get_object_or_404(
+            Recipe.objects.prefetch_related('tags', 'ingredients'),
+            share_slug=slug,
+        )
+        body = JSONRenderer().render(serializer.SharedRecipeSerializer(
+            recipe, context={'request': request}
+        ).data)
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Surrogate-Key'] = ' '.join(cdn.surrogate_keys(recipe))
+        patch_cache_control(
+            response, public=True, max_age=settings.SHARE_MAX_AGE,
+            s_maxage=settings.SHARE_CDN_MAX_AGE,
+        )
+        return response
+
+
+def _image_etag(request, size, digest):
+    return '%s-%s' % (digest, size)
+
+
+@require_safe
+@etag(_image_etag)
+def recipe_image(request, size, digest):
+    """Serve a rendition of a recipe image, cached for good by clients"""
+    if size not in settings.RECIPE_IMAGE_SIZES \
+            or not os.path.exists(images.original_path(digest)):
+        raise Http404('No such image')
+
+    # Renditions are only made by the background job, never while serving.
+    path = images.rendition_path(digest, size)
+    if not os.path.exists(path):
+        pending = Job.objects.filter(
+            name='make_renditions', payload__digest=digest,
+            status__in=(Job.QUEUED, Job.RUNNING),
+        )
+        if not pending.exists():
+            jobs.enqueue('make_renditions', digest=digest)
+        response = HttpResponse('Image not ready', status=404)
+        add_never_cache_headers(response)
+        return response
+
+    response = FileResponse(open(path, 'rb'), content_type='image/jpeg')
+    # The URL changes with the image, so the response never goes stale.
+    patch_cache_control(
+        response, public=True, max_age=365 * 24 * 60 * 60, immutable=True
+    )
+    return response
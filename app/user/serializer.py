@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.models import Ingredient, Job, Tag, UserStats
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object"""
@@ -28,6 +31,60 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class UsageSerializer(serializers.Serializer):
+    """Serializer for a tag or ingredient and how many recipes use it"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    recipe_count = serializers.IntegerField()
+
+
+class UserStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the counters and recipe statistics of a user"""
+    TOP_LIMIT = 5
+
+    price_average = serializers.DecimalField(
+        max_digits=5, decimal_places=2, read_only=True
+    )
+    time_histogram = serializers.SerializerMethodField()
+    top_tags = serializers.SerializerMethodField()
+    top_ingredients = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserStats
+        fields = (
+            'recipe_count',
+            'tag_count',
+            'ingredient_count',
+            'price_average',
+            'price_min',
+            'price_max',
+            'time_histogram',
+            'top_tags',
+            'top_ingredients',
+        )
+        read_only_fields = fields
+
+    def get_time_histogram(self, obj):
+        """Return the number of recipes per cooking time bucket"""
+        bounds = list(settings.RECIPE_TIME_BUCKETS) + [None]
+        return [
+            {'max_minutes': bound, 'count': count}
+            for bound, count in zip(bounds, obj.time_histogram)
+        ]
+
+    def get_top(self, model, obj):
+        """Return the attributes of the user used by the most recipes"""
+        top = model.objects.filter(user_id=obj.user_id, recipe_count__gt=0) \
+            .order_by('-recipe_count')[:self.TOP_LIMIT]
+        return UsageSerializer(top, many=True).data
+
+    def get_top_tags(self, obj):
+        return self.get_top(Tag, obj)
+
+    def get_top_ingredients(self, obj):
+        return self.get_top(Ingredient, obj)
+
+
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer for the user authentication object"""
     email = serializers.CharField()
@@ -35,6 +92,9 @@ class AuthTokenSerializer(serializers.Serializer):
         style={'input_type': 'password'},
         trim_whitespace=False
     )
+    device = serializers.CharField(
+        max_length=100, required=False, allow_blank=True
+    )
 
     def validate(self, attrs):
         """Validate and authenticate the user"""
@@ -53,3 +113,23 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for the status of a background job"""
+
+    class Meta:
+        model = Job
+        fields = (
+            'id',
+            'name',
+            'status',
+            'attempts',
+            'max_attempts',
+            'run_at',
+            'started_at',
+            'finished_at',
+            'created_at',
+            'result',
+        )
+        read_only_fields = fields
@@ -1,14 +1,28 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import AuthToken, Ingredient, Job, Recipe, Tag
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+LOGOUT_URL = reverse('user:logout')
 ME_URL = reverse('user:me')
+STATS_URL = reverse('user:stats')
+JOBS_URL = reverse('user:jobs')
+BOOTSTRAP_URL = reverse('user:bootstrap')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def job_url(job_id):
+    """Return the status URL of a job"""
+    return reverse('user:job', args=[job_id])
 
 
 def create_user(**params):
@@ -74,6 +88,34 @@ class PublicUserApiTest(TestCase):
         self.assertIn('token', response.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_token_per_device(self):
+        """Test each sign in gets its own token, revoked on its own"""
+        payload = {'email': 'demo@idco.io', 'password': 'demo1234'}
+        user = create_user(**payload)
+        phone = self.client.post(TOKEN_URL, dict(payload, device='Phone'))
+        laptop = self.client.post(TOKEN_URL, payload)
+
+        self.assertIn('expires_at', phone.data)
+        self.assertEqual(
+            sorted(user.auth_tokens.values_list('device', flat=True)),
+            ['', 'Phone']
+        )
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + phone.data['token']
+        )
+        response = self.client.post(LOGOUT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + laptop.data['token']
+        )
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
     def test_create_token_with_invalid_credential(self):
         """Test that token is not created if invalid credentials are given"""
         create_user(**{
@@ -164,3 +206,170 @@ class ProtectedUserApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
+
+    def test_retrieve_stats(self):
+        """Test retrieving the statistics of the authenticated user"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Unused')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minute=5, price=1
+        )
+        Recipe.objects.create(
+            user=self.user, title='Stew', time_minute=90, price=4
+        )
+        recipe.tags.add(tag)
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recipe_count'], 2)
+        self.assertEqual(response.data['tag_count'], 2)
+        self.assertEqual(response.data['ingredient_count'], 0)
+        self.assertEqual(response.data['price_average'], '2.50')
+        self.assertEqual(response.data['price_min'], '1.00')
+        self.assertEqual(response.data['price_max'], '4.00')
+        self.assertEqual(
+            [bucket['count'] for bucket in response.data['time_histogram']],
+            [1, 0, 0, 1, 0]
+        )
+        self.assertEqual(response.data['top_tags'], [
+            {'id': tag.id, 'name': tag.name, 'recipe_count': 1}
+        ])
+        self.assertEqual(response.data['top_ingredients'], [])
+
+    def test_delete_me_schedules_purge(self):
+        """Test deleting the account deactivates it for a later purge"""
+        Recipe.objects.create(
+            user=self.user, title='Stew', time_minute=60, price=8
+        )
+        AuthToken.objects.issue(self.user)
+
+        response = self.client.delete(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.purge_requested_at)
+        self.assertFalse(self.user.auth_tokens.exists())
+        self.assertTrue(Recipe.objects.filter(user=self.user).exists())
+
+    def test_delete_me_queues_purge_job(self):
+        """Test deleting the account queues the purge job"""
+        self.client.delete(ME_URL)
+
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'purge_user')
+        self.assertEqual(job.payload, {'user_id': self.user.id})
+
+    def test_recompute_stats_job(self):
+        """Test requesting a stats recount queues a job to follow"""
+        response = self.client.post(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.QUEUED)
+
+        response = self.client.get(job_url(response.data['id']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'recompute_stats')
+
+    def test_jobs_limited_to_user(self):
+        """Test users only see their own jobs"""
+        other = create_user(email='u2@idco.io', password='pass123456')
+        own = Job.objects.create(user=self.user, name='recompute_stats')
+        foreign = Job.objects.create(user=other, name='recompute_stats')
+
+        response = self.client.get(JOBS_URL)
+
+        self.assertEqual([job['id'] for job in response.data], [own.id])
+        response = self.client.get(job_url(foreign.id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BootstrapApiTests(TestCase):
+    """Test the single request made by the app on start"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='u1@idco.io',
+            password='pass123456',
+            name='user one',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bootstrap(self):
+        """Test the profile, tags, ingredients and recipes come at once"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Breakfast')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minute=60, price=8
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BOOTSTRAP_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['email'], self.user.email)
+        self.assertEqual(
+            [tag['name'] for tag in response.data['tags']],
+            ['Vegan', 'Breakfast']
+        )
+        self.assertEqual(
+            response.data['ingredients'],
+            [{'id': ingredient.id, 'name': 'Salt'}]
+        )
+        self.assertEqual(response.data['recipes']['count'], 1)
+        self.assertIsNone(response.data['recipes']['next'])
+        self.assertEqual(
+            response.data['recipes']['results'][0]['tags'], [tag.id]
+        )
+        self.assertEqual(len(queries), 5)
+
+    def test_unchanged_bootstrap_not_modified(self):
+        """Test an unchanged bootstrap is answered 304 until data changes"""
+        etag = self.client.get(BOOTSTRAP_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BOOTSTRAP_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        response = self.client.get(BOOTSTRAP_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_follows_changes(self):
+        """Test list ETags change with any change to the user's recipes"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Stew', time_minute=60, price=8
+        )
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        response = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        for change in (
+            lambda: recipe.tags.add(
+                Tag.objects.create(user=self.user, name='Vegan')
+            ),
+            lambda: recipe.save(),
+            lambda: self.client.patch(ME_URL, {'name': 'renamed'}),
+        ):
+            change()
+            response = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+        response = self.client.get(
+            RECIPES_URL, {'ordering': 'title'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -8,5 +8,10 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('me/bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
+    path('me/stats/', views.UserStatsView.as_view(), name='stats'),
+    path('me/jobs/', views.JobListView.as_view(), name='jobs'),
+    path('me/jobs/<int:pk>/', views.JobDetailView.as_view(), name='job'),
 ]
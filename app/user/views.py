@@ -1,27 +1,182 @@
-from rest_framework import generics, authentication, permissions
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core import jobs
+from core.authentication import ExpiringTokenAuthentication
+from core.etags import UserDataETagMixin
+from core.models import AuthToken, Ingredient, Job, Recipe, Tag, UserStats
+
+from recipe.serializer import RecipeSerializer
 
-from user.serializer import AuthTokenSerializer, UserSerializer
+from user.serializer import AuthTokenSerializer, JobSerializer, \
+    UserSerializer, UserStatsSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_scope = 'login'
 
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token fir user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # ObtainAuthToken turns throttling off; put it back.
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
 
+    def post(self, request, *args, **kwargs):
+        """Issue a new token for the device signing in"""
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token = AuthToken.objects.issue(
+            serializer.validated_data['user'],
+            device=serializer.validated_data.get('device', ''),
+        )
+        return Response({'token': token.key, 'expires_at': token.expires_at})
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class LogoutView(APIView):
+    """Revoke the token of the request, signing its device out"""
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated method"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (ExpiringTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authentication user"""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the account and leave its deletion to the purge"""
+        self.perform_destroy(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.is_active = False
+        instance.purge_requested_at = timezone.now()
+        instance.save(update_fields=['is_active', 'purge_requested_at'])
+        AuthToken.objects.filter(user=instance).delete()
+        jobs.enqueue('purge_user', user=instance, user_id=instance.id)
+
+
+class UserStatsView(generics.RetrieveAPIView):
+    """Show the counters of the authenticated user"""
+    serializer_class = UserStatsSerializer
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_object(self):
+        """Retrieve the counters of the authenticated user"""
+        stats, _ = UserStats.objects.get_or_create(user=self.request.user)
+        return stats
+
+    def post(self, request, *args, **kwargs):
+        """Queue a recount of the user's stats from scratch"""
+        job = jobs.enqueue(
+            'recompute_stats', user=request.user, user_ids=[request.user.id]
+        )
+        return Response(
+            JobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class JobViewMixin:
+    """Limit the jobs shown to those of the authenticated user"""
+    serializer_class = JobSerializer
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by('-id')
+
+
+class JobListView(JobViewMixin, generics.ListAPIView):
+    """List the background jobs of the authenticated user"""
+
+
+class JobDetailView(JobViewMixin, generics.RetrieveAPIView):
+    """Show the status of a background job of the authenticated user"""
+
+
+class BootstrapView(UserDataETagMixin, generics.GenericAPIView):
+    """Return everything the app shows on start in a single response"""
+    authentication_classes = (ExpiringTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    recipe_page_size = 20
+
+    def uses_etag(self, request):
+        return request.method in ('GET', 'HEAD')
+
+    def get(self, request):
+        """Return the profile, tags, ingredients and first recipes"""
+        if self.user_stats is None:
+            UserStats.objects.recompute([request.user.id])
+            self.user_stats = UserStats.objects.get(user=request.user)
+
+        attrs = {'tag': [], 'ingredient': []}
+        for kind, id, name in self.get_attrs(request.user):
+            attrs[kind].append({'id': id, 'name': name})
+
+        recipes = Recipe.objects.filter(user=request.user) \
+            .order_by('-id') \
+            .prefetch_related('tags', 'ingredients')[:self.recipe_page_size]
+
+        return Response({
+            'user': UserSerializer(request.user).data,
+            'tags': attrs['tag'],
+            'ingredients': attrs['ingredient'],
+            'recipes': {
+                'count': self.user_stats.recipe_count,
+                'next': self.get_next_recipes_link(request),
+                'results': RecipeSerializer(
+                    recipes, many=True, context={'request': request}
+                ).data,
+            },
+        })
+
+    def get_attrs(self, user):
+        """Return the kind, id and name of the user's tags and ingredients
+
+        Both are read in one query, each sorted like their list endpoint.
+        """
+        querysets = [
+            model.objects.filter(user=user)
+            .annotate(kind=Value(kind, output_field=CharField()))
+            .values_list('kind', 'id', 'name')
+            for kind, model in (('tag', Tag), ('ingredient', Ingredient))
+        ]
+        return querysets[0].union(querysets[1], all=True) \
+            .order_by('kind', '-name')
+
+    def get_next_recipes_link(self, request):
+        """Return the URL of the second page of recipes, if there is one"""
+        if self.user_stats.recipe_count <= self.recipe_page_size:
+            return None
+
+        return request.build_absolute_uri('%s?%s' % (
+            reverse('recipe:recipe-list'),
+            urlencode({'page': 2, 'page_size': self.recipe_page_size}),
+        ))